@@ -0,0 +1,120 @@
+"""initial schema
+
+The schema shipped before migrations were introduced (what init_db.py's
+create_all produced, as in the bundled app.db). Existing databases are
+stamped at this revision instead of running it; 0001a brings them up to
+the current tables.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 09:04:41.204398
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_superuser', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+
+    op.create_table('rl_model_states',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('state_dict', sa.JSON(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('version', sa.String(), nullable=False),
+    sa.Column('meta_data', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('rl_model_states', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rl_model_states_id'), ['id'], unique=False)
+
+    op.create_table('documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('file_type', sa.String(), nullable=True),
+    sa.Column('file_size', sa.Integer(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('processing_status', sa.String(), nullable=True),
+    sa.Column('meta_data', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_documents_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_documents_title'), ['title'], unique=False)
+
+    op.create_table('document_embeddings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('document_id', sa.Integer(), nullable=True),
+    sa.Column('chunk_index', sa.Integer(), nullable=True),
+    sa.Column('chunk_text', sa.Text(), nullable=True),
+    sa.Column('embedding', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('document_embeddings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_document_embeddings_id'), ['id'], unique=False)
+
+    op.create_table('questions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('document_id', sa.Integer(), nullable=True),
+    sa.Column('question_text', sa.Text(), nullable=False),
+    sa.Column('answer_text', sa.Text(), nullable=True),
+    sa.Column('confidence_score', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('feedback_score', sa.Integer(), nullable=True),
+    sa.Column('meta_data', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_questions_id'), ['id'], unique=False)
+
+
+def downgrade() -> None:
+    for table, indexes in (
+        ('questions', ['ix_questions_id']),
+        ('document_embeddings', ['ix_document_embeddings_id']),
+        ('documents', ['ix_documents_title', 'ix_documents_id']),
+        ('rl_model_states', ['ix_rl_model_states_id']),
+        ('users', ['ix_users_id', 'ix_users_email']),
+    ):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for index in indexes:
+                batch_op.drop_index(index)
+        op.drop_table(table)
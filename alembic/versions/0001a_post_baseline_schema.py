@@ -0,0 +1,132 @@
+"""post-baseline schema
+
+Brings the baseline (0001) up to the tables the models defined when
+migrations were introduced: conversations, documents.index_version and the
+cached summary, chunk offsets, questions.conversation_id, and the versioned
+checkpoint layout of rl_model_states.
+
+Databases created with create_all between the baseline and 0002 are stamped
+at 0001 by init_db.py but may already have some of these, so every step
+checks the live schema first.
+
+The old rl_model_states rows hold the policy as JSON-encoded tensors under a
+string version; they cannot be turned into checkpoints, so the table is
+rebuilt empty and the policy retrains from feedback.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19 09:04:46.512903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('documents', sa.Column('index_version', sa.Integer(), nullable=True)),
+    ('documents', sa.Column('summary', sa.Text(), nullable=True)),
+    ('documents', sa.Column('summary_index_version', sa.Integer(), nullable=True)),
+    ('document_embeddings', sa.Column('start_offset', sa.Integer(), nullable=True)),
+    ('document_embeddings', sa.Column('end_offset', sa.Integer(), nullable=True)),
+]
+
+
+def _columns(inspector, table):
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _create_rl_model_states():
+    op.create_table('rl_model_states',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('checkpoint', sa.LargeBinary(), nullable=False),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('model_name', 'version')
+    )
+    with op.batch_alter_table('rl_model_states', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rl_model_states_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_rl_model_states_is_active'), ['is_active'], unique=False)
+        batch_op.create_index(batch_op.f('ix_rl_model_states_model_name'), ['model_name'], unique=False)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'conversations' not in tables:
+        op.create_table('conversations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('document_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('summary', sa.Text(), nullable=True),
+        sa.Column('summarized_until_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('conversations', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_conversations_id'), ['id'], unique=False)
+
+    for table, column in COLUMNS:
+        if column.name not in _columns(inspector, table):
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                batch_op.add_column(column)
+
+    if 'conversation_id' not in _columns(inspector, 'questions'):
+        # SQLite can only add the foreign key by copying the table
+        with op.batch_alter_table('questions', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('conversation_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_questions_conversation_id', 'conversations', ['conversation_id'], ['id'])
+
+    if 'rl_model_states' not in tables:
+        _create_rl_model_states()
+    elif 'checkpoint' not in _columns(inspector, 'rl_model_states'):
+        op.drop_table('rl_model_states')
+        _create_rl_model_states()
+
+
+def downgrade() -> None:
+    op.drop_table('rl_model_states')
+    op.create_table('rl_model_states',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('model_name', sa.String(), nullable=False),
+    sa.Column('state_dict', sa.JSON(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('version', sa.String(), nullable=False),
+    sa.Column('meta_data', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('rl_model_states', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rl_model_states_id'), ['id'], unique=False)
+
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_questions_conversation_id', type_='foreignkey')
+        batch_op.drop_column('conversation_id')
+
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column(column.name)
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_conversations_id'))
+
+    op.drop_table('conversations')
@@ -0,0 +1,40 @@
+"""hot path indexes
+
+Indexes for the foreign keys every retrieval, listing and ownership check
+filters on. Composite indexes lead with the filtered column, so they also
+serve plain lookups on it (e.g. document_embeddings.document_id).
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-19 09:04:51.068314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_document_embeddings_document_id_chunk_index', 'document_embeddings', ['document_id', 'chunk_index']),
+    ('ix_documents_owner_id_created_at', 'documents', ['owner_id', 'created_at']),
+    ('ix_questions_user_id_created_at', 'questions', ['user_id', 'created_at']),
+    ('ix_questions_document_id', 'questions', ['document_id']),
+    ('ix_questions_conversation_id_id', 'questions', ['conversation_id', 'id']),
+    ('ix_conversations_user_id_created_at', 'conversations', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
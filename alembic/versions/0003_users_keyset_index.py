@@ -0,0 +1,28 @@
+"""users keyset index
+
+The user list pages on (created_at, id); the other list endpoints are
+covered by the composite indexes from 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:31:12.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,115 @@
+"""question source refs
+
+Rewrite answer sources stored with their full chunk text into chunk
+references (embedding id, chunk index, score, character span). The text
+is resolved on request from document_embeddings instead.
+
+The legacy ``chunk_index`` of a source was its retrieval rank, not the
+chunk's position in the document, so chunks are found by their text.
+Sources whose text matches no stored chunk (e.g. fallback answers quoting
+other documents) are kept as literal text sources without the rank.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:02:47.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+questions = sa.table(
+    'questions',
+    sa.column('id', sa.Integer),
+    sa.column('document_id', sa.Integer),
+    sa.column('meta_data', sa.JSON),
+)
+document_embeddings = sa.table(
+    'document_embeddings',
+    sa.column('id', sa.Integer),
+    sa.column('document_id', sa.Integer),
+    sa.column('chunk_index', sa.Integer),
+    sa.column('chunk_text', sa.Text),
+    sa.column('start_offset', sa.Integer),
+    sa.column('end_offset', sa.Integer),
+)
+
+
+def _document_chunks(bind, document_id):
+    chunks = {}
+    for row in bind.execute(
+        sa.select(
+            document_embeddings.c.id,
+            document_embeddings.c.chunk_index,
+            document_embeddings.c.chunk_text,
+            document_embeddings.c.start_offset,
+            document_embeddings.c.end_offset,
+        ).where(document_embeddings.c.document_id == document_id)
+        .order_by(document_embeddings.c.id)  # newest chunk wins if a document was reprocessed
+    ):
+        if row.chunk_text is not None:
+            chunks[row.chunk_text.strip()] = row
+    return chunks
+
+
+def _to_refs(chunks, sources):
+    refs = []
+    for source in sources:
+        if 'text' not in source:
+            refs.append(source)
+            continue
+        chunk = chunks.get((source['text'] or '').strip())
+        if chunk is None:
+            refs.append({key: value for key, value in source.items() if key != 'chunk_index'})
+            continue
+        refs.append({
+            'embedding_id': chunk.id,
+            'chunk_index': chunk.chunk_index,
+            'score': source.get('score'),
+            'start': chunk.start_offset,
+            'end': chunk.end_offset,
+        })
+    return refs
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(questions.c.id, questions.c.document_id, questions.c.meta_data)
+            .where(questions.c.id > last_id)
+            .order_by(questions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        chunks_by_document = {}
+        for row in rows:
+            meta_data = row.meta_data
+            sources = meta_data.get('sources') if isinstance(meta_data, dict) else None
+            if not sources or not any('text' in source for source in sources):
+                continue
+            if row.document_id not in chunks_by_document:
+                chunks_by_document[row.document_id] = _document_chunks(bind, row.document_id)
+            bind.execute(
+                questions.update().where(questions.c.id == row.id).values(
+                    meta_data={**meta_data, 'sources': _to_refs(chunks_by_document[row.document_id], sources)}
+                )
+            )
+
+
+def downgrade() -> None:
+    # References stay readable; the inline text is not restored
+    pass
@@ -0,0 +1,30 @@
+"""document tombstones
+
+Deleted documents are marked with deleted_at and hidden at once; their
+chunks, questions and file are removed afterwards by the cleanup job.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:48:05.772931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -1,16 +1,25 @@
-from typing import Generator, Optional
+import logging
+from typing import AsyncGenerator, Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
+from app.core import quotas
 from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.pagination import PageParams
 from app.core.security import ALGORITHM
+from app.db.async_session import async_session_scope
 from app.db.session import SessionLocal
 from app.models.models import User
 from app.schemas.schemas import TokenPayload
+from app.services import principals
+
+logger = logging.getLogger(__name__)
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -25,9 +34,31 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+def get_request_deadline(
+    x_request_deadline_ms: Optional[int] = Header(None),
+) -> Deadline:
+    """End-to-end deadline for the request, optionally tightened by the client."""
+    return Deadline.from_header(x_request_deadline_ms, settings.REQUEST_DEADLINE_SECONDS)
+
+
+def get_page_params(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.PAGINATION_DEFAULT_LIMIT, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    include_total: bool = False,
+) -> PageParams:
+    return PageParams(cursor=cursor, limit=limit, include_total=include_total)
+
+
+async def get_async_db() -> AsyncGenerator:
+    """Awaitable session for ``async def`` endpoints (see app.db.async_session)."""
+    async with async_session_scope() as db:
+        yield db
+
+
+def _decode_token(token: str) -> TokenPayload:
+    token_data = principals.get_token(token)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[ALGORITHM]
@@ -38,25 +69,113 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    principals.set_token(token, token_data, payload.get("exp"))
+    return token_data
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    """
+    The token's user, served from the principal cache when possible.
+
+    The returned ``User`` is not attached to ``db``; use its id to load or
+    update the row.
+    """
+    token_data = _decode_token(token)
+    user = principals.get_user(token_data.sub)
+    if user is None:
+        user = db.query(User).filter(User.id == token_data.sub).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = principals.set_user(user)
+    return user
+
+
+async def get_current_user_async(
+    db=Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    token_data = _decode_token(token)
+    user = principals.get_user(token_data.sub)
+    if user is None:
+        user = await db.get(User, token_data.sub) if token_data.sub is not None else None
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = principals.set_user(user)
+    return user
+
+
+def _check_active(user: User) -> User:
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+def _check_superuser(user: User) -> User:
+    if not user.is_superuser:
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
     return user
 
 
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+    return _check_active(current_user)
 
 
 def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
-    if not current_user.is_superuser:
-        raise HTTPException(
-            status_code=400, detail="The user doesn't have enough privileges"
-        )
-    return current_user 
\ No newline at end of file
+    return _check_superuser(current_user)
+
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    return _check_active(current_user)
+
+
+async def get_current_active_superuser_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    return _check_superuser(current_user)
+
+
+def get_quota_checked_user(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    """Active user who still has request quota (see app.core.quotas)."""
+    quotas.check_request(current_user.id)
+    return current_user
+
+
+async def get_quota_checked_user_async(
+    current_user: User = Depends(get_current_active_user_async),
+) -> User:
+    quotas.check_request(current_user.id)
+    return current_user
+
+
+async def is_superuser_authorization(authorization: Optional[str]) -> bool:
+    """
+    Whether an ``Authorization`` header belongs to a superuser.
+
+    Same checks as ``get_current_active_superuser_async``, for code that
+    runs outside dependency injection (app.core.profiling).
+    """
+    scheme, token = get_authorization_scheme_param(authorization)
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        async with async_session_scope() as db:
+            user = await get_current_user_async(db=db, token=token)
+        await get_current_active_superuser_async(current_user=user)
+    except HTTPException:
+        return False
+    except Exception:
+        # Never fail the request over its profiling header; it just runs unprofiled
+        logger.exception("Could not check profiling authorization")
+        return False
+    return True
@@ -0,0 +1,76 @@
+from typing import Any, List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api import deps
+from app.core import profiling
+from app.models.models import User
+from app.schemas.schemas import AllocationReport, ProfileInfo, ResponseBase, ThreadStack
+
+router = APIRouter()
+
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+async def read_profiles(
+    current_user: User = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    List stored request profiles, newest first.
+
+    Send any request with ``X-Profile: 1`` (as a superuser) to record one;
+    its id comes back in ``X-Profile-Id``.
+    """
+    return await run_in_threadpool(profiling.list_profiles)
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def read_profile(
+    profile_id: str,
+    current_user: User = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Download a profile as folded stacks (flamegraph.pl, inferno, speedscope).
+    """
+    folded = await run_in_threadpool(profiling.load_profile, profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return folded
+
+
+@router.get("/debug/threads", response_model=List[ThreadStack])
+async def read_thread_stacks(
+    current_user: User = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Current stack of every thread in this process.
+    """
+    return profiling.thread_stacks()
+
+
+@router.get("/debug/allocations", response_model=AllocationReport)
+async def read_top_allocations(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    current_user: User = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Largest live allocations seen by tracemalloc.
+
+    The first call starts tracing, which slows every allocation; call again
+    after reproducing the problem, then stop it with DELETE.
+    """
+    return await run_in_threadpool(profiling.top_allocations, limit, group_by)
+
+
+@router.delete("/debug/allocations", response_model=ResponseBase)
+async def stop_allocation_tracing(
+    current_user: User = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Stop tracemalloc tracing.
+    """
+    if not profiling.stop_allocation_tracing():
+        return {"message": "Allocation tracing was not running"}
+    return {"message": "Allocation tracing stopped"}
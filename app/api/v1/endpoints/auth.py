@@ -1,32 +1,45 @@
 from datetime import timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.exceptions import AuthenticationError
+from app.core.exceptions import AuthenticationError, CustomException
+from app.core.ratelimit import RateLimiter
 from app.models.models import User
 from app.schemas.schemas import Token, UserCreate, User as UserSchema
-from app.services.user_service import UserService
+from app.services.user_service import AsyncUserService
 
 router = APIRouter()
 
+# Each login or registration costs a bcrypt hash; cap attempts per client and per account
+ip_limiter = RateLimiter("auth_ip", settings.AUTH_IP_RATE_PER_MINUTE / 60, settings.AUTH_IP_BURST)
+account_limiter = RateLimiter(
+    "auth_account", settings.AUTH_ACCOUNT_RATE_PER_MINUTE / 60, settings.AUTH_ACCOUNT_BURST
+)
+
+
+def _throttle(request: Request, account: str) -> None:
+    ip_limiter.check(request.client.host if request.client else None)
+    account_limiter.check(account.strip().lower())
+
 
 @router.post("/login/access-token", response_model=Token)
-def login_access_token(
-    db: Session = Depends(deps.get_db),
+async def login_access_token(
+    request: Request,
+    db=Depends(deps.get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
+    _throttle(request, form_data.username)
     try:
-        user_service = UserService(db)
-        user = user_service.authenticate(
+        user_service = AsyncUserService(db)
+        user = await user_service.authenticate(
             email=form_data.username,
             password=form_data.password
         )
@@ -50,24 +63,28 @@ def login_access_token(
 
 
 @router.post("/register", response_model=UserSchema)
-def register(
+async def register(
     *,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    db=Depends(deps.get_async_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Register new user.
     """
+    _throttle(request, user_in.email)
     try:
-        user_service = UserService(db)
-        user = user_service.get_by_email(email=user_in.email)
+        user_service = AsyncUserService(db)
+        user = await user_service.get_by_email(email=user_in.email)
         if user:
             raise HTTPException(
                 status_code=400,
                 detail="The user with this email already exists in the system.",
             )
-        user = user_service.create(obj_in=user_in)
+        user = await user_service.create(obj_in=user_in)
         return user
+    except CustomException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -76,7 +93,7 @@ def register(
 
 
 @router.post("/test-token", response_model=UserSchema)
-def test_token(current_user: User = Depends(deps.get_current_user)) -> Any:
+async def test_token(current_user: User = Depends(deps.get_current_user_async)) -> Any:
     """
     Test access token.
     """
@@ -0,0 +1,69 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, load_only
+
+from app.api import deps
+from app.core.exceptions import DocumentNotFoundError
+from app.core.pagination import PageParams
+from app.models.models import User, Document
+from app.schemas.schemas import (
+    Conversation as ConversationSchema,
+    ConversationCreate,
+    ConversationWithQuestions,
+    PaginatedResponse,
+)
+from app.services.conversation_service import ConversationService
+
+router = APIRouter()
+
+
+@router.post("/", response_model=ConversationSchema)
+def create_conversation(
+    *,
+    db: Session = Depends(deps.get_db),
+    conversation_in: ConversationCreate,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Start a new conversation thread about a document.
+    """
+    document = db.query(Document).options(load_only(Document.id)).filter(
+        Document.id == conversation_in.document_id,
+        Document.owner_id == current_user.id,
+        Document.deleted_at.is_(None),
+    ).first()
+    if not document:
+        raise DocumentNotFoundError()
+
+    return ConversationService(db).create(obj_in=conversation_in, user_id=current_user.id)
+
+
+@router.get("/", response_model=PaginatedResponse[ConversationSchema])
+def read_conversations(
+    db: Session = Depends(deps.get_db),
+    page: PageParams = Depends(deps.get_page_params),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve conversations, newest first.
+    """
+    return ConversationService(db).get_page(current_user.id, page)
+
+
+@router.get("/{conversation_id}", response_model=ConversationWithQuestions)
+def read_conversation(
+    *,
+    db: Session = Depends(deps.get_db),
+    conversation_id: int,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get a conversation with its questions in order.
+    """
+    conversation = ConversationService(db).get(conversation_id, current_user.id, with_questions=True)
+    if not conversation:
+        raise HTTPException(
+            status_code=404,
+            detail="Conversation not found"
+        )
+    return conversation
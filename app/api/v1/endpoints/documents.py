@@ -1,68 +1,109 @@
+import logging
 import os
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from datetime import datetime
+from typing import Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, UploadFile, File, Form
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api import deps
 from app.core.config import settings
-from app.core.exceptions import DocumentProcessingError, DocumentNotFoundError
+from app.core import quotas, tracing
+from app.core.exceptions import CustomException, DocumentNotFoundError
+from app.core.pagination import PageParams, paginate_async
+from app.db.loading import load_schema_columns
+from app.db.session import SessionLocal
 from app.models.models import User, Document
 from app.schemas.schemas import (
     Document as DocumentSchema,
     DocumentCreate,
     DocumentUpdate,
     FileUploadResponse,
+    PaginatedResponse,
     ResponseBase,
 )
-from app.services.document_processor import DocumentProcessor
+from app.services.document_cleanup import document_cleanup
+from app.services.document_processor import LOADER_MAPPING
+from app.services.ingestion import ingestion_queue
+from app.services.summary_service import SummaryService
 from app.services.user_service import UserService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
+def _save_upload(file_path: str, content: bytes) -> None:
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    with open(file_path, "wb") as buffer:
+        buffer.write(content)
+
+
+def _remove_file(file_path: Optional[str]) -> None:
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+async def _get_owned_document(db, document_id: int, owner_id: int) -> Document:
+    document = await db.scalar(
+        select(Document).where(
+            Document.id == document_id,
+            Document.owner_id == owner_id,
+            Document.deleted_at.is_(None),
+        )
+    )
+    if not document:
+        raise DocumentNotFoundError()
+    return document
+
+
 @router.post("/upload", response_model=FileUploadResponse)
 async def upload_document(
     *,
-    db: Session = Depends(deps.get_db),
+    db=Depends(deps.get_async_db),
     file: UploadFile = File(...),
     title: str = Form(...),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_quota_checked_user_async),
 ) -> Any:
     """
-    Upload a new document.
+    Upload a new document. It is chunked and embedded in the background;
+    poll the document until ``processing_status`` is ``completed``.
     """
-    print("upload_document called")
-    print(f"file: {file.filename if file else None}, title: {title}, user: {getattr(current_user, 'id', None)}")
+    file_type = os.path.splitext(file.filename)[1]
+    if file_type.lower() not in LOADER_MAPPING:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_type}"
+        )
+    file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
+    slot = None
     try:
-        # Create upload directory if it doesn't exist
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-
-        # Save file
-        file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            if len(content) > settings.MAX_UPLOAD_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE} bytes"
-                )
-            buffer.write(content)
+        content = await file.read()
+        if len(content) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE} bytes"
+            )
+        slot = quotas.acquire_job(current_user.id)
+        quotas.check_ingest(current_user.id, len(content))
+        await run_in_threadpool(_save_upload, file_path, content)
 
         # Create document record
         document = Document(
             title=title,
             file_path=file_path,
-            file_type=os.path.splitext(file.filename)[1],
+            file_type=file_type,
             file_size=len(content),
             owner_id=current_user.id,
         )
         db.add(document)
-        db.commit()
-        db.refresh(document)
+        await db.commit()
+        await db.refresh(document)
 
-        # Process document in background
-        processor = DocumentProcessor(db)
-        processor.process_document(document)
+        tracing.set_attributes({"document.id": document.id, "file.size": document.file_size})
+        # Process document in background; the worker releases the job slot
+        ingestion_queue.submit(document.id, current_user.id, slot=slot)
 
         return {
             "filename": file.filename,
@@ -73,137 +114,140 @@ async def upload_document(
         }
 
     except Exception as e:
-        print("UPLOAD ENDPOINT ERROR:", e)
-        import traceback; traceback.print_exc()
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+        logger.warning("Upload failed: %s", e, extra={"upload_filename": file.filename})
+        if slot is not None:
+            slot.release()
+        await run_in_threadpool(_remove_file, file_path)
+        if isinstance(e, (HTTPException, CustomException)):
+            raise
         raise HTTPException(
             status_code=400,
             detail=str(e)
         )
 
 
-@router.get("/", response_model=List[DocumentSchema])
-def read_documents(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+@router.get("/", response_model=PaginatedResponse[DocumentSchema])
+async def read_documents(
+    db=Depends(deps.get_async_db),
+    page: PageParams = Depends(deps.get_page_params),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
-    Retrieve documents.
+    Retrieve documents, newest first. Pass ``next_cursor`` back as ``cursor`` for the next page.
     """
-    documents = db.query(Document).filter(
-        Document.owner_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return documents
+    statement = select(Document).options(
+        load_schema_columns(Document, DocumentSchema)
+    ).where(Document.owner_id == current_user.id, Document.deleted_at.is_(None))
+    return await paginate_async(db, statement, Document, page, count_key=("documents", current_user.id))
 
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-def read_document(
+async def read_document(
     *,
-    db: Session = Depends(deps.get_db),
+    db=Depends(deps.get_async_db),
     document_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get document by ID.
     """
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise DocumentNotFoundError()
-    return document
+    return await _get_owned_document(db, document_id, current_user.id)
 
 
 @router.put("/{document_id}", response_model=DocumentSchema)
-def update_document(
+async def update_document(
     *,
-    db: Session = Depends(deps.get_db),
+    db=Depends(deps.get_async_db),
     document_id: int,
     document_in: DocumentUpdate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Update a document.
     """
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise DocumentNotFoundError()
-    
+    document = await _get_owned_document(db, document_id, current_user.id)
+
     for field, value in document_in.dict(exclude_unset=True).items():
         setattr(document, field, value)
-    
+
     db.add(document)
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    await db.refresh(document)
     return document
 
 
 @router.delete("/{document_id}", response_model=ResponseBase)
-def delete_document(
+async def delete_document(
     *,
-    db: Session = Depends(deps.get_db),
+    db=Depends(deps.get_async_db),
     document_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
-    Delete a document.
+    Delete a document. It disappears immediately; its chunks, questions
+    and file are removed by a background job.
     """
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise DocumentNotFoundError()
-    
-    # Delete file if it exists
-    if document.file_path and os.path.exists(document.file_path):
-        os.remove(document.file_path)
-    
-    db.delete(document)
-    db.commit()
+    document = await _get_owned_document(db, document_id, current_user.id)
+
+    document.deleted_at = datetime.utcnow()
+    document.processing_status = "deleting"
+    await db.commit()
+    document_cleanup.submit(document.id, current_user.id)
     return {"message": "Document deleted successfully"}
 
 
-@router.post("/{document_id}/process", response_model=ResponseBase)
+@router.post("/{document_id}/process", response_model=ResponseBase, status_code=202)
 def process_document(
     *,
     db: Session = Depends(deps.get_db),
     document_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_quota_checked_user),
 ) -> Any:
     """
-    Process a document (reprocess if already processed).
+    Reprocess a document in the background, like an upload; poll it until
+    ``processing_status`` is ``completed``.
     """
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.owner_id == current_user.id
+        Document.owner_id == current_user.id,
+        Document.deleted_at.is_(None),
     ).first()
     if not document:
         raise DocumentNotFoundError()
-    
-    try:
-        processor = DocumentProcessor(db)
-        processor.process_document(document)
-        return {"message": "Document processing started successfully"}
-    except DocumentProcessingError as e:
+    if ingestion_queue.is_pending(document.id) and not (
+        # The worker commits the final status a moment before it lets the job go
+        document.processing_status in ("completed", "failed")
+        and ingestion_queue.wait_until_idle(document.id, timeout=1.0)
+    ):
         raise HTTPException(
-            status_code=400,
-            detail=str(e)
+            status_code=409,
+            detail="Document is already being processed"
         )
 
+    slot = quotas.acquire_job(current_user.id)
+    try:
+        quotas.check_ingest(current_user.id, document.file_size or 0)
+        document.processing_status = "pending"
+        db.commit()
+        # The worker releases the job slot; a job submitted since the check above wins
+        if not ingestion_queue.submit(document.id, current_user.id, slot=slot):
+            raise HTTPException(
+                status_code=409,
+                detail="Document is already being processed"
+            )
+    except Exception:
+        slot.release()
+        raise
+    return {"message": "Document processing started successfully"}
+
 
 @router.get("/{document_id}/summary", response_model=ResponseBase)
 def get_document_summary(
     *,
     db: Session = Depends(deps.get_db),
     document_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
@@ -211,7 +255,8 @@ def get_document_summary(
     """
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.owner_id == current_user.id
+        Document.owner_id == current_user.id,
+        Document.deleted_at.is_(None),
     ).first()
     if not document:
         raise DocumentNotFoundError()
@@ -221,16 +266,30 @@ def get_document_summary(
             status_code=400,
             detail="Document processing is not complete"
         )
-    
-    try:
-        processor = DocumentProcessor(db)
-        summary = processor.get_document_summary(document_id)
+
+    # Summaries are built at ingest; older documents get one built in the background
+    if not SummaryService(db).is_fresh(document):
+        background_tasks.add_task(_refresh_summary, document.id)
+        response.status_code = 202
         return {
-            "message": "Document summary generated successfully",
-            "detail": {"summary": summary}
+            "message": "Document summary is being generated",
+            "detail": {"summary": None}
         }
-    except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=str(e)
-        ) 
\ No newline at end of file
+
+    return {
+        "message": "Document summary generated successfully",
+        "detail": {"summary": document.summary}
+    }
+
+
+def _refresh_summary(document_id: int) -> None:
+    db = SessionLocal()
+    try:
+        document = db.query(Document).filter(
+            Document.id == document_id, Document.deleted_at.is_(None)
+        ).first()
+        summary_service = SummaryService(db)
+        if document and not summary_service.is_fresh(document):
+            summary_service.refresh(document)
+    finally:
+        db.close() 
\ No newline at end of file
@@ -1,17 +1,32 @@
-from typing import Any, List
+import logging
+from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only, undefer
 
 from app.api import deps
-from app.core.exceptions import DocumentNotFoundError
+from app.core import quotas, tracing
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.exceptions import DocumentNotFoundError, RLModelError
+from app.core.pagination import PageParams, paginate_async
+from app.db.loading import load_schema_columns
 from app.models.models import User, Question, Document
 from app.schemas.schemas import (
     Question as QuestionSchema,
     QuestionCreate,
+    QuestionFeedback,
+    QuestionListItem,
     QuestionUpdate,
+    PaginatedResponse,
     ResponseBase,
 )
-from app.services.qa_service import QAService
+from app.services.conversation_service import ConversationService
+from app.services.qa_service import answer_question_coalesced
+from app.services.rl_service import RLService
+from app.services import source_refs
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -21,7 +36,8 @@ def create_question(
     *,
     db: Session = Depends(deps.get_db),
     question_in: QuestionCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: User = Depends(deps.get_quota_checked_user),
+    deadline: Deadline = Depends(deps.get_request_deadline),
 ) -> Any:
     """
     Create new question.
@@ -29,7 +45,8 @@ def create_question(
     # Verify document exists and belongs to user
     document = db.query(Document).filter(
         Document.id == question_in.document_id,
-        Document.owner_id == current_user.id
+        Document.owner_id == current_user.id,
+        Document.deleted_at.is_(None),
     ).first()
     if not document:
         raise DocumentNotFoundError()
@@ -40,48 +57,78 @@ def create_question(
             detail="Document processing is not complete"
         )
 
-    # Create question
-    question = Question(
-        question_text=question_in.question_text,
-        document_id=question_in.document_id,
-        user_id=current_user.id,
-        metadata=question_in.metadata if hasattr(question_in, "metadata") else None
-    )
-    db.add(question)
-    db.commit()
-    db.refresh(question)
+    conversation = None
+    chat_history = None
+    if question_in.conversation_id is not None:
+        conversation_service = ConversationService(db)
+        conversation = conversation_service.get(question_in.conversation_id, current_user.id)
+        if not conversation or conversation.document_id != document.id:
+            raise HTTPException(
+                status_code=404,
+                detail="Conversation not found"
+            )
+        chat_history = conversation_service.get_history(conversation).as_prompt_lines()
 
-    # Get answer using QA service
-    qa_service = QAService(db, document_id=question.document_id)
-    answer = qa_service.answer_question(
-        question=question.question_text
-    )
+    quotas.check_llm(current_user.id)
+    with quotas.acquire_job(current_user.id):
+        # Create question
+        question = Question(
+            question_text=question_in.question_text,
+            document_id=question_in.document_id,
+            conversation_id=conversation.id if conversation else None,
+            user_id=current_user.id,
+            meta_data=question_in.metadata or question_in.meta_data,
+        )
+        db.add(question)
+        db.commit()
+        db.refresh(question)
+        tracing.set_attributes({"document.id": document.id, "question.id": question.id})
+
+        # Get answer using QA service; concurrent identical questions share one computation
+        answer, coalesced, computed = answer_question_coalesced(
+            db, document, question.question_text, chat_history=chat_history, deadline=deadline
+        )
+    if computed:
+        # Followers reuse the leader's answer; only the caller that ran it pays
+        quotas.charge_llm(current_user.id, answer.get("llm_tokens", 0))
     question.answer_text = answer["answer"]
     question.confidence_score = answer["confidence_score"]
-    question.metadata = {
-        **(question.metadata or {}),
-        "sources": answer["sources"]
+
+    # Let the RL policy adjust the response (inference only, no training here)
+    if settings.RL_ENABLED:
+        try:
+            answer = RLService(db).optimize_response(question, answer)
+            question.confidence_score = answer["confidence_score"]
+        except RLModelError as e:
+            logger.warning("RL optimization skipped: %s", e.message, extra={"question_id": question.id})
+    question.meta_data = {
+        **(question.meta_data or {}),
+        "sources": answer["sources"],
+        "coalesced": coalesced,
     }
     db.add(question)
     db.commit()
     db.refresh(question)
+
+    if conversation is not None:
+        conversation_service.fold_into_summary(conversation)
     return question
 
 
-@router.get("/", response_model=List[QuestionSchema])
-def read_questions(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+@router.get("/", response_model=PaginatedResponse[QuestionListItem])
+async def read_questions(
+    db=Depends(deps.get_async_db),
+    page: PageParams = Depends(deps.get_page_params),
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
-    Retrieve questions.
+    Retrieve questions, newest first. Pass ``next_cursor`` back as ``cursor`` for the next page.
     """
-    questions = db.query(Question).filter(
-        Question.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return questions
+    # Answer sources (meta_data) are only returned by GET /questions/{id}
+    statement = select(Question).options(
+        load_schema_columns(Question, QuestionListItem)
+    ).where(Question.user_id == current_user.id)
+    return await paginate_async(db, statement, Question, page, count_key=("questions", current_user.id))
 
 
 @router.get("/{question_id}", response_model=QuestionSchema)
@@ -89,12 +136,16 @@ def read_question(
     *,
     db: Session = Depends(deps.get_db),
     question_id: int,
+    expand_sources: bool = False,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get question by ID.
+    Get question by ID. Sources are chunk references; pass
+    ``expand_sources=true`` to include each chunk's text.
     """
-    question = db.query(Question).filter(
+    question = db.query(Question).options(
+        undefer(Question.answer_text), undefer(Question.meta_data)
+    ).filter(
         Question.id == question_id,
         Question.user_id == current_user.id
     ).first()
@@ -103,20 +154,31 @@ def read_question(
             status_code=404,
             detail="Question not found"
         )
+    if expand_sources and question.meta_data and question.meta_data.get("sources"):
+        result = QuestionSchema.model_validate(question)
+        result.meta_data = {
+            **question.meta_data,
+            "sources": source_refs.expand_sources(db, question.document_id, question.meta_data["sources"]),
+        }
+        return result
     return question
 
 
-@router.delete("/{question_id}", response_model=ResponseBase)
-def delete_question(
+@router.post("/{question_id}/feedback", response_model=QuestionSchema)
+def rate_question(
     *,
     db: Session = Depends(deps.get_db),
     question_id: int,
+    feedback_in: QuestionFeedback,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Delete a question.
+    Rate an answer from 0 to 100. The first rating is the reward for the RL
+    decision made when the answer was created.
     """
-    question = db.query(Question).filter(
+    question = db.query(Question).options(
+        undefer(Question.answer_text), undefer(Question.meta_data)
+    ).filter(
         Question.id == question_id,
         Question.user_id == current_user.id
     ).first()
@@ -125,7 +187,33 @@ def delete_question(
             status_code=404,
             detail="Question not found"
         )
-    
-    db.delete(question)
+    RLService(db).record_feedback(question, feedback_in.score)
+    db.add(question)
     db.commit()
+    db.refresh(question)
+    return question
+
+
+@router.delete("/{question_id}", response_model=ResponseBase)
+async def delete_question(
+    *,
+    db=Depends(deps.get_async_db),
+    question_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Delete a question.
+    """
+    question = await db.scalar(select(Question).options(load_only(Question.id)).where(
+        Question.id == question_id,
+        Question.user_id == current_user.id
+    ))
+    if not question:
+        raise HTTPException(
+            status_code=404,
+            detail="Question not found"
+        )
+
+    await db.delete(question)
+    await db.commit()
     return {"message": "Question deleted successfully"} 
\ No newline at end of file
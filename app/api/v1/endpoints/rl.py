@@ -1 +1,43 @@
+from typing import Any, List
 
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.exceptions import RLModelError
+from app.models.models import User
+from app.schemas.schemas import ResponseBase, RLModelVersion
+from app.services.rl_model_store import RLModelStore
+
+router = APIRouter()
+
+
+@router.get("/models", response_model=List[RLModelVersion])
+def read_model_versions(
+    db: Session = Depends(deps.get_db),
+    limit: int = 50,
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    List stored policy checkpoints, newest first.
+    """
+    return RLModelStore(db).list_versions(limit=limit)
+
+
+@router.post("/models/{version}/activate", response_model=ResponseBase)
+def activate_model_version(
+    *,
+    db: Session = Depends(deps.get_db),
+    version: int,
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Make a stored checkpoint the active policy (e.g. to roll back).
+    Workers pick it up on their next version check.
+    """
+    try:
+        RLModelStore(db).activate(version)
+    except RLModelError as e:
+        e.code = 404
+        raise
+    return {"message": f"Model version {version} activated"}
@@ -1,20 +1,20 @@
-from typing import Any, List
+from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 
 from app.api import deps
 from app.core.exceptions import AuthorizationError
+from app.core.pagination import PageParams
 from app.models.models import User
-from app.schemas.schemas import User as UserSchema
-from app.services.user_service import UserService
+from app.schemas.schemas import PaginatedResponse, User as UserSchema
+from app.services.user_service import AsyncUserService
 
 router = APIRouter()
 
 
 @router.get("/me", response_model=UserSchema)
-def read_user_me(
-    current_user: User = Depends(deps.get_current_active_user),
+async def read_user_me(
+    current_user: User = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Get current user.
@@ -22,38 +22,36 @@ def read_user_me(
     return current_user
 
 
-@router.get("/", response_model=List[UserSchema])
-def read_users(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_superuser),
+@router.get("/", response_model=PaginatedResponse[UserSchema])
+async def read_users(
+    db=Depends(deps.get_async_db),
+    page: PageParams = Depends(deps.get_page_params),
+    current_user: User = Depends(deps.get_current_active_superuser_async),
 ) -> Any:
     """
-    Retrieve users.
+    Retrieve users, newest first.
     """
-    user_service = UserService(db)
-    users = user_service.get_multi(skip=skip, limit=limit)
-    return users
+    user_service = AsyncUserService(db)
+    return await user_service.get_page(page)
 
 
 @router.get("/{user_id}", response_model=UserSchema)
-def read_user_by_id(
+async def read_user_by_id(
     user_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db=Depends(deps.get_async_db),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user_service = UserService(db)
-    user = user_service.get(id=user_id)
+    user_service = AsyncUserService(db)
+    user = await user_service.get(id=user_id)
     if not user:
         raise HTTPException(
             status_code=404,
             detail="User not found",
         )
-    if user == current_user:
+    if user.id == current_user.id:
         return user
     if not current_user.is_superuser:
         raise AuthorizationError("Not enough permissions")
@@ -5,6 +5,9 @@ from app.api.v1.endpoints import (
     users,
     documents,
     questions,
+    conversations,
+    rl,
+    admin,
 )
 
 api_router = APIRouter()
@@ -12,4 +15,7 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
-api_router.include_router(questions.router, prefix="/questions", tags=["questions"]) 
\ No newline at end of file
+api_router.include_router(questions.router, prefix="/questions", tags=["questions"])
+api_router.include_router(conversations.router, prefix="/conversations", tags=["conversations"]) 
+api_router.include_router(rl.router, prefix="/rl", tags=["reinforcement learning"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
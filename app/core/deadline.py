@@ -0,0 +1,26 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """An absolute point in (monotonic) time by which a request must be answered."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    @classmethod
+    def from_header(cls, value_ms: Optional[int], default: float) -> "Deadline":
+        """Honour a client-supplied budget, but never exceed the server default."""
+        if value_ms is not None and value_ms > 0:
+            return cls(min(value_ms / 1000.0, default))
+        return cls(default)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s)"
@@ -56,4 +56,53 @@ class OpenAIError(CustomException):
         message: str = "Error communicating with OpenAI",
         detail: Optional[Any] = None,
     ):
-        super().__init__(message=message, code=500, detail=detail) 
\ No newline at end of file
+        super().__init__(message=message, code=500, detail=detail)
+
+
+class LLMUnavailableError(CustomException):
+    def __init__(
+        self,
+        message: str = "Language model did not answer in time",
+        detail: Optional[Any] = None,
+    ):
+        super().__init__(message=message, code=503, detail=detail)
+
+
+class RLModelError(CustomException):
+    def __init__(
+        self,
+        message: str = "Error in reinforcement learning model",
+        detail: Optional[Any] = None,
+    ):
+        super().__init__(message=message, code=500, detail=detail)
+
+
+class InvalidCursorError(CustomException):
+    def __init__(
+        self,
+        message: str = "Invalid pagination cursor",
+        detail: Optional[Any] = None,
+    ):
+        super().__init__(message=message, code=400, detail=detail)
+
+
+class RateLimitedError(CustomException):
+    def __init__(
+        self,
+        message: str = "Too many requests",
+        detail: Optional[Any] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message=message, code=429, detail=detail)
+        self.retry_after = retry_after
+
+
+class ServiceBusyError(CustomException):
+    def __init__(
+        self,
+        message: str = "Server is busy, try again shortly",
+        detail: Optional[Any] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message=message, code=503, detail=detail)
+        self.retry_after = retry_after
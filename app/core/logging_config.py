@@ -0,0 +1,59 @@
+"""
+Structured logging.
+
+Every record carries the current ``trace_id`` and ``span_id`` (see
+app.core.tracing), so a slow request's log lines can be found from its
+``X-Trace-Id``. ``LOG_FORMAT=json`` writes one JSON object per line,
+including any ``extra={...}`` fields; ``text`` is meant for local runs.
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core.tracing import current_span
+
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class TraceContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = current_span()
+        record.trace_id = span.trace_id if span else None
+        record.span_id = span.span_id if span else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging() -> None:
+    """Install the app's handler on the root logger (once)."""
+    root = logging.getLogger()
+    if any(getattr(handler, "_app_handler", False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler._app_handler = True
+    handler.addFilter(TraceContextFilter())
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s] %(message)s"
+        ))
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
@@ -0,0 +1,67 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Pipeline stages: load, split, embed, db_write, index_build (ingest and first
+# query), query_embed, search, llm, rl (per question)
+STAGE_SECONDS = Histogram(
+    "qa_stage_duration_seconds",
+    "Time spent in each document / question pipeline stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+# HTTP
+REQUEST_SECONDS = Histogram(
+    "qa_http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route", "status"],
+)
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "qa_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],  # hit, miss
+)
+
+# Ingestion
+INGESTION_QUEUE_DEPTH = Gauge(
+    "qa_ingestion_queue_depth",
+    "Uploaded documents waiting for an ingestion worker",
+)
+INGESTION_OLDEST_JOB_AGE = Gauge(
+    "qa_ingestion_oldest_job_age_seconds",
+    "Seconds the oldest queued or running ingestion job has been in the queue (0 when idle)",
+)
+CHUNKS_INGESTED = Counter(
+    "qa_chunks_ingested_total",
+    "Chunks embedded and stored",
+)
+
+# LLM tokens
+LLM_TOKENS = Counter(
+    "qa_llm_tokens_total",
+    "Tokens sent to (prompt) and received from (completion) the LLM",
+    ["direction"],  # sent, received
+)
+
+# Request coalescing
+SINGLEFLIGHT_CALLS = Counter(
+    "qa_singleflight_calls_total",
+    "Calls entering a single-flight group, by role (leader runs, follower waits, timed_out follower gave up and ran)",
+    ["group", "role"],
+)
+
+# LLM calls
+LLM_OUTCOMES = Counter(
+    "qa_llm_outcomes_total",
+    "How each question's LLM step was resolved",
+    ["outcome"],  # primary, hedged, fallback_model, extractive, error
+)
+LLM_HEDGES = Counter(
+    "qa_llm_hedges_total",
+    "Hedged duplicate LLM requests sent after the latency percentile elapsed",
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "qa_llm_circuit_open",
+    "1 while the primary model circuit breaker is open",
+)
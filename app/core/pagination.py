@@ -0,0 +1,97 @@
+"""
+Keyset pagination on ``(created_at, id)``, newest first.
+
+Each page filters on "strictly before the last row of the previous page",
+which the (filter column, created_at) indexes answer with a range seek.
+Deep pages therefore cost the same as the first one, unlike OFFSET, which
+has to walk every skipped row. Cursors are opaque to clients.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Hashable, Optional, Tuple
+
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.orm import Query
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.exceptions import InvalidCursorError
+
+# Totals are cached, so they may lag writes by up to the TTL
+count_cache = TTLCache(settings.PAGINATION_COUNT_TTL_SECONDS, maxsize=4096, name="list_totals")
+
+
+@dataclass
+class PageParams:
+    cursor: Optional[str] = None
+    limit: int = 100
+    include_total: bool = False
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError()
+
+
+def paginate(query: Query, model: Any, params: PageParams, count_key: Optional[Hashable] = None) -> dict:
+    """
+    Fetch one page of ``query`` as a ``PaginatedResponse`` payload.
+
+    ``count_key`` identifies the unpaginated result set (e.g.
+    ``("documents", owner_id)``); when the client asks for a total it is
+    counted once and served from ``count_cache`` afterwards.
+    """
+    total = None
+    if params.include_total and count_key is not None:
+        total = count_cache.get_or_set(
+            count_key, lambda: query.order_by(None).with_entities(func.count(model.id)).scalar()
+        )
+
+    rows = _page(query, model, params).all()
+    return _payload(rows, params, total)
+
+
+async def paginate_async(db, statement: Select, model: Any, params: PageParams, count_key: Optional[Hashable] = None) -> dict:
+    """``paginate`` for a ``select()`` statement on an awaitable session."""
+    total = None
+    if params.include_total and count_key is not None:
+        total = count_cache.get(count_key)
+        if total is None:
+            total = await db.scalar(
+                select(func.count()).select_from(statement.order_by(None).subquery())
+            )
+            count_cache.set(count_key, total)
+
+    rows = (await db.scalars(_page(statement, model, params))).all()
+    return _payload(rows, params, total)
+
+
+def _page(query, model: Any, params: PageParams):
+    """Keyset filter, order and limit; works on both ``Query`` and ``Select``."""
+    if params.cursor:
+        created_at, last_id = decode_cursor(params.cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, last_id))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(params.limit + 1)
+
+
+def _payload(rows: list, params: PageParams, total: Optional[int]) -> dict:
+    has_more = len(rows) > params.limit
+    items = rows[:params.limit]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1].created_at, items[-1].id) if has_more else None,
+        "has_more": has_more,
+        "limit": params.limit,
+        "total": total,
+    }
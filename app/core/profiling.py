@@ -0,0 +1,259 @@
+"""
+On-demand profiling for superusers.
+
+A request sent with ``X-Profile: 1`` by a superuser runs under a sampling
+profiler: a background thread records the stack of every busy thread each
+``PROFILE_SAMPLE_INTERVAL_MS``, so work the handler hands to the threadpool,
+the LLM pool or the ingestion workers is included. Threads parked waiting
+for work (no frame from the app on their stack) are left out. The profile is
+stored in ``PROFILE_DIR`` as folded stacks, the input of flamegraph.pl,
+inferno and speedscope, under the request's trace id, which is returned in
+``X-Profile-Id``.
+
+The module also dumps the current stack of every thread and the top
+allocations seen by tracemalloc (see the admin endpoints).
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import tracing
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+# Leaf frames of a thread waiting for work (or of the idle event loop)
+_IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get")}
+
+Frame = Tuple[str, str, int]  # filename, function, first line
+
+
+def _frames(frame) -> List[Any]:
+    """``frame`` and its callers, outermost first."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    return tuple((f.f_code.co_filename, f.f_code.co_name, f.f_code.co_firstlineno) for f in _frames(frame))
+
+
+def _is_idle(stack: Tuple[Frame, ...]) -> bool:
+    filename, function, _ = stack[-1]
+    if (os.path.basename(filename), function) not in _IDLE_LEAVES:
+        return False
+    return not any(frame[0].startswith(_APP_DIR) for frame in stack)
+
+
+def _label(frame: Frame) -> str:
+    filename, function, line = frame
+    if filename.startswith(_APP_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(_APP_DIR))
+    else:
+        filename = os.path.basename(filename)
+    return f"{function} ({filename}:{line})"
+
+
+class SamplingProfiler:
+    """Wall-clock sampling of all busy threads until ``stop()``."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if not stack or _is_idle(stack):
+                    continue
+                self.stacks[(names.get(ident, str(ident)), stack)] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Folded stacks (``thread;outer;...;inner count`` per line), thread name as the root frame."""
+        labels: Dict[Frame, str] = {}
+        lines = []
+        for (thread, stack), count in self.stacks.most_common():
+            frames = [labels.setdefault(frame, _label(frame)) for frame in stack]
+            lines.append(f"{';'.join([thread] + frames)} {count}\n")
+        return "".join(lines)
+
+
+# Stored profiles
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}.folded")
+
+
+def save_profile(profile_id: str, folded: str) -> None:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(_profile_path(profile_id), "w", encoding="utf-8") as f:
+        f.write(folded)
+    # Keep only the newest PROFILE_MAX_STORED
+    for stale in list_profiles()[settings.PROFILE_MAX_STORED:]:
+        try:
+            os.remove(_profile_path(stale["id"]))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Stored profiles, newest first."""
+    try:
+        entries = list(os.scandir(settings.PROFILE_DIR))
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        profile_id, ext = os.path.splitext(entry.name)
+        if ext == ".folded" and _PROFILE_ID.match(profile_id):
+            stat = entry.stat()
+            profiles.append({"id": profile_id, "size": stat.st_size, "created_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)})
+    profiles.sort(key=lambda profile: profile["created_at"], reverse=True)
+    return profiles
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# Point-in-time dumps
+
+def thread_stacks() -> List[Dict[str, Any]]:
+    """The current stack of every thread, innermost frame last."""
+    threads = {thread.ident: thread for thread in threading.enumerate()}
+    dump = []
+    for ident, frame in sys._current_frames().items():
+        thread = threads.get(ident)
+        dump.append({
+            "ident": ident,
+            "name": thread.name if thread else None,
+            "daemon": thread.daemon if thread else None,
+            "stack": [_label((f.f_code.co_filename, f.f_code.co_name, f.f_lineno)) for f in _frames(frame)],
+        })
+    return dump
+
+
+def top_allocations(limit: int, group_by: str = "lineno") -> Dict[str, Any]:
+    """
+    The largest live allocations by ``group_by`` ("lineno", "filename" or "traceback").
+
+    Tracing is started on the first call (``TRACEMALLOC_FRAMES`` frames per
+    allocation) and slows every allocation until ``stop_allocation_tracing``,
+    so earlier allocations are not seen.
+    """
+    started = False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.TRACEMALLOC_FRAMES)
+        started = True
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "started": started,
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "top": [
+            {
+                "size": stat.size,
+                "count": stat.count,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in snapshot.statistics(group_by)[:limit]
+        ],
+    }
+
+
+def stop_allocation_tracing() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests carrying ``X-Profile`` when ``authorize`` accepts them.
+
+    ``authorize`` gets the request's ``Authorization`` header; anyone else's
+    ``X-Profile`` header is ignored and the request runs normally.
+    """
+
+    def __init__(self, app, authorize: Callable[[Optional[str]], Awaitable[bool]]):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile", b"").lower() not in (b"1", b"true"):
+            await self.app(scope, receive, send)
+            return
+        authorization = headers.get(b"authorization")
+        if not await self.authorize(authorization.decode("latin-1") if authorization else None):
+            await self.app(scope, receive, send)
+            return
+
+        root = tracing.current_span()
+        profile_id = root.trace_id if root else uuid.uuid4().hex
+        tracing.set_attributes({"profile.id": profile_id})
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        profiler = SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await run_in_threadpool(profiler.stop)
+            await run_in_threadpool(save_profile, profile_id, profiler.folded())
+            logger.info(
+                "Stored profile %s", profile_id,
+                extra={"profile_id": profile_id, "samples": profiler.samples,
+                       "duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+            )
@@ -0,0 +1,51 @@
+"""
+Per-user quotas on the expensive endpoints (upload, process, questions).
+
+Four independent limits, each refusing with 429 and ``Retry-After``:
+
+- requests: token bucket of ``QUOTA_REQUESTS_PER_MINUTE`` calls
+- jobs: at most ``QUOTA_MAX_CONCURRENT_JOBS`` ingestions and questions in flight
+- ingest: ``QUOTA_INGEST_BYTES_PER_DAY`` uploaded or reprocessed bytes
+- llm: ``QUOTA_LLM_TOKENS_PER_HOUR`` prompt and answer tokens
+
+LLM usage is only known after the call, so it is charged afterwards and a
+user in debt is refused until the bucket refills.
+"""
+from app.core.config import settings
+from app.core.ratelimit import ConcurrencyLimiter, RateLimiter, Slot
+
+DAY = 24 * 3600
+HOUR = 3600
+
+request_limiter = RateLimiter(
+    "quota_requests", settings.QUOTA_REQUESTS_PER_MINUTE / 60, settings.QUOTA_REQUEST_BURST
+)
+job_limiter = ConcurrencyLimiter("quota_jobs", settings.QUOTA_MAX_CONCURRENT_JOBS)
+ingest_limiter = RateLimiter(
+    "quota_ingest_bytes", settings.QUOTA_INGEST_BYTES_PER_DAY / DAY, settings.QUOTA_INGEST_BYTES_PER_DAY
+)
+llm_limiter = RateLimiter(
+    "quota_llm_tokens", settings.QUOTA_LLM_TOKENS_PER_HOUR / HOUR, settings.QUOTA_LLM_TOKENS_PER_HOUR
+)
+
+
+def check_request(user_id: int) -> None:
+    request_limiter.check(user_id)
+
+
+def acquire_job(user_id: int) -> Slot:
+    return job_limiter.acquire(user_id)
+
+
+def check_ingest(user_id: int, nbytes: int) -> None:
+    # A file larger than the whole allowance waits for a full bucket rather than forever
+    ingest_limiter.check(user_id, min(nbytes, settings.QUOTA_INGEST_BYTES_PER_DAY))
+
+
+def check_llm(user_id: int) -> None:
+    llm_limiter.check(user_id, 0)
+
+
+def charge_llm(user_id: int, tokens: int) -> None:
+    if tokens > 0:
+        llm_limiter.charge(user_id, tokens)
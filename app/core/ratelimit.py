@@ -0,0 +1,242 @@
+"""
+Token buckets and concurrency counters behind rate limits and quotas.
+
+State lives in a backend. ``LocalBackend`` keeps it in this process (the
+default); ``RedisBackend`` shares it between workers and hosts when
+``QUOTA_BACKEND_URL`` points at Redis. Both expose the same four calls, so
+either can stand in for the other.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Hashable
+
+from app.core.config import settings
+from app.core.exceptions import RateLimitedError
+
+
+class TokenBucket:
+    """
+    ``capacity`` tokens, refilled continuously at ``rate`` per second.
+
+    ``take`` either spends ``cost`` tokens and returns 0, or spends nothing
+    and returns how many seconds until that many tokens are available.
+    ``charge`` always spends, and may leave the bucket in debt.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, cost: float = 1.0) -> float:
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def charge(self, cost: float) -> None:
+        self._refill()
+        self.tokens -= cost
+
+
+class LocalBackend:
+    """
+    Buckets and counters in this process.
+
+    Buckets are kept in an LRU bounded by ``maxsize``; an evicted key simply
+    starts again with a full bucket.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._counters: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: Hashable, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def take(self, key: Hashable, rate: float, capacity: float, cost: float = 1.0) -> float:
+        with self._lock:
+            return self._bucket(key, rate, capacity).take(cost)
+
+    def charge(self, key: Hashable, rate: float, capacity: float, cost: float) -> None:
+        with self._lock:
+            self._bucket(key, rate, capacity).charge(cost)
+
+    def acquire(self, key: Hashable, limit: int) -> bool:
+        with self._lock:
+            count = self._counters.get(key, 0)
+            if count >= limit:
+                return False
+            self._counters[key] = count + 1
+            return True
+
+    def release(self, key: Hashable) -> None:
+        with self._lock:
+            count = self._counters.get(key, 0) - 1
+            if count > 0:
+                self._counters[key] = count
+            else:
+                self._counters.pop(key, None)
+
+
+# KEYS[1] = bucket; ARGV = rate, capacity, cost, now, force (1 = charge even if short)
+_TAKE_SCRIPT = """
+local rate, capacity, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost or ARGV[5] == '1' then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - math.min(tokens, 0)) / rate) + 1)
+return tostring(wait)
+"""
+
+# KEYS[1] = counter; ARGV = limit, ttl (so a crashed worker's slots run out)
+_ACQUIRE_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if count > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+return 1
+"""
+
+
+class RedisBackend:
+    """Buckets and counters in Redis, shared by every worker that uses it."""
+
+    COUNTER_TTL_SECONDS = 3600
+
+    def __init__(self, client, prefix: str = "qa:rl:"):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        import redis  # optional dependency, only needed for a shared backend
+
+        return cls(redis.Redis.from_url(url))
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def take(self, key: Hashable, rate: float, capacity: float, cost: float = 1.0) -> float:
+        return float(self._take(keys=[self._key(key)], args=[rate, capacity, cost, time.time(), 0]))
+
+    def charge(self, key: Hashable, rate: float, capacity: float, cost: float) -> None:
+        self._take(keys=[self._key(key)], args=[rate, capacity, cost, time.time(), 1])
+
+    def acquire(self, key: Hashable, limit: int) -> bool:
+        return bool(self._acquire(keys=[self._key(key)], args=[limit, self.COUNTER_TTL_SECONDS]))
+
+    def release(self, key: Hashable) -> None:
+        self.client.decr(self._key(key))
+
+
+@lru_cache()
+def get_backend():
+    if settings.QUOTA_BACKEND_URL:
+        return RedisBackend.from_url(settings.QUOTA_BACKEND_URL)
+    return LocalBackend()
+
+
+class RateLimiter:
+    """One token bucket per key (client IP, account, user id ...)."""
+
+    def __init__(self, name: str, rate: float, burst: float, backend=None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def take(self, key: Hashable, cost: float = 1.0) -> float:
+        """Seconds until ``key`` may proceed; 0 means it was admitted."""
+        return self.backend.take(f"{self.name}:{key}", self.rate, self.burst, cost)
+
+    def charge(self, key: Hashable, cost: float) -> None:
+        """Spend ``cost`` after the fact; later ``take`` calls wait off any debt."""
+        self.backend.charge(f"{self.name}:{key}", self.rate, self.burst, cost)
+
+    def check(self, key: Hashable, cost: float = 1.0) -> None:
+        """Like ``take``, but raises ``RateLimitedError`` when not admitted."""
+        retry_after = self.take(key, cost)
+        if retry_after > 0:
+            raise RateLimitedError(detail={"limit": self.name}, retry_after=retry_after)
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` slots held per key at once."""
+
+    def __init__(self, name: str, limit: int, backend=None):
+        self.name = name
+        self.limit = limit
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def acquire(self, key: Hashable) -> "Slot":
+        """Take a slot, or raise ``RateLimitedError`` if all are in use."""
+        if not self.backend.acquire(f"{self.name}:{key}", self.limit):
+            raise RateLimitedError(
+                message="Too many concurrent jobs",
+                detail={"limit": self.name, "max": self.limit},
+                retry_after=1,
+            )
+        return Slot(self, key)
+
+
+class Slot:
+    """A held ``ConcurrencyLimiter`` slot; ``release`` is idempotent."""
+
+    def __init__(self, limiter: ConcurrencyLimiter, key: Hashable):
+        self._limiter = limiter
+        self._key = key
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter.backend.release(f"{self._limiter.name}:{self._key}")
+
+    def __enter__(self) -> "Slot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
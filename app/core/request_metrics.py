@@ -0,0 +1,61 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.metrics import REQUEST_SECONDS
+
+
+class RequestMetricsMiddleware:
+    """
+    Records every HTTP request in ``qa_http_request_duration_seconds``.
+
+    Requests are labelled with the matched route template (``/documents/{document_id}``),
+    not the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.labels(scope["method"], route_template(scope), str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+def route_template(scope) -> str:
+    """
+    Full path template of the matched route, e.g. ``/api/v1/documents/{document_id}``.
+
+    Routes of included routers may only know their path relative to the
+    router's prefix, so the prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    if route is None or not hasattr(route, "path_regex"):
+        return "unmatched"
+    path = scope["path"]
+    for start in (i for i, char in enumerate(path) if char == "/"):
+        if route.path_regex.match(path[start:]):
+            return path[:start] + route.path_format
+    return route.path_format
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,14 +1,32 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Optional, Tuple, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.exceptions import ServiceBusyError
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = default rounds, so hashes made with any other cost report needs_update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 ALGORITHM = "HS256"
 
+# bcrypt gets its own small pool so a burst of logins cannot occupy the
+# request threadpool; past PASSWORD_HASH_MAX_PENDING callers are turned away
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash"
+)
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -29,4 +47,27 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def _run_hash(fn: Callable, *args: Any) -> Any:
+    if not _hash_slots.acquire(blocking=False):
+        raise ServiceBusyError(retry_after=1)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hash(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify on the hashing pool; returns ``(valid, new_hash)``.
+
+    ``new_hash`` is set when the password was right but the stored hash uses
+    another cost (or scheme) than configured; the caller should store it.
+    """
+    return await _run_hash(pwd_context.verify_and_update, plain_password, hashed_password)
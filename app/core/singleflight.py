@@ -0,0 +1,72 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import SINGLEFLIGHT_CALLS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight block until it finishes and receive the same
+    result (or exception). A follower that gives up after ``timeout`` runs the
+    function itself instead. Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once per in-flight ``key``; returns ``(result, shared)``.
+
+        ``timeout`` bounds how long a follower waits for the leader; on expiry
+        the follower calls ``fn`` independently and gets ``shared=False``.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.labels(group=self.name, role="follower").inc()
+            if not call.done.wait(timeout):
+                SINGLEFLIGHT_CALLS.labels(group=self.name, role="timed_out").inc()
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        SINGLEFLIGHT_CALLS.labels(group=self.name, role="leader").inc()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, call.waiters > 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
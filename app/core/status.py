@@ -0,0 +1,51 @@
+"""
+Detailed worker status for operators, load balancers and autoscalers.
+
+``/ready`` only answers whether this worker should get traffic; ``/status``
+reports why: warmup, the embedding model, the FAISS indexes in memory, the
+ingestion queue, database pools and the LLM circuit breaker. Nothing here
+loads a model or opens a connection.
+"""
+from typing import Any, Dict
+
+from app.core import warmup
+from app.core.config import settings
+
+
+def collect() -> Dict[str, Any]:
+    # Imported here, like warmup, so app.core stays free of service imports
+    from app.db.async_session import get_async_engine
+    from app.db.session import engine, pool_status
+    from app.services.embeddings import embeddings_loaded, vector_indexes
+    from app.services.ingestion import ingestion_queue
+    from app.services.llm_client import primary_breaker, primary_latency
+
+    database = {"sync": pool_status(engine)}
+    if get_async_engine.cache_info().currsize:
+        database["async"] = pool_status(get_async_engine().sync_engine)
+
+    breaker = primary_breaker.as_dict()
+    if not warmup.state.ready:
+        overall = "warming_up"
+    elif breaker["state"] != "closed":
+        overall = "degraded"
+    else:
+        overall = "ready"
+
+    return {
+        "status": overall,
+        "warmup": warmup.state.as_dict(),
+        "embedding_model": {
+            "name": settings.EMBEDDING_MODEL_NAME,
+            "backend": settings.EMBEDDING_BACKEND,
+            "loaded": embeddings_loaded(),
+        },
+        "vector_indexes": vector_indexes.stats(),
+        "ingestion": ingestion_queue.stats(),
+        "database": database,
+        "llm": {
+            "model": settings.MISTRAL_MODEL_NAME,
+            "circuit_breaker": breaker,
+            "p95_latency_seconds": primary_latency.percentile(95),
+        },
+    }
@@ -0,0 +1,298 @@
+"""
+Lightweight OpenTelemetry-style tracing.
+
+``span()`` opens a child of the current span, tracked in a context variable
+so it follows a request into the threadpool. ``TracingMiddleware`` opens
+the root span of each HTTP request: it continues an incoming W3C
+``traceparent`` and returns the trace id in ``X-Trace-Id``. Finished spans
+are exported in batches by a background thread, either as JSON lines to
+``TRACING_FILE_PATH`` or to an OTLP/HTTP collector (``TRACING_EXPORTER``).
+Spans exist even when nothing is exported, so log lines always carry a
+trace id.
+"""
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS
+from app.core.request_metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_UNSET = object()
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attributes(attributes: Dict[str, Any]) -> None:
+    """Add attributes to the current span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attributes(attributes)
+
+
+def remote_parent(traceparent: Optional[str]) -> Optional[Span]:
+    """The caller's span from a W3C ``traceparent`` header, to continue its trace."""
+    match = _TRACEPARENT.match(traceparent or "")
+    if not match:
+        return None
+    return Span(name="remote", trace_id=match.group(1), span_id=match.group(2))
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, parent: Any = _UNSET) -> Iterator[Span]:
+    """
+    Open a span as the current one for the duration of the block.
+
+    ``parent`` defaults to the current span; pass a span captured elsewhere
+    (e.g. when work moves to a background thread) or ``None`` for a new trace.
+    """
+    if parent is _UNSET:
+        parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else _new_id(16),
+        span_id=_new_id(8),
+        parent_id=parent.span_id if parent else None,
+        attributes=dict(attributes or {}),
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        get_exporter().export(current)
+
+
+@contextmanager
+def stage(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """A pipeline-stage span that is also recorded in ``qa_stage_duration_seconds``."""
+    started = time.perf_counter()
+    try:
+        with span(name, attributes) as current:
+            yield current
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+# Exporters
+
+class NoopExporter:
+    def export(self, span: Span) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class BatchExporter:
+    """Queues finished spans and hands them to ``export_batch`` from one background thread."""
+
+    def __init__(self, export_batch: Callable[[List[Span]], None], batch_size: int = 512,
+                 interval: float = 1.0, max_queue: int = 10000):
+        self.export_batch = export_batch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._loop, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1  # never block a request on tracing
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything queued so far has been exported."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            until = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, until - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.export_batch(batch)
+            except Exception as e:
+                logger.warning("Dropped %d spans: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def write_jsonl(path: str) -> Callable[[List[Span]], None]:
+    def export_batch(spans: List[Span]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.as_dict(), default=str) + "\n")
+
+    return export_batch
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP/HTTP JSON encoding of ``spans`` (ExportTraceServiceRequest)."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "app"},
+                "spans": [
+                    {
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        "parentSpanId": span.parent_id or "",
+                        "name": span.name,
+                        "kind": 1,  # internal
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": _otlp_attributes(span.attributes),
+                        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                    }
+                    for span in spans
+                ],
+            }],
+        }]
+    }
+
+
+def post_otlp(endpoint: str, service_name: str) -> Callable[[List[Span]], None]:
+    def export_batch(spans: List[Span]) -> None:
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps(otlp_payload(spans, service_name)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+
+    return export_batch
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                if settings.TRACING_EXPORTER == "file":
+                    _exporter = BatchExporter(write_jsonl(settings.TRACING_FILE_PATH))
+                elif settings.TRACING_EXPORTER == "otlp":
+                    _exporter = BatchExporter(
+                        post_otlp(settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+                    )
+                else:
+                    _exporter = NoopExporter()
+    return _exporter
+
+
+class TracingMiddleware:
+    """Root span per HTTP request, named after the matched route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = remote_parent(headers.get(b"traceparent", b"").decode("latin-1"))
+        with span(f"{scope['method']} {scope['path']}", {"http.method": scope["method"]}, parent=parent) as root:
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    root.attributes["http.status_code"] = message["status"]
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-trace-id", root.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = route_template(scope)
+                root.name = f"{scope['method']} {route}"
+                root.attributes["http.route"] = route
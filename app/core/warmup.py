@@ -0,0 +1,114 @@
+"""
+Controlled warmup of the heavy parts of the stack.
+
+The web layer imports none of torch, langchain, the document loaders or
+sentence-transformers. They are loaded here, in a background thread started
+from the app lifespan, while /ready reports 503 until everything is warm.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, float] = {}  # step name -> seconds
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None and not self.errors
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "in_progress": self.started_at is not None and self.finished_at is None,
+            "duration_seconds": self.duration,
+            "steps": dict(self.steps),
+            "errors": dict(self.errors),
+        }
+
+
+state = WarmupState()
+
+
+def _load_langchain() -> None:
+    from app.services.qa_service import get_qa_prompt
+    import langchain.chains  # noqa: F401
+    import langchain_community.vectorstores  # noqa: F401
+
+    get_qa_prompt()
+
+
+def _load_embedding_model() -> None:
+    from app.services.embeddings import get_embeddings
+
+    get_embeddings().embed_query("warmup")
+
+
+def _load_document_loaders() -> None:
+    import langchain_text_splitters  # noqa: F401
+    from app.services.document_processor import LOADER_MAPPING, get_loader
+
+    for extension in LOADER_MAPPING:
+        get_loader(extension)
+
+
+def _load_llm_clients() -> None:
+    from app.core.config import settings
+    from app.services.qa_service import get_chain_for_model
+
+    get_chain_for_model(settings.MISTRAL_MODEL_NAME)
+    if settings.MISTRAL_FALLBACK_MODEL_NAME:
+        get_chain_for_model(settings.MISTRAL_FALLBACK_MODEL_NAME)
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("langchain", _load_langchain),
+    ("embedding_model", _load_embedding_model),
+    ("document_loaders", _load_document_loaders),
+    ("llm_clients", _load_llm_clients),
+]
+
+
+def run_warmup() -> WarmupState:
+    """Run every step, recording its duration; a failing step keeps the worker unready."""
+    state.started_at = time.monotonic()
+    state.finished_at = None
+    state.errors.clear()
+    for name, step in WARMUP_STEPS:
+        started = time.monotonic()
+        try:
+            step()
+        except Exception as e:
+            state.errors[name] = f"{type(e).__name__}: {e}"
+            logger.warning("Warmup step failed", extra={"step": name, "error": state.errors[name]})
+        state.steps[name] = time.monotonic() - started
+    state.finished_at = time.monotonic()
+    return state
+
+
+def start_in_background() -> None:
+    with state._lock:
+        if state._thread and state._thread.is_alive():
+            return
+        state._thread = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+        state._thread.start()
+
+
+def mark_ready() -> None:
+    """Used when warmup is disabled: heavy modules load on first request instead."""
+    state.started_at = state.finished_at = time.monotonic()
@@ -0,0 +1,133 @@
+"""
+Async database access for ``async def`` endpoints.
+
+With ``DB_ASYNC_DRIVER`` on (the default) sessions come from an async engine
+on aiosqlite / asyncpg, derived from ``DATABASE_URL`` unless
+``ASYNC_DATABASE_URL`` is set. With it off, the same awaitable API is backed
+by the sync engine, each call running in the threadpool. Either way the
+event loop never waits on the database.
+"""
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal, _set_sqlite_pragmas
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+@lru_cache()
+def get_async_engine():
+    # Imported here so the sync-only setup never needs greenlet or the async drivers
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL))
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=True,
+        )
+
+    if url.database in (None, "", ":memory:"):
+        return create_async_engine(url, poolclass=StaticPool)
+
+    # aiosqlite defaults file databases to NullPool; pool them like the sync engine
+    engine = create_async_engine(
+        url,
+        connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    )
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@lru_cache()
+def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # Objects stay usable after commit; async sessions cannot lazy-load expired attributes
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+class ThreadedSession:
+    """
+    The subset of ``AsyncSession`` the endpoints use, over a sync ``Session``.
+
+    Every database round trip runs in the threadpool. Results are buffered
+    there too, so reading rows afterwards does no I/O on the loop.
+    """
+
+    _EXECUTE_OPTIONS = {"prebuffer_rows": True}
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, params=None, **kwargs):
+        kwargs.setdefault("execution_options", self._EXECUTE_OPTIONS)
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance: Any, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[Any]:
+    if settings.DB_ASYNC_DRIVER:
+        async with get_async_sessionmaker()() as session:
+            yield session
+        return
+
+    session = ThreadedSession(SessionLocal(expire_on_commit=False))
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -1,4 +1,4 @@
 # Import all the models, so that Base has them before being
 # imported by Alembic
 from app.db.session import Base
-from app.models.models import User, Document, DocumentEmbedding, Question 
\ No newline at end of file
+from app.models.models import User, Document, DocumentEmbedding, Question, Conversation, RLModelState 
\ No newline at end of file
@@ -0,0 +1,21 @@
+from functools import lru_cache
+from typing import Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+
+
+@lru_cache()
+def _schema_columns(model, schema: Type[BaseModel]) -> tuple:
+    mapped = model.__mapper__.column_attrs.keys()
+    return tuple(getattr(model, name) for name in schema.model_fields if name in mapped)
+
+
+def load_schema_columns(model, schema: Type[BaseModel]):
+    """
+    ``load_only`` the columns a response schema actually returns.
+
+    Everything else (including columns deferred on the model) stays in the
+    database, so list queries only transfer what gets serialized.
+    """
+    return load_only(*_schema_columns(model, schema))
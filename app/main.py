@@ -1,54 +1,58 @@
+import math
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.api.deps import is_superuser_authorization
+from app.core import status, tracing, warmup
 from app.core.config import settings
 from app.api.v1.router import api_router
 from app.core.exceptions import CustomException
+from app.core.logging_config import configure_logging
+from app.core.profiling import ProfilingMiddleware
+from app.core.request_metrics import RequestMetricsMiddleware, metrics_endpoint
+from app.services.document_cleanup import document_cleanup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy models load in the background; /ready flips once they are warm
+    if settings.WARMUP_ON_STARTUP:
+        warmup.start_in_background()
+    else:
+        warmup.mark_ready()
+    # Finish deletions interrupted by a restart
+    document_cleanup.resume()
+    yield
+    tracing.get_exporter().flush()
 
-app = FastAPI(
-    title="AI Document Q&A System",
-    docs_url="/docs",
-    redoc_url="/redoc",
-)
-
-# Enable CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Add trusted host middleware
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["*"]  # In production, replace with actual allowed hosts
-)
-
-# Include API router
-app.include_router(api_router, prefix=settings.API_V1_STR)
 
 # Exception handlers
-@app.exception_handler(CustomException)
 async def custom_exception_handler(request, exc: CustomException):
+    headers = None
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
     return JSONResponse(
         status_code=exc.code,
         content={"message": exc.message, "detail": exc.detail},
+        headers=headers,
     )
 
-@app.exception_handler(StarletteHTTPException)
+
 async def http_exception_handler(request, exc: StarletteHTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail},
     )
 
-@app.exception_handler(RequestValidationError)
+
 async def validation_exception_handler(request, exc: RequestValidationError):
     return JSONResponse(
         status_code=422,
@@ -58,7 +62,7 @@ async def validation_exception_handler(request, exc: RequestValidationError):
         },
     )
 
-@app.get("/")
+
 async def root():
     return {
         "message": "Welcome to AI Document Q&A System",
@@ -66,9 +70,71 @@ async def root():
         "redoc_url": "/redoc",
     }
 
-@app.get("/health")
+
 async def health_check():
     return {
         "status": "healthy",
         "version": "1.0.0",
-    } 
\ No newline at end of file
+    }
+
+
+async def readiness_check():
+    if not warmup.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "warmup": warmup.state.as_dict()},
+        )
+    return {"status": "ready", "warmup": warmup.state.as_dict()}
+
+
+async def status_check():
+    return await run_in_threadpool(status.collect)
+
+
+def create_app() -> FastAPI:
+    configure_logging()
+    app = FastAPI(
+        title="AI Document Q&A System",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan,
+    )
+
+    # Enable CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Add trusted host middleware
+    app.add_middleware(
+        TrustedHostMiddleware,
+        allowed_hosts=["*"]  # In production, replace with actual allowed hosts
+    )
+
+    # X-Profile from a superuser runs the request under the sampling profiler
+    app.add_middleware(ProfilingMiddleware, authorize=is_superuser_authorization)
+    # Root span per request; logs from the request carry its trace id
+    app.add_middleware(tracing.TracingMiddleware)
+    # Outermost, so the latency includes the other middleware
+    app.add_middleware(RequestMetricsMiddleware)
+
+    # Include API router
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    app.add_exception_handler(CustomException, custom_exception_handler)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route("/ready", readiness_check, methods=["GET"])
+    app.add_api_route("/status", status_check, methods=["GET"])
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    return app
+
+
+app = create_app()
@@ -1,12 +1,16 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index, Text, JSON, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 from app.db.session import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination order for the admin user list
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -19,14 +23,19 @@ class User(Base):
 
     documents = relationship("Document", back_populates="owner")
     questions = relationship("Question", back_populates="user")
+    conversations = relationship("Conversation", back_populates="user")
 
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Owner listings and ownership checks
+        Index("ix_documents_owner_id_created_at", "owner_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    content = Column(Text)
+    content = deferred(Column(Text))  # full extracted text; undefer(Document.content) to load it
     file_path = Column(String)
     file_type = Column(String)
     file_size = Column(Integer)  # in bytes
@@ -34,7 +43,11 @@ class Document(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     processed_at = Column(DateTime, nullable=True)
-    processing_status = Column(String, default="pending")  # pending, processing, completed, failed
+    processing_status = Column(String, default="pending")  # pending, processing, completed, failed, deleting
+    index_version = Column(Integer, default=0)  # bumped every time the chunks are rebuilt
+    summary = Column(Text, nullable=True)
+    summary_index_version = Column(Integer, nullable=True)  # index_version the summary was built from
+    deleted_at = Column(DateTime, nullable=True)  # tombstone; rows are removed by the cleanup job
     meta_data = Column(JSON, nullable=True)  # Store document metadata
 
     owner = relationship("User", back_populates="documents")
@@ -44,11 +57,17 @@ class Document(Base):
 
 class DocumentEmbedding(Base):
     __tablename__ = "document_embeddings"
+    __table_args__ = (
+        # Every retrieval loads one document's chunks in order
+        Index("ix_document_embeddings_document_id_chunk_index", "document_id", "chunk_index"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"))
     chunk_index = Column(Integer)
     chunk_text = Column(Text)
+    start_offset = Column(Integer, nullable=True)  # character span in the loaded text
+    end_offset = Column(Integer, nullable=True)
     embedding = Column(JSON)  # Store vector embeddings
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -57,16 +76,57 @@ class DocumentEmbedding(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_user_id_created_at", "user_id", "created_at"),
+        Index("ix_questions_document_id", "document_id"),
+        Index("ix_questions_conversation_id_id", "conversation_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     document_id = Column(Integer, ForeignKey("documents.id"))
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=True)
     question_text = Column(Text, nullable=False)
-    answer_text = Column(Text)
+    answer_text = deferred(Column(Text))
     confidence_score = Column(Integer)  # 0-100
+    feedback_score = Column(Integer, nullable=True)  # user rating 0-100, reward for the RL policy
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    meta_data = Column(JSON, nullable=True)  # Store additional question metadata
+    meta_data = deferred(Column(JSON, nullable=True))  # Store additional question metadata (answer sources)
 
     user = relationship("User", back_populates="questions")
-    document = relationship("Document", back_populates="questions") 
\ No newline at end of file
+    document = relationship("Document", back_populates="questions")
+    conversation = relationship("Conversation", back_populates="questions")
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    document_id = Column(Integer, ForeignKey("documents.id"))
+    title = Column(String, nullable=True)
+    summary = Column(Text, nullable=True)  # rolling summary of turns older than the window
+    summarized_until_id = Column(Integer, default=0)  # last question id folded into summary
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", back_populates="conversations")
+    questions = relationship("Question", back_populates="conversation", order_by="Question.id")
+
+
+class RLModelState(Base):
+    __tablename__ = "rl_model_states"
+    __table_args__ = (UniqueConstraint("model_name", "version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_name = Column(String, nullable=False, index=True)
+    version = Column(Integer, nullable=False)  # increases by one per saved checkpoint
+    checkpoint = Column(LargeBinary, nullable=False)  # npz archive of the state_dict arrays
+    metrics = Column(JSON, nullable=True)
+    is_active = Column(Boolean, default=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
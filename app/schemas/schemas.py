@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from pydantic import BaseModel, Field, validator
 from uuid import UUID
 
@@ -100,6 +100,7 @@ class DocumentEmbedding(DocumentEmbeddingBase):
 class QuestionBase(BaseModel):
     question_text: str
     document_id: int
+    conversation_id: Optional[int] = None
     meta_data: Optional[Dict[str, Any]] = None
 
 
@@ -120,6 +121,7 @@ class QuestionInDBBase(QuestionBase):
     user_id: int
     answer_text: Optional[str]
     confidence_score: Optional[int]
+    feedback_score: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -131,6 +133,92 @@ class Question(QuestionInDBBase):
     pass
 
 
+class QuestionFeedback(BaseModel):
+    """The user's rating of an answer; it is the reward for the RL policy."""
+    score: int = Field(..., ge=0, le=100)
+
+
+class QuestionListItem(BaseModel):
+    """A question without its metadata (answer sources), as returned by list endpoints."""
+    id: int
+    user_id: int
+    document_id: int
+    conversation_id: Optional[int] = None
+    question_text: str
+    answer_text: Optional[str]
+    confidence_score: Optional[int]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Conversation schemas
+class ConversationBase(BaseModel):
+    document_id: int
+    title: Optional[str] = None
+
+
+class ConversationCreate(ConversationBase):
+    pass
+
+
+class Conversation(ConversationBase):
+    id: int
+    user_id: int
+    summary: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationWithQuestions(Conversation):
+    questions: List[QuestionListItem] = []
+
+
+# RL model schemas
+class RLModelVersion(BaseModel):
+    id: int
+    model_name: str
+    version: int
+    metrics: Optional[Dict[str, Any]] = None
+    is_active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Admin / profiling schemas
+class ProfileInfo(BaseModel):
+    id: str  # trace id of the profiled request
+    size: int
+    created_at: datetime
+
+
+class ThreadStack(BaseModel):
+    ident: int
+    name: Optional[str] = None
+    daemon: Optional[bool] = None
+    stack: List[str]  # innermost frame last
+
+
+class AllocationStat(BaseModel):
+    size: int
+    count: int
+    traceback: List[str]
+
+
+class AllocationReport(BaseModel):
+    started: bool  # tracing was off and has just been started
+    traced_bytes: int
+    peak_traced_bytes: int
+    top: List[AllocationStat]
+
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
@@ -147,12 +235,15 @@ class ResponseBase(BaseModel):
     detail: Optional[Any] = None
 
 
-class PaginatedResponse(BaseModel):
-    total: int
-    page: int
-    size: int
-    pages: int
-    items: List[Any]
+T = TypeVar("T")
+
+
+class PaginatedResponse(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+    has_more: bool = False
+    limit: int
+    total: Optional[int] = None  # approximate; only with ?include_total=true
 
 
 # File upload schemas
@@ -0,0 +1,148 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@dataclass
+class ContextChunk:
+    text: str
+    chunk_index: int
+    rank: int  # 0 is the most relevant
+    start: Optional[int] = None
+    end: Optional[int] = None
+    embedding_id: Optional[int] = None
+    score: Optional[float] = None
+
+
+@dataclass
+class ContextSpan:
+    """A contiguous piece of the document built from one or more chunks."""
+    text: str
+    rank: int
+    chunks: List[ContextChunk] = field(default_factory=list)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    spans: List[ContextSpan]
+
+    @property
+    def chunks(self) -> List[ContextChunk]:
+        return [chunk for span in self.spans for chunk in span.chunks]
+
+
+@lru_cache()
+def get_tokenizer() -> Callable[[str], List]:
+    """Load the tokenizer once; falls back to a word/punctuation approximation."""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return encoding.encode
+    except Exception:
+        return TOKEN_PATTERN.findall
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring a word boundary."""
+    if max_tokens <= 0:
+        return ""
+    matches = list(TOKEN_PATTERN.finditer(text))
+    if len(matches) <= max_tokens:
+        return text
+    # The approximation is conservative for real tokenizers, so shrink until it fits
+    cut = matches[max_tokens - 1].end()
+    tokenize = get_tokenizer()
+    while cut > 0 and len(tokenize(text[:cut])) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut].rstrip()
+
+
+def _text_overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge(span: ContextSpan, chunk: ContextChunk, max_overlap: int) -> bool:
+    """Append chunk to span if they are adjacent or overlapping. Returns True on merge."""
+    last = span.chunks[-1]
+    if chunk.chunk_index != last.chunk_index + 1:
+        return False
+
+    if last.end is not None and chunk.start is not None and chunk.end is not None:
+        if chunk.start > last.end or chunk.start < (last.start or 0):
+            return False
+        skip = min(last.end - chunk.start, len(chunk.text))
+    else:
+        skip = _text_overlap(span.text, chunk.text, max_overlap)
+
+    tail = chunk.text[skip:]
+    joiner = "" if skip or not tail or span.text[-1:].isspace() else "\n"
+    span.text = span.text + joiner + tail
+    span.rank = min(span.rank, chunk.rank)
+    span.chunks.append(chunk)
+    return True
+
+
+def merge_chunks(chunks: List[ContextChunk], max_overlap: int = 1000) -> List[ContextSpan]:
+    """Merge neighbouring chunks into spans, dropping duplicated overlap text."""
+    unique = {}
+    for chunk in chunks:
+        if chunk.chunk_index not in unique or chunk.rank < unique[chunk.chunk_index].rank:
+            unique[chunk.chunk_index] = chunk
+
+    spans: List[ContextSpan] = []
+    for chunk in sorted(unique.values(), key=lambda c: c.chunk_index):
+        if spans and _merge(spans[-1], chunk, max_overlap):
+            continue
+        spans.append(ContextSpan(text=chunk.text, rank=chunk.rank, chunks=[chunk]))
+    return spans
+
+
+def pack_context(
+    chunks: List[ContextChunk],
+    token_budget: int,
+    separator: str = "\n\n",
+) -> PackedContext:
+    """
+    Build the prompt context from retrieved chunks.
+
+    Overlapping/adjacent chunks are merged first, then spans are added in
+    order of relevance until the token budget is used up. The most relevant
+    span is truncated rather than dropped if it alone exceeds the budget.
+    """
+    spans = sorted(merge_chunks(chunks), key=lambda s: s.rank)
+    separator_tokens = count_tokens(separator)
+
+    packed: List[ContextSpan] = []
+    used = 0
+    for span in spans:
+        cost = count_tokens(span.text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(span)
+            used += cost
+        elif not packed:
+            span.text = truncate_to_tokens(span.text, token_budget)
+            if span.text:
+                packed.append(span)
+                used = count_tokens(span.text)
+            break
+
+    return PackedContext(
+        text=separator.join(span.text for span in packed),
+        tokens=used,
+        spans=packed,
+    )
@@ -0,0 +1,129 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy.orm import Session, load_only, selectinload
+
+from app.core.config import settings
+from app.core.pagination import PageParams, paginate
+from app.db.loading import load_schema_columns
+from app.models.models import Conversation, Question
+from app.schemas.schemas import ConversationCreate, QuestionListItem
+from app.services.context_packer import count_tokens, truncate_to_tokens
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Prompt history only needs the text of each turn, not its metadata
+_TURN_COLUMNS = load_only(Question.id, Question.question_text, Question.answer_text)
+
+
+@dataclass
+class ConversationHistory:
+    summary: Optional[str] = None
+    turns: List[str] = field(default_factory=list)
+
+    def as_prompt_lines(self) -> List[str]:
+        lines = []
+        if self.summary:
+            lines.append(f"Summary of earlier conversation: {self.summary}")
+        lines.extend(self.turns)
+        return lines
+
+
+def _first_sentence(text: str) -> str:
+    return SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+
+
+class ConversationService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, conversation_id: int, user_id: int, with_questions: bool = False) -> Optional[Conversation]:
+        query = self.db.query(Conversation)
+        if with_questions:
+            query = query.options(
+                selectinload(Conversation.questions).options(load_schema_columns(Question, QuestionListItem))
+            )
+        return query.filter(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id,
+        ).first()
+
+    def get_page(self, user_id: int, params: PageParams) -> dict:
+        query = self.db.query(Conversation).filter(Conversation.user_id == user_id)
+        return paginate(query, Conversation, params, count_key=("conversations", user_id))
+
+    def create(self, *, obj_in: ConversationCreate, user_id: int) -> Conversation:
+        conversation = Conversation(
+            user_id=user_id,
+            document_id=obj_in.document_id,
+            title=obj_in.title,
+        )
+        self.db.add(conversation)
+        self.db.commit()
+        self.db.refresh(conversation)
+        return conversation
+
+    def _recent_turns(self, conversation: Conversation, before_id: Optional[int] = None) -> List[Question]:
+        query = self.db.query(Question).options(_TURN_COLUMNS).filter(
+            Question.conversation_id == conversation.id,
+            Question.answer_text.isnot(None),
+        )
+        if before_id is not None:
+            query = query.filter(Question.id < before_id)
+        turns = query.order_by(Question.id.desc()).limit(
+            settings.CONVERSATION_WINDOW_TURNS
+        ).all()
+        return list(reversed(turns))
+
+    def get_history(
+        self, conversation: Conversation, before_id: Optional[int] = None
+    ) -> ConversationHistory:
+        """
+        History for the prompt: the rolling summary plus the last few turns.
+
+        Each turn is capped at CONVERSATION_TURN_MAX_TOKENS, so the history
+        size is bounded no matter how long the conversation gets.
+        """
+        turns = [
+            "Human: {}\nAI Assistant: {}".format(
+                truncate_to_tokens(turn.question_text, settings.CONVERSATION_TURN_MAX_TOKENS),
+                truncate_to_tokens(turn.answer_text, settings.CONVERSATION_TURN_MAX_TOKENS),
+            )
+            for turn in self._recent_turns(conversation, before_id)
+        ]
+        return ConversationHistory(summary=conversation.summary, turns=turns)
+
+    def fold_into_summary(self, conversation: Conversation) -> None:
+        """
+        Fold turns that have slid out of the window into the rolling summary.
+
+        Only turns newer than ``summarized_until_id`` are touched, so each turn
+        is summarized exactly once; older summary lines are dropped from the
+        front once the summary exceeds its token budget.
+        """
+        window = self._recent_turns(conversation)
+        if not window:
+            return
+        expired = self.db.query(Question).options(_TURN_COLUMNS).filter(
+            Question.conversation_id == conversation.id,
+            Question.answer_text.isnot(None),
+            Question.id > (conversation.summarized_until_id or 0),
+            Question.id < window[0].id,
+        ).order_by(Question.id).all()
+        if not expired:
+            return
+
+        lines = conversation.summary.split("\n") if conversation.summary else []
+        for turn in expired:
+            lines.append("Asked: {} Answered: {}".format(
+                truncate_to_tokens(turn.question_text, 60),
+                truncate_to_tokens(_first_sentence(turn.answer_text), 60),
+            ))
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > settings.CONVERSATION_SUMMARY_MAX_TOKENS:
+            lines.pop(0)
+
+        conversation.summary = "\n".join(lines)
+        conversation.summarized_until_id = expired[-1].id
+        self.db.add(conversation)
+        self.db.commit()
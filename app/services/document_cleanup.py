@@ -0,0 +1,139 @@
+"""
+Background removal of deleted documents.
+
+``DELETE /documents/{id}`` only writes a tombstone (``deleted_at``), which
+hides the document from every lookup. This job then deletes its chunks,
+questions and conversations in short batches, removes the file and the row,
+and lets SQLite return the freed pages. Tombstones left by a crash are
+picked up again at startup.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from sqlalchemy.orm import Session, load_only
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.pagination import count_cache
+from app.models.models import Conversation, Document, DocumentEmbedding, Question
+
+logger = logging.getLogger(__name__)
+
+
+def invalidate_document_caches(document_id: int, owner_id: int) -> None:
+    from app.services.embeddings import vector_indexes
+
+    vector_indexes.evict(document_id)
+    for kind in ("documents", "questions", "conversations"):
+        count_cache.invalidate((kind, owner_id))
+
+
+class DocumentCleanup:
+    def __init__(self):
+        # One worker: cleanups are I/O bound and should not compete with requests for the DB
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-cleanup")
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, document_id: int, owner_id: int) -> None:
+        invalidate_document_caches(document_id, owner_id)
+        with self._lock:
+            if document_id in self._pending:
+                return
+            self._pending.add(document_id)
+        self._executor.submit(self._run, document_id, tracing.current_span())
+
+    def resume(self) -> int:
+        """Resubmit every tombstoned document; returns how many were found."""
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            tombstones = db.query(Document.id, Document.owner_id).filter(
+                Document.deleted_at.isnot(None)
+            ).all()
+        finally:
+            db.close()
+        for document_id, owner_id in tombstones:
+            self.submit(document_id, owner_id)
+        return len(tombstones)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _delete_in_batches(self, db: Session, model, criterion) -> int:
+        # Short transactions, so other writers are never locked out for long
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.query(model.id).filter(criterion).limit(settings.DOCUMENT_DELETE_BATCH_SIZE)]
+            if not ids:
+                return deleted
+            db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+
+    def _run(self, document_id: int, parent: Optional[tracing.Span]) -> None:
+        with tracing.span("document.cleanup", {"document.id": document_id}, parent=parent) as cleanup_span:
+            self._cleanup(document_id, cleanup_span)
+
+    def _cleanup(self, document_id: int, cleanup_span: tracing.Span) -> None:
+        from app.db.session import SessionLocal
+        from app.services.ingestion import ingestion_queue
+
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            # Let a running ingestion finish first, or it would write chunks after we are done
+            ingestion_queue.wait_until_idle(document_id, settings.DOCUMENT_DELETE_INGESTION_WAIT_SECONDS)
+
+            document = db.query(Document).options(
+                load_only(Document.id, Document.owner_id, Document.file_path, Document.deleted_at)
+            ).filter(Document.id == document_id).first()
+            if document is None or document.deleted_at is None:
+                return
+            owner_id, file_path = document.owner_id, document.file_path
+
+            chunks = self._delete_in_batches(db, DocumentEmbedding, DocumentEmbedding.document_id == document_id)
+            questions = self._delete_in_batches(db, Question, Question.document_id == document_id)
+            db.query(Conversation).filter(Conversation.document_id == document_id).delete(synchronize_session=False)
+            db.query(Document).filter(Document.id == document_id).delete(synchronize_session=False)
+            db.commit()
+
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            if db.get_bind().dialect.name == "sqlite":
+                # Return freed pages to the filesystem (needs auto_vacuum=INCREMENTAL, set by init_db).
+                # Outside the session's transaction, and through executescript: a plain
+                # execute() steps the pragma once, which frees a single page.
+                raw = db.get_bind().raw_connection()
+                try:
+                    raw.driver_connection.executescript("PRAGMA incremental_vacuum")
+                finally:
+                    raw.close()
+            invalidate_document_caches(document_id, owner_id)
+            cleanup_span.set_attributes({"chunks": chunks, "questions": questions})
+            logger.info(
+                "Deleted document",
+                extra={
+                    "document_id": document_id,
+                    "chunks": chunks,
+                    "questions": questions,
+                    "seconds": round(time.monotonic() - started, 3),
+                },
+            )
+        except Exception:
+            # The tombstone stays; the next startup retries
+            logger.exception("Cleanup of document failed", extra={"document_id": document_id})
+            db.rollback()
+        finally:
+            db.close()
+            with self._lock:
+                self._pending.discard(document_id)
+
+
+document_cleanup = DocumentCleanup()
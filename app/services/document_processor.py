@@ -1,45 +1,58 @@
+import logging
 import os
+import importlib
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import (
-    TextLoader,
-    PDFMinerLoader,
-    Docx2txtLoader,
-    UnstructuredMarkdownLoader,
-)
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 from app.core.config import settings
 from app.models.models import Document, DocumentEmbedding, Question
 from app.core.exceptions import DocumentProcessingError
+from app.core import tracing
+from app.core.metrics import CHUNKS_INGESTED
+from app.services.embeddings import get_embeddings
+from app.services.summary_service import SummaryService
 
-# Map file extensions to appropriate loaders
+logger = logging.getLogger(__name__)
+
+# Map file extensions to appropriate loaders. Loaders pull in pdfminer,
+# docx2txt and unstructured, so they are imported only when a file of
+# that type is processed.
 LOADER_MAPPING = {
-    ".txt": TextLoader,
-    ".pdf": PDFMinerLoader,
-    ".docx": Docx2txtLoader,
-    ".md": UnstructuredMarkdownLoader,
+    ".txt": "TextLoader",
+    ".pdf": "PDFMinerLoader",
+    ".docx": "Docx2txtLoader",
+    ".md": "UnstructuredMarkdownLoader",
 }
 
+
+def get_loader(file_extension: str):
+    module = importlib.import_module("langchain_community.document_loaders")
+    return getattr(module, LOADER_MAPPING[file_extension])
+
+
 class DocumentProcessor:
     def __init__(self, db: Session):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
         self.db = db
-        # Use a simple approach for embeddings since OpenAI might not be available
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
+            add_start_index=True,
         )
-        # Initialize FAISS and HuggingFaceEmbeddings for local vector search
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2", model_kwargs={"device": "cpu"})
+        # Shared, lazily loaded embedding model
+        self.embeddings = get_embeddings()
 
     def process_document(self, document: Document) -> None:
         """Process a document and store its embeddings."""
-        print("process_document called for document:", document.id)
+        with tracing.span("document.process", {"document.id": document.id}):
+            self._process_document(document)
+
+    def _process_document(self, document: Document) -> None:
+        logger.info("Processing document", extra={"document_id": document.id})
         try:
             # Update document status
             document.processing_status = "processing"
@@ -52,44 +65,69 @@ class DocumentProcessor:
                     f"Unsupported file type: {file_extension}"
                 )
 
-            loader = LOADER_MAPPING[file_extension](document.file_path)
-            documents = loader.load()
+            with tracing.stage("load", {"file.type": file_extension, "file.size": document.file_size}):
+                loader = get_loader(file_extension)(document.file_path)
+                documents = loader.load()
 
             # Split text into chunks
-            chunks = self.text_splitter.split_documents(documents)
+            with tracing.stage("split") as split_span:
+                chunks = self.text_splitter.split_documents(documents)
+                split_span.set_attributes({"chunks": len(chunks)})
 
             # Prepare Pinecone records for raw text ingestion
-            for i, chunk in enumerate(chunks):
-                # Store chunk in database and generate embedding
-                embedding = self.embeddings.embed_documents([chunk.page_content])[0]
-                doc_embedding = DocumentEmbedding(
-                    document_id=document.id,
-                    chunk_index=i,
-                    chunk_text=chunk.page_content,
-                    embedding=embedding
-                )
-                self.db.add(doc_embedding)
-                print(f"Stored embedding: doc_id={document.id}, chunk_index={i}")
-
-            # Update document status
+            rows = []
+            with tracing.stage("embed", {"chunks": len(chunks)}):
+                for i, chunk in enumerate(chunks):
+                    # Store chunk in database and generate embedding
+                    embedding = self.embeddings.embed_documents([chunk.page_content])[0]
+                    start_offset = chunk.metadata.get("start_index")
+                    rows.append(DocumentEmbedding(
+                        document_id=document.id,
+                        chunk_index=i,
+                        chunk_text=chunk.page_content,
+                        start_offset=start_offset,
+                        end_offset=start_offset + len(chunk.page_content) if start_offset is not None else None,
+                        embedding=embedding
+                    ))
+
+            # Replace the previous chunks (reprocessing) and bump the version in
+            # one transaction, so readers never see both sets or a version with
+            # no chunks. Embedding happens first to keep the write lock short.
             document.processing_status = "completed"
             document.processed_at = datetime.utcnow()
-            self.db.commit()
+            document.index_version = (document.index_version or 0) + 1
+            with tracing.stage("db_write", {"rows": len(chunks)}):
+                self.db.query(DocumentEmbedding).filter(
+                    DocumentEmbedding.document_id == document.id
+                ).delete(synchronize_session=False)
+                self.db.add_all(rows)
+                self.db.commit()
+            CHUNKS_INGESTED.inc(len(chunks))
 
         except Exception as e:
-            print("UPLOAD ERROR:", e)
-            traceback.print_exc()  # Print the full traceback
+            logger.exception("Processing document failed", extra={"document_id": document.id})
             # Only try to remove file if file_path is defined and exists
             try:
                 if 'file_path' in locals() and os.path.exists(document.file_path):
                     os.remove(document.file_path)
             except Exception as cleanup_error:
-                print("Cleanup error:", cleanup_error)
+                logger.warning("Removing upload failed: %s", cleanup_error, extra={"document_id": document.id})
             raise HTTPException(
                 status_code=400,
                 detail=str(e)
             )
 
+        # Precompute the summary from the chunks we already have in memory. The
+        # document is already stored and completed; without a summary it is
+        # rebuilt on first use, so a failure here is only logged.
+        try:
+            SummaryService(self.db).refresh(
+                document, [(i, chunk.page_content) for i, chunk in enumerate(chunks)]
+            )
+        except Exception:
+            self.db.rollback()
+            logger.exception("Precomputing summary failed", extra={"document_id": document.id})
+
     def get_relevant_chunks(
         self, document_id: int, query: str, k: int = 3
     ) -> List[Dict[str, Any]]:
@@ -124,25 +162,14 @@ class DocumentProcessor:
         ]
 
     def get_document_summary(self, document_id: int) -> str:
-        """Generate a simple summary of the document."""
-        # Get all chunks for the document
-        chunks = self.db.query(DocumentEmbedding).filter(
-            DocumentEmbedding.document_id == document_id
-        ).order_by(DocumentEmbedding.chunk_index).all()
-
-        if not chunks:
+        """Return the stored summary, rebuilding it if it predates the current chunks."""
+        document = self.db.query(Document).filter(Document.id == document_id).first()
+        if not document:
             return ""
-
-        # Combine chunks into a single text
-        full_text = "\n".join(chunk.chunk_text for chunk in chunks)
-
-        # Simple summary: first 500 characters + "..."
-        if len(full_text) > 500:
-            summary = full_text[:500] + "..."
-        else:
-            summary = full_text
-
-        return summary
+        summary_service = SummaryService(self.db)
+        if summary_service.is_fresh(document):
+            return document.summary
+        return summary_service.refresh(document)
 
     def process_question(self, question: Question, db: Session) -> None:
         try:
@@ -157,7 +184,7 @@ class DocumentProcessor:
                     f"Unsupported file type: {file_extension}"
                 )
 
-            loader = LOADER_MAPPING[file_extension](question.file_path)
+            loader = get_loader(file_extension)(question.file_path)
             documents = loader.load()
 
             # Split text into chunks
@@ -180,7 +207,7 @@ class DocumentProcessor:
             db.commit()
 
         except Exception as e:
-            print("QUESTION ERROR:", e)  # Add this line
+            logger.exception("Processing question failed", extra={"question_id": question.id})
             db.delete(question)
             db.commit()
             raise HTTPException(
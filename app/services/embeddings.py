@@ -0,0 +1,153 @@
+"""
+Shared embedding model and per-document FAISS indexes.
+
+Both are expensive to create, so they are built lazily (or during warmup)
+once per process instead of once per request, and the heavy libraries are
+only imported when first needed.
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core import tracing
+from app.core.metrics import CACHE_REQUESTS
+from app.models.models import DocumentEmbedding
+
+
+@lru_cache()
+def get_embeddings():
+    """The sentence-transformers model used for chunks and queries."""
+    if settings.EMBEDDING_BACKEND == "fake":
+        from app.services.fake_embeddings import FakeEmbeddings
+
+        return FakeEmbeddings(settings.FAKE_EMBEDDING_DIM, settings.FAKE_EMBEDDING_LATENCY_MS / 1000)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=settings.EMBEDDING_MODEL_NAME, model_kwargs={"device": "cpu"}
+    )
+
+
+def embeddings_loaded() -> bool:
+    return get_embeddings.cache_info().currsize > 0
+
+
+class VectorIndexCache:
+    """
+    LRU of FAISS indexes keyed by ``(document_id, index_version)``.
+
+    Indexes are built from the vectors stored at ingest rather than by
+    re-embedding every chunk. A new index_version naturally misses, and
+    the stale entry ages out.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._indexes: "OrderedDict[Tuple[int, int], Any]" = OrderedDict()
+        self._sizes: Dict[Tuple[int, int], int] = {}  # approximate bytes per index
+        self._lock = threading.Lock()
+        self._build_locks: dict = {}
+
+    def _build(self, db: Session, document_id: int):
+        with tracing.stage("index_build", {"document.id": document_id}):
+            return self._build_index(db, document_id)
+
+    def _build_index(self, db: Session, document_id: int):
+        from langchain_community.vectorstores import FAISS
+
+        chunks = db.query(DocumentEmbedding).filter(
+            DocumentEmbedding.document_id == document_id
+        ).order_by(DocumentEmbedding.chunk_index).all()
+        tracing.set_attributes({"chunks": len(chunks)})
+        texts = [chunk.chunk_text for chunk in chunks]
+        metadatas = [
+            {
+                "document_id": chunk.document_id,
+                "embedding_id": chunk.id,
+                "chunk_index": chunk.chunk_index,
+                "start_offset": chunk.start_offset,
+                "end_offset": chunk.end_offset,
+            }
+            for chunk in chunks
+        ]
+        if chunks and all(chunk.embedding for chunk in chunks):
+            index = FAISS.from_embeddings(
+                list(zip(texts, (chunk.embedding for chunk in chunks))),
+                get_embeddings(),
+                metadatas=metadatas,
+            )
+        else:
+            # Rows stored without vectors have to be embedded now
+            index = FAISS.from_texts(texts, get_embeddings(), metadatas=metadatas)
+        # float32 vectors plus the chunk texts; metadata and FAISS overhead are not counted
+        nbytes = index.index.ntotal * index.index.d * 4 + sum(len(text.encode("utf-8")) for text in texts)
+        return index, nbytes
+
+    def get(self, db: Session, document_id: int, index_version: int):
+        key = (document_id, index_version or 0)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                CACHE_REQUESTS.labels("vector_index", "hit").inc()
+                tracing.set_attributes({"vector_index.cache": "hit"})
+                return self._indexes[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        CACHE_REQUESTS.labels("vector_index", "miss").inc()
+        tracing.set_attributes({"vector_index.cache": "miss"})
+        # One builder per key; other requests for the same document wait for it
+        with build_lock:
+            with self._lock:
+                if key in self._indexes:
+                    return self._indexes[key]
+            index, nbytes = self._build(db, document_id)
+            with self._lock:
+                self._indexes[key] = index
+                self._sizes[key] = nbytes
+                self._indexes.move_to_end(key)
+                while len(self._indexes) > self.capacity:
+                    evicted, _ = self._indexes.popitem(last=False)
+                    self._sizes.pop(evicted, None)
+                self._build_locks.pop(key, None)
+        return index
+
+    def evict(self, document_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._indexes if k[0] == document_id]:
+                del self._indexes[key]
+                self._sizes.pop(key, None)
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._indexes)
+
+    def stats(self) -> dict:
+        """Loaded indexes, least recently used first, with their approximate size."""
+        with self._lock:
+            loaded = [
+                {"document_id": document_id, "index_version": version, "bytes": self._sizes.get((document_id, version))}
+                for document_id, version in self._indexes
+            ]
+        return {
+            "capacity": self.capacity,
+            "loaded": loaded,
+            "total_bytes": sum(entry["bytes"] or 0 for entry in loaded),
+        }
+
+
+vector_indexes = VectorIndexCache(settings.VECTOR_INDEX_CACHE_SIZE)
+
+
+def get_vector_index(db: Session, document_id: int, index_version: Optional[int] = None):
+    if index_version is None:
+        from app.models.models import Document
+
+        index_version = db.query(Document.index_version).filter(
+            Document.id == document_id
+        ).scalar() or 0
+    return vector_indexes.get(db, document_id, index_version)
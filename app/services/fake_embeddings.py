@@ -0,0 +1,43 @@
+"""
+Deterministic stand-in for the sentence-transformers model.
+
+Selected with ``EMBEDDING_BACKEND=fake`` for load tests and local runs: no
+model download, no torch, and a configurable per-text latency
+(``FAKE_EMBEDDING_LATENCY_MS``) in place of real inference time. Texts are
+embedded as normalised bags of hashed words, so chunks sharing words with a
+question still rank first in similarity search.
+"""
+import hashlib
+import re
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int, latency_seconds: float = 0.0):
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,130 @@
+"""
+Background document ingestion.
+
+Uploads only store the file and the row; loading, chunking and embedding
+run on a small worker pool with their own sessions, so neither the event
+loop nor the request threadpool waits on them.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.metrics import INGESTION_OLDEST_JOB_AGE, INGESTION_QUEUE_DEPTH
+from app.core.ratelimit import Slot
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionJob:
+    document_id: int
+    owner_id: int
+    enqueued_at: float
+    started_at: Optional[float] = None
+    slot: Optional[Slot] = None  # the owner's concurrent-job quota, released when done
+    parent: Optional[tracing.Span] = None  # the upload's span, so ingestion joins its trace
+
+
+class IngestionQueue:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs: Dict[int, IngestionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, document_id: int, owner_id: int, slot: Optional[Slot] = None) -> bool:
+        """Queue ``document_id``; returns False (and queues nothing) if it already has a job."""
+        job = IngestionJob(
+            document_id=document_id, owner_id=owner_id, enqueued_at=time.monotonic(), slot=slot,
+            parent=tracing.current_span(),
+        )
+        with self._lock:
+            if document_id in self._jobs:
+                return False
+            self._jobs[document_id] = job
+        self._executor.submit(self._run, job)
+        return True
+
+    def _run(self, job: IngestionJob) -> None:
+        attributes = {"document.id": job.document_id, "queue.wait_seconds": time.monotonic() - job.enqueued_at}
+        with tracing.span("ingestion.run", attributes, parent=job.parent):
+            self._ingest(job)
+
+    def _ingest(self, job: IngestionJob) -> None:
+        from app.db.session import SessionLocal
+        from app.models.models import Document
+        from app.services.document_processor import DocumentProcessor
+
+        job.started_at = time.monotonic()
+        db = SessionLocal()
+        try:
+            document = db.get(Document, job.document_id)
+            if document is not None and document.deleted_at is None:
+                DocumentProcessor(db).process_document(document)
+        except Exception:
+            logger.exception("Ingestion failed", extra={"document_id": job.document_id})
+            tracing.set_attributes({"ingestion.failed": True})
+            db.rollback()
+            document = db.get(Document, job.document_id)
+            if document is not None and document.deleted_at is None:
+                document.processing_status = "failed"
+                db.commit()
+        finally:
+            db.close()
+            if job.slot is not None:
+                job.slot.release()
+            with self._lock:
+                self._jobs.pop(job.document_id, None)
+
+    def is_pending(self, document_id: int) -> bool:
+        """Whether a job for ``document_id`` is queued or running."""
+        with self._lock:
+            return document_id in self._jobs
+
+    def wait_until_idle(self, document_id: int, timeout: float) -> bool:
+        """Block until no job for ``document_id`` is queued or running."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if document_id not in self._jobs:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def depth(self) -> int:
+        """Jobs waiting for a worker."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.started_at is None)
+
+    def active_for(self, owner_id: int) -> int:
+        """Queued or running jobs for one user."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.owner_id == owner_id)
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds the oldest queued or running job has been in the queue."""
+        with self._lock:
+            if not self._jobs:
+                return None
+            return time.monotonic() - min(job.enqueued_at for job in self._jobs.values())
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "workers": self.workers,
+            "queued": sum(1 for job in jobs if job.started_at is None),
+            "running": sum(1 for job in jobs if job.started_at is not None),
+            "oldest_job_age_seconds": now - min(job.enqueued_at for job in jobs) if jobs else None,
+        }
+
+
+ingestion_queue = IngestionQueue(settings.INGESTION_WORKERS)
+INGESTION_QUEUE_DEPTH.set_function(ingestion_queue.depth)
+INGESTION_OLDEST_JOB_AGE.set_function(lambda: ingestion_queue.oldest_age() or 0.0)
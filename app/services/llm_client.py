@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.exceptions import LLMUnavailableError
+from app.core.metrics import LLM_CIRCUIT_OPEN, LLM_HEDGES, LLM_OUTCOMES
+
+# LLM calls run here so the request thread can stop waiting at its deadline
+_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_WORKERS, thread_name_prefix="llm")
+# A running call cannot be cancelled, so the losing attempt of a hedged race
+# keeps its thread until the HTTP call returns. Racing only this many at a
+# time leaves the rest of the pool for first attempts.
+_hedge_slots = threading.BoundedSemaphore(settings.LLM_MAX_HEDGES_IN_FLIGHT)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies used to decide when to hedge."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Stop sending traffic to a failing model for a cool-down period.
+
+    closed -> open after ``failure_threshold`` consecutive failures;
+    open -> half_open once ``reset_seconds`` have passed, letting one probe
+    through; the probe closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def as_dict(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+        LLM_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                LLM_CIRCUIT_OPEN.set(1)
+
+
+# Shared across requests so hedging and breaking reflect the whole process
+primary_latency = LatencyTracker()
+primary_breaker = CircuitBreaker(
+    settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS
+)
+
+
+def _timed(fn: Callable[[], Any], tracker: LatencyTracker) -> Callable[[], Any]:
+    """Record the latency of every successful call, including ones nobody waited for."""
+    def run():
+        started = time.monotonic()
+        result = fn()
+        tracker.record(time.monotonic() - started)
+        return result
+    return run
+
+
+def _when_all_done(futures, callback: Callable[[], None]) -> None:
+    """Call ``callback`` once every future has finished or been cancelled."""
+    remaining = len(futures)
+    lock = threading.Lock()
+
+    def done(_future: Future) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            last = remaining == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+class DeadlineAwareLLM:
+    """
+    Run a completion within a request deadline.
+
+    The primary model is called first. If it has not answered once the
+    configured latency percentile has elapsed, an identical hedge request is
+    sent (if fewer than ``LLM_MAX_HEDGES_IN_FLIGHT`` races are running) and
+    whichever returns first wins. When too little time is left for
+    the primary model (or its breaker is open) the fallback model is used;
+    when not even that fits, ``LLMUnavailableError`` tells the caller to
+    answer extractively.
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[Dict[str, Any]], Any],
+        fallback: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+
+    def _hedge_delay(self) -> float:
+        observed = primary_latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, observed or 0.0)
+
+    def _call_primary(self, inputs: Dict[str, Any], budget: float) -> Tuple[Any, str]:
+        call = _timed(lambda: self.primary(inputs), primary_latency)
+        original = _executor.submit(call)
+        pending = {original}
+        started = time.monotonic()
+        hedge_delay = self._hedge_delay()
+        hedge: Optional[Future] = None
+        may_hedge = hedge_delay < budget
+        last_error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                elapsed = time.monotonic() - started
+                if may_hedge:
+                    timeout = max(0.0, hedge_delay - elapsed)
+                else:
+                    timeout = max(0.0, budget - elapsed)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    primary_breaker.record_success()
+                    return result, "hedged" if future is hedge else "primary"
+
+                if not done and may_hedge:
+                    may_hedge = False
+                    if _hedge_slots.acquire(blocking=False):
+                        LLM_HEDGES.inc()
+                        hedge = _executor.submit(call)
+                        pending.add(hedge)
+                        # The slot is held until both attempts have finished
+                        _when_all_done([original, hedge], _hedge_slots.release)
+                elif not done:
+                    break
+        finally:
+            # Attempts still queued are dropped; running ones finish unobserved
+            for future in pending:
+                future.cancel()
+
+        primary_breaker.record_failure()
+        raise LLMUnavailableError(detail=str(last_error) if last_error else "primary model timed out")
+
+    def _call_fallback(self, inputs: Dict[str, Any], deadline: Deadline) -> Any:
+        future: Future = _executor.submit(self.fallback, inputs)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except Exception as e:
+            raise LLMUnavailableError(detail=f"fallback model failed: {e}")
+
+    def complete(self, inputs: Dict[str, Any], deadline: Deadline) -> Tuple[Any, str]:
+        """Return ``(result, outcome)``; outcome is primary, hedged or fallback_model."""
+        if deadline.remaining() < settings.LLM_EXTRACTIVE_RESERVE_SECONDS:
+            raise LLMUnavailableError(detail="deadline too close for an LLM call")
+
+        reserve = settings.LLM_FALLBACK_RESERVE_SECONDS if self.fallback else 0.0
+        primary_budget = deadline.remaining() - reserve
+        if primary_budget > 0 and primary_breaker.allow():
+            try:
+                return self._call_primary(inputs, primary_budget)
+            except LLMUnavailableError:
+                if not self.fallback:
+                    raise
+
+        if not self.fallback:
+            raise LLMUnavailableError(detail="primary model circuit is open")
+        if deadline.remaining() < settings.LLM_EXTRACTIVE_RESERVE_SECONDS:
+            raise LLMUnavailableError(detail="deadline too close for the fallback model")
+        return self._call_fallback(inputs, deadline), "fallback_model"
+
+
+def record_outcome(outcome: str) -> None:
+    LLM_OUTCOMES.labels(outcome=outcome).inc()
@@ -0,0 +1,102 @@
+"""
+In-process cache of authenticated principals.
+
+Decoded tokens are kept until they expire (at most ``AUTH_CACHE_TTL_SECONDS``)
+and users for ``AUTH_CACHE_TTL_SECONDS``, so authenticating a request
+usually needs neither ``jwt.decode`` nor a database round trip. Users are
+cached as copies that belong to no session: a request's commit can never
+expire them, and nothing cached holds on to a connection.
+Every ORM write to ``users`` (sync or async session, any code path) drops
+the affected entries once its transaction commits; changes made by another
+process show up once the entry expires.
+"""
+import time
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.models import User
+from app.schemas.schemas import TokenPayload
+
+token_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, maxsize=settings.AUTH_CACHE_SIZE, name="auth_tokens")
+user_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, maxsize=settings.AUTH_CACHE_SIZE, name="auth_users")
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+def get_token(token: str) -> Optional[TokenPayload]:
+    return token_cache.get(token)
+
+
+def set_token(token: str, token_data: TokenPayload, expires_at: Optional[float]) -> None:
+    ttl = token_cache.ttl
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        token_cache.set(token, token_data, ttl=ttl)
+
+
+def get_user(user_id: int) -> Optional[User]:
+    return user_cache.get(user_id)
+
+
+def set_user(user: User) -> User:
+    """Cache and return a session-free copy of ``user``."""
+    principal = User(**{key: getattr(user, key) for key in _USER_COLUMNS})
+    user_cache.set(user.id, principal)
+    return principal
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.invalidate(user_id)
+
+
+# Invalidation on write. Ids are collected at flush and dropped only after
+# commit: dropping them earlier would let a concurrent request re-cache the
+# old row before the change is visible.
+
+_STALE_KEY = "principals.stale_users"
+_ALL_USERS = object()
+
+
+def _collect_stale_users(session, flush_context, instances) -> None:
+    stale = {
+        inspect(obj).identity[0]
+        for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and inspect(obj).identity is not None
+    }
+    if stale:
+        session.info.setdefault(_STALE_KEY, set()).update(stale)
+
+
+def _collect_bulk_writes(orm_execute_state) -> None:
+    # update(User)/delete(User) statements bypass the flush
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info.setdefault(_STALE_KEY, set()).add(_ALL_USERS)
+
+
+def _invalidate_committed(session) -> None:
+    stale = session.info.pop(_STALE_KEY, None)
+    if not stale:
+        return
+    if _ALL_USERS in stale:
+        user_cache.clear()
+        return
+    for user_id in stale:
+        invalidate_user(user_id)
+
+
+def _discard_rolled_back(session) -> None:
+    session.info.pop(_STALE_KEY, None)
+
+
+# AsyncSession runs on a plain Session underneath, so these cover it too
+event.listen(Session, "before_flush", _collect_stale_users)
+event.listen(Session, "do_orm_execute", _collect_bulk_writes)
+event.listen(Session, "after_commit", _invalidate_committed)
+event.listen(Session, "after_rollback", _discard_rolled_back)
@@ -1,21 +1,30 @@
-from typing import Dict, Any, Optional
-from langchain.chains import ConversationalRetrievalChain, LLMChain
-from langchain_mistralai import ChatMistralAI
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.schema import BaseRetriever, Document
-from pydantic import Field
 
 from app.core.config import settings
-from app.services.document_processor import DocumentProcessor
-from app.core.exceptions import OpenAIError
+from app.core.deadline import Deadline
+from app.core.exceptions import LLMUnavailableError
+from app.core import tracing
+from app.core.metrics import LLM_TOKENS
+from app.core.singleflight import SingleFlight
+from app.models.models import Document as DocumentModel
+from app.services.context_packer import ContextChunk, PackedContext, count_tokens, pack_context
+from app.services.embeddings import get_embeddings, get_vector_index
+from app.services.llm_client import DeadlineAwareLLM, record_outcome
+from app.services.source_refs import source_ref
 
-# Custom prompt template for better Q&A
-QA_PROMPT = PromptTemplate(
-    template="""You are an AI assistant that helps answer questions about documents. 
+logger = logging.getLogger(__name__)
+
+# langchain and the Mistral client are imported on first use (or at warmup),
+# keeping them out of the web layer's import time.
+
+# Identical questions against the same document version share one answer
+answer_flight = SingleFlight("qa_answer")
+
+QA_PROMPT_TEMPLATE = """You are an AI assistant that helps answer questions about documents. 
     Use the following pieces of context to answer the question at the end. 
     If you don't know the answer, just say that you don't know, don't try to make up an answer.
     
@@ -26,69 +35,104 @@ QA_PROMPT = PromptTemplate(
     {chat_history}
     
     Human: {question}
-    AI Assistant:""",
-    input_variables=["context", "chat_history", "question"]
-)
+    AI Assistant:"""
+
+
+@lru_cache()
+def get_qa_prompt():
+    """Custom prompt template for better Q&A."""
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(
+        template=QA_PROMPT_TEMPLATE,
+        input_variables=["context", "chat_history", "question"]
+    )
+
+
+def get_llm(model_name: str):
+    """Mistral chat model; retries are left to the deadline-aware caller."""
+    from langchain_mistralai import ChatMistralAI
+
+    kwargs = {}
+    if settings.MISTRAL_ENDPOINT:
+        kwargs["endpoint"] = settings.MISTRAL_ENDPOINT
+    return ChatMistralAI(
+        mistral_api_key=settings.MISTRAL_API_KEY,
+        model=model_name,
+        temperature=0.7,
+        max_retries=1,
+        timeout=int(settings.REQUEST_DEADLINE_SECONDS) + 1,
+        **kwargs,
+    )
+
+
+def extractive_answer(packed: PackedContext, max_sentences: int = 3) -> str:
+    """Answer from the most relevant retrieved text when no LLM call fits the deadline."""
+    if not packed.spans:
+        return "I couldn't find any relevant information in the document to answer your question."
+    sentences = re.split(r"(?<=[.!?])\s+", packed.spans[0].text.strip())
+    excerpt = " ".join(sentences[:max_sentences])
+    return f"The most relevant passage in the document says: {excerpt}"
+
 
-def get_qa_chain(llm) -> LLMChain:
+def get_qa_chain(llm):
     """Create a custom QA chain using LangChain and Mistral."""
+    from langchain.chains import LLMChain
+
     return LLMChain(
         llm=llm,
-        prompt=QA_PROMPT,
+        prompt=get_qa_prompt(),
         verbose=True
     )
 
-class PineconeTextRetriever(BaseRetriever):
-    index: any = Field(default=None, exclude=True)
 
-    def __init__(self, index, **kwargs):
-        super().__init__(**kwargs)
-        object.__setattr__(self, 'index', index)
+@lru_cache()
+def get_chain_for_model(model_name: str):
+    """QA chains are stateless, so one per model is shared by all requests."""
+    return get_qa_chain(get_llm(model_name))
 
-    def get_relevant_documents(self, query, top_k=3):
-        response = self.index.query(
-            namespace="__default__",
-            top_k=top_k,
-            include_metadata=True,
-            text=query
-        )
-        matches = response["matches"]
-        # Return as LangChain Document objects
-        return [Document(page_content=match["record"]["text"], metadata=match["record"].get("metadata", {})) for match in matches]
 
 class QAService:
-    def __init__(self, db: Session, document_id: int):
+    def __init__(self, db: Session, document_id: int, index_version: Optional[int] = None):
         self.db = db
-        self.document_processor = DocumentProcessor(db)
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2", model_kwargs={"device": "cpu"})
-        from app.models.models import DocumentEmbedding
-        chunks = db.query(DocumentEmbedding).filter(DocumentEmbedding.document_id == document_id).all()
-        texts = [chunk.chunk_text for chunk in chunks]
-        metadatas = [{"document_id": chunk.document_id, "chunk_index": chunk.chunk_index} for chunk in chunks]
-        self.vectorstore = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
-        retriever = self.vectorstore.as_retriever()
-        self.retriever = retriever
-        llm = ChatMistralAI(
-            mistral_api_key=settings.MISTRAL_API_KEY,
-            model=settings.MISTRAL_MODEL_NAME,
-            temperature=0.7
+        self.vectorstore = get_vector_index(db, document_id, index_version)
+        self.retriever = self.vectorstore.as_retriever()
+        self.qa_chain = get_chain_for_model(settings.MISTRAL_MODEL_NAME)
+        fallback_chain = (
+            get_chain_for_model(settings.MISTRAL_FALLBACK_MODEL_NAME)
+            if settings.MISTRAL_FALLBACK_MODEL_NAME
+            else None
         )
-        self.qa_chain = get_qa_chain(llm)
+        self.llm = DeadlineAwareLLM(self.qa_chain, fallback_chain)
 
     def answer_question(
         self,
         question: str,
-        chat_history: Optional[list] = None
+        chat_history: Optional[list] = None,
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, Any]:
         """
         Answer a question about a specific document using the real Mistral LLM.
+
+        The LLM step is bounded by ``deadline``: slow calls are hedged, then
+        moved to the fallback model, and finally answered extractively from
+        the retrieved context.
         """
+        deadline = deadline or Deadline(settings.REQUEST_DEADLINE_SECONDS)
         try:
-            # Get relevant chunks for the question using FAISS retriever (invoke method)
-            relevant_docs = self.retriever.invoke(question)
-            print("Relevant docs:", relevant_docs)
-            for doc in relevant_docs:
-                print("Doc metadata:", doc.metadata)
+            # Get relevant chunks for the question from the FAISS index, most relevant first
+            with tracing.stage("query_embed"):
+                query_vector = get_embeddings().embed_query(question)
+            with tracing.stage("search", {"qa.k": settings.QA_RETRIEVAL_K}) as search_span:
+                scored_docs = self.vectorstore.similarity_search_with_score_by_vector(
+                    query_vector, k=settings.QA_RETRIEVAL_K
+                )
+                search_span.set_attributes({"qa.results": len(scored_docs)})
+            relevant_docs = [doc for doc, _ in scored_docs]
+            logger.debug(
+                "Retrieved chunks",
+                extra={"chunk_indexes": [doc.metadata.get("chunk_index") for doc in relevant_docs]},
+            )
             relevant_chunks = [doc.page_content for doc in relevant_docs]
 
             if not relevant_chunks:
@@ -97,39 +141,132 @@ class QAService:
                 return {
                     "answer": "I couldn't find any relevant information in the document to answer your question. Here are the most relevant chunks found (possibly from other documents):\n\n" + "\n\n".join(fallback_chunks),
                     "confidence_score": 0,
-                    "sources": [
-                        {"text": chunk.page_content, "chunk_index": i, "metadata": getattr(chunk, 'metadata', {})}
-                        for i, chunk in enumerate(relevant_docs)
-                    ]
+                    "sources": []
                 }
 
-            # Combine chunks into context
-            context = "\n\n".join(relevant_chunks)
+            # Merge overlapping chunks and fit them into the prompt token budget
+            packed = pack_context(
+                [
+                    ContextChunk(
+                        text=doc.page_content,
+                        chunk_index=doc.metadata.get("chunk_index", rank),
+                        rank=rank,
+                        start=doc.metadata.get("start_offset"),
+                        end=doc.metadata.get("end_offset"),
+                        embedding_id=doc.metadata.get("embedding_id"),
+                        score=float(score),
+                    )
+                    for rank, (doc, score) in enumerate(scored_docs)
+                ],
+                token_budget=settings.QA_CONTEXT_TOKEN_BUDGET,
+            )
+            context = packed.text
+            sent = (
+                packed.tokens
+                + count_tokens(question)
+                + sum(count_tokens(line) for line in chat_history or ())
+            )
 
             # Get answer from QA chain (this calls Mistral via LangChain)
-            result = self.qa_chain({
-                "question": question,
-                "chat_history": "\n".join(chat_history) if chat_history else "",
-                "context": context
-            })
-
-            # Calculate confidence score (simple heuristic)
-            confidence_score = min(100, int(len(relevant_chunks) * 25))
+            try:
+                with tracing.stage("llm", {"llm.prompt_tokens": sent, "qa.context_chunks": len(packed.chunks)}) as llm_span:
+                    result, outcome = self.llm.complete({
+                        "question": question,
+                        "chat_history": "\n".join(chat_history) if chat_history else "",
+                        "context": context
+                    }, deadline)
+                    llm_span.set_attributes({"llm.outcome": outcome})
+                answer = result["text"] if "text" in result else result
+                # Calculate confidence score (simple heuristic)
+                confidence_score = min(100, int(len(relevant_chunks) * 25))
+            except LLMUnavailableError as e:
+                logger.warning("LLM unavailable, answering extractively", extra={"reason": e.detail})
+                outcome = "extractive"
+                answer = extractive_answer(packed)
+                confidence_score = min(50, int(len(relevant_chunks) * 10))
+            record_outcome(outcome)
+            # Prompt plus completion, for the per-user LLM quota; extractive answers cost nothing
+            llm_tokens = 0
+            if outcome != "extractive":
+                received = count_tokens(str(answer))
+                LLM_TOKENS.labels("sent").inc(sent)
+                LLM_TOKENS.labels("received").inc(received)
+                llm_tokens = sent + received
 
             return {
-                "answer": result["text"] if "text" in result else result,
+                "answer": answer,
                 "confidence_score": confidence_score,
-                "sources": [
-                    {"text": chunk, "chunk_index": i} for i, chunk in enumerate(relevant_chunks)
-                ]
+                "llm_outcome": outcome,
+                "context_tokens": packed.tokens,
+                "llm_tokens": llm_tokens,
+                # References only; the text is resolved on request (see source_refs)
+                "sources": [source_ref(chunk) for chunk in sorted(packed.chunks, key=lambda c: c.rank)]
             }
 
         except Exception as e:
+            record_outcome("error")
             # If there is an error, raise it so you see the real error in your logs
             raise RuntimeError(f"Error answering question with Mistral: {str(e)}")
 
     def get_conversation_history(self, question_id: int) -> list:
-        """Get conversation history for a specific question."""
-        # This could be expanded to store and retrieve actual conversation history
-        # For now, we'll return an empty list
-        return [] 
\ No newline at end of file
+        """Get the prompt history (rolling summary + recent turns) preceding a question."""
+        from app.models.models import Question
+        from app.services.conversation_service import ConversationService
+
+        question = self.db.query(Question).filter(Question.id == question_id).first()
+        if not question or not question.conversation:
+            return []
+        return ConversationService(self.db).get_history(
+            question.conversation, before_id=question.id
+        ).as_prompt_lines()
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for coalescing: case, whitespace and trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def answer_question_coalesced(
+    db: Session,
+    document: DocumentModel,
+    question: str,
+    chat_history: Optional[list] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[Dict[str, Any], bool, bool]:
+    """
+    Answer a question, sharing the work with identical in-flight requests.
+
+    Returns the answer, whether it was shared with other callers, and whether
+    this caller computed it (and so spent the LLM tokens). A caller that is
+    still waiting on another request's answer when only the extractive reserve
+    of its own deadline is left stops waiting and answers by itself, which at
+    that point means extractively. The answer dict is copied so each caller
+    can attach it to its own row.
+    """
+    deadline = deadline or Deadline(settings.REQUEST_DEADLINE_SECONDS)
+    key = (
+        document.id,
+        document.index_version or 0,
+        normalize_question(question),
+        tuple(chat_history or ()),
+    )
+    computed = False
+
+    def compute() -> Dict[str, Any]:
+        nonlocal computed
+        computed = True
+        qa_service = QAService(db, document_id=document.id, index_version=document.index_version)
+        return qa_service.answer_question(
+            question=question, chat_history=chat_history, deadline=deadline
+        )
+
+    wait = max(0.0, deadline.remaining() - settings.LLM_EXTRACTIVE_RESERVE_SECONDS)
+    with tracing.span("qa.answer", {"document.id": document.id, "qa.k": settings.QA_RETRIEVAL_K}) as qa_span:
+        answer, shared = answer_flight.do(key, compute, timeout=wait)
+        qa_span.set_attributes({
+            "qa.coalesced": shared,
+            "qa.computed": computed,
+            "llm.outcome": answer.get("llm_outcome"),
+            "llm.tokens": answer.get("llm_tokens"),
+        })
+    return {**answer, "sources": list(answer["sources"])}, shared, computed
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Weights = Dict[str, np.ndarray]
+
+# Linear layers of QAPolicyNetwork's nn.Sequential (ReLU at 1 and 3, Softmax at 5)
+LINEAR_LAYERS = ("network.0", "network.2", "network.4")
+
+
+class NumpyPolicy:
+    """
+    Inference-only QAPolicyNetwork (Linear-ReLU-Linear-ReLU-Linear-Softmax).
+
+    Takes the exported state_dict arrays, so it gives the same probabilities
+    as the torch module without importing torch. States may be a single
+    feature vector or a ``(batch, features)`` matrix.
+    """
+
+    def __init__(self, weights: Weights, version: Optional[int] = None):
+        self.weights = {name: np.asarray(array, dtype=np.float32) for name, array in weights.items()}
+        self.version = version
+        self._rng = np.random.default_rng()
+        # Pre-transpose so the forward pass is x @ W + b
+        self._layers = [
+            (np.ascontiguousarray(self.weights[f"{name}.weight"].T), self.weights[f"{name}.bias"])
+            for name in LINEAR_LAYERS
+        ]
+
+    @classmethod
+    def initial(
+        cls, input_size: int = 10, hidden_size: int = 64, output_size: int = 3, seed: Optional[int] = None
+    ) -> "NumpyPolicy":
+        """Untrained policy, initialised like torch's nn.Linear default."""
+        rng = np.random.default_rng(seed)
+        weights = {}
+        sizes = [(input_size, hidden_size), (hidden_size, hidden_size), (hidden_size, output_size)]
+        for name, (fan_in, fan_out) in zip(LINEAR_LAYERS, sizes):
+            bound = 1.0 / np.sqrt(fan_in)
+            weights[f"{name}.weight"] = rng.uniform(-bound, bound, (fan_out, fan_in))
+            weights[f"{name}.bias"] = rng.uniform(-bound, bound, fan_out)
+        return cls(weights)
+
+    def probabilities(self, states: np.ndarray) -> np.ndarray:
+        x = np.asarray(states, dtype=np.float32)
+        single = x.ndim == 1
+        if single:
+            x = x[None, :]
+        last = len(self._layers) - 1
+        for i, (weight, bias) in enumerate(self._layers):
+            x = x @ weight + bias
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+        return x[0] if single else x
+
+    def sample(
+        self, states: np.ndarray, rng: Optional[np.random.Generator] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sample one action per state; returns ``(actions, probabilities)``."""
+        probs = self.probabilities(states)
+        batch = np.atleast_2d(probs)
+        draws = (rng or self._rng).random((batch.shape[0], 1))
+        actions = (batch.cumsum(axis=1) < draws).sum(axis=1)
+        actions = np.minimum(actions, batch.shape[1] - 1)
+        return (actions[0] if probs.ndim == 1 else actions), probs
+
+
+class PolicyCache:
+    """
+    Holds the serving policy for this process.
+
+    ``publish`` swaps in a new policy with a single assignment, so readers
+    never see a partial update. ``get`` asks the model store for the active
+    version at most once every ``RL_POLICY_REFRESH_SECONDS`` and only reads
+    weights when that version differs from the one already loaded.
+    """
+
+    def __init__(self):
+        self._policy: Optional[NumpyPolicy] = None
+        self.store_version: Optional[int] = None  # checkpoint version last loaded or saved
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Optional[NumpyPolicy]:
+        return self._policy
+
+    def publish(self, policy: NumpyPolicy, store_version: Optional[int] = None) -> None:
+        self._policy = policy
+        if store_version is not None:
+            self.store_version = store_version
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        from app.services.rl_model_store import RLModelStore
+
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.RL_POLICY_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < settings.RL_POLICY_REFRESH_SECONDS:
+                return
+            self._checked_at = now
+            store = RLModelStore(db)
+            active = store.active_version()
+            if active is None or active == self.store_version:
+                return
+            loaded = store.load_active()
+            if loaded:
+                version, weights = loaded
+                self.publish(NumpyPolicy(weights, version=version), store_version=version)
+                logger.info("Loaded RL model", extra={"model_version": version})
+
+    def get(self, db: Session) -> NumpyPolicy:
+        self.refresh(db)
+        if self._policy is None:
+            with self._lock:
+                if self._policy is None:
+                    self._policy = NumpyPolicy.initial()
+        return self._policy
+
+
+policy_cache = PolicyCache()
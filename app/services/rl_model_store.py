@@ -0,0 +1,104 @@
+import io
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session, defer
+
+from app.core.exceptions import RLModelError
+from app.models.models import RLModelState
+
+POLICY_MODEL_NAME = "qa_policy_network"
+
+Weights = Dict[str, np.ndarray]
+
+
+def serialize_weights(weights: Weights) -> bytes:
+    """Pack named arrays into a compressed npz blob (float32)."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **{k: np.asarray(v, dtype=np.float32) for k, v in weights.items()})
+    return buffer.getvalue()
+
+
+def deserialize_weights(blob: bytes) -> Weights:
+    with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+class RLModelStore:
+    """Versioned checkpoints of RL policies; exactly one version per model is active."""
+
+    def __init__(self, db: Session, model_name: str = POLICY_MODEL_NAME):
+        self.db = db
+        self.model_name = model_name
+
+    def active_version(self) -> Optional[int]:
+        """Cheap check (no blob is read) used to decide whether a reload is needed."""
+        return self.db.query(RLModelState.version).filter(
+            RLModelState.model_name == self.model_name,
+            RLModelState.is_active == True
+        ).order_by(RLModelState.version.desc()).limit(1).scalar()
+
+    def load_active(self) -> Optional[Tuple[int, Weights]]:
+        state = self.db.query(RLModelState).filter(
+            RLModelState.model_name == self.model_name,
+            RLModelState.is_active == True
+        ).order_by(RLModelState.version.desc()).first()
+        if not state:
+            return None
+        try:
+            return state.version, deserialize_weights(state.checkpoint)
+        except Exception as e:
+            raise RLModelError(f"Error loading model version {state.version}: {str(e)}")
+
+    def save(self, weights: Weights, metrics: Optional[dict] = None, activate: bool = True) -> int:
+        """Store a new checkpoint as the next version; optionally make it the active one."""
+        try:
+            latest = self.db.query(func.max(RLModelState.version)).filter(
+                RLModelState.model_name == self.model_name
+            ).scalar() or 0
+            state = RLModelState(
+                model_name=self.model_name,
+                version=latest + 1,
+                checkpoint=serialize_weights(weights),
+                metrics=metrics,
+                is_active=False,
+            )
+            self.db.add(state)
+            self.db.flush()
+            if activate:
+                self._activate(state.version)
+            self.db.commit()
+            return state.version
+        except Exception as e:
+            self.db.rollback()
+            raise RLModelError(f"Error saving model state: {str(e)}")
+
+    def _activate(self, version: int) -> None:
+        # Deactivate and activate in the same transaction so readers never see zero or two
+        self.db.query(RLModelState).filter(
+            RLModelState.model_name == self.model_name,
+            RLModelState.is_active == True,
+            RLModelState.version != version,
+        ).update({"is_active": False})
+        updated = self.db.query(RLModelState).filter(
+            RLModelState.model_name == self.model_name,
+            RLModelState.version == version,
+        ).update({"is_active": True})
+        if not updated:
+            raise RLModelError(f"Model version {version} not found")
+
+    def activate(self, version: int) -> None:
+        try:
+            self._activate(version)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def list_versions(self, limit: int = 50) -> List[RLModelState]:
+        return self.db.query(RLModelState).options(
+            defer(RLModelState.checkpoint)
+        ).filter(
+            RLModelState.model_name == self.model_name
+        ).order_by(RLModelState.version.desc()).limit(limit).all()
@@ -0,0 +1,52 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+
+@dataclass
+class Experience:
+    state: np.ndarray
+    action: int
+    action_probs: np.ndarray
+    reward: float
+    question_id: Optional[int] = None
+
+
+class ReplayBuffer:
+    """Bounded FIFO of experiences; the oldest are dropped when it is full."""
+
+    def __init__(self, capacity: int):
+        self._items = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self.dropped = 0
+
+    def push(self, experience: Experience) -> None:
+        with self._lock:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(experience)
+            self._ready.notify()
+
+    def drain(self, max_items: int) -> List[Experience]:
+        with self._lock:
+            count = min(max_items, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    def wait_for(self, min_items: int, timeout: float) -> None:
+        """Block until ``min_items`` are buffered or ``timeout`` passes."""
+        with self._lock:
+            self._ready.wait_for(lambda: len(self._items) >= min_items, timeout=timeout)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+# Filled by request handlers, drained by the background trainer
+replay_buffer = ReplayBuffer(settings.RL_REPLAY_BUFFER_SIZE)
@@ -1,126 +1,72 @@
-import torch
-import torch.nn as nn
-import torch.optim as optim
 import numpy as np
-from typing import Dict, Any, List, Tuple
-from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
-from app.models.models import Question, RLModelState
+from app.core.config import settings
+from app.models.models import Question
 from app.core.exceptions import RLModelError
+from app.core import tracing
+from app.services.rl_inference import NumpyPolicy, policy_cache
+from app.services.rl_replay import Experience, replay_buffer
 
-class QAPolicyNetwork(nn.Module):
-    def __init__(self, input_size: int, hidden_size: int, output_size: int):
-        super(QAPolicyNetwork, self).__init__()
-        self.network = nn.Sequential(
-            nn.Linear(input_size, hidden_size),
-            nn.ReLU(),
-            nn.Linear(hidden_size, hidden_size),
-            nn.ReLU(),
-            nn.Linear(hidden_size, output_size),
-            nn.Softmax(dim=-1)
-        )
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        return self.network(x)
+def ensure_background_trainer() -> None:
+    """Start the in-process trainer (and import torch) the first time it is needed."""
+    from app.services.rl_trainer import get_trainer
+
+    get_trainer()
+
 
 class RLService:
+    """
+    Request-side RL: feature extraction, inference and experience logging.
+
+    Inference runs on the NumPy policy from ``policy_cache``, so this module
+    does not import torch. Gradient updates and persistence happen in the
+    background ``PolicyTrainer`` (only when RL_BACKGROUND_TRAINER is on) or
+    in a separate training process that publishes through the model store.
+    """
+
     def __init__(self, db: Session):
         self.db = db
         self.input_size = 10  # Features: confidence_score, feedback_score, etc.
         self.hidden_size = 64
         self.output_size = 3  # Actions: adjust_confidence, adjust_temperature, adjust_context
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        
-        # Initialize policy network
-        self.policy_network = QAPolicyNetwork(
-            self.input_size,
-            self.hidden_size,
-            self.output_size
-        ).to(self.device)
-        
-        self.optimizer = optim.Adam(self.policy_network.parameters())
-        self.load_latest_model()
+
+    @property
+    def policy(self) -> NumpyPolicy:
+        return policy_cache.get(self.db)
 
     def load_latest_model(self) -> None:
-        """Load the latest active model state from the database."""
+        """Load the active model version from the store, bypassing the refresh interval."""
         try:
-            latest_model = self.db.query(RLModelState).filter(
-                RLModelState.is_active == True
-            ).order_by(RLModelState.updated_at.desc()).first()
-
-            if latest_model:
-                state_dict = latest_model.state_dict
-                self.policy_network.load_state_dict(state_dict)
-                print(f"Loaded model version {latest_model.version}")
+            policy_cache.refresh(self.db, force=True)
         except Exception as e:
             raise RLModelError(f"Error loading model: {str(e)}")
 
-    def save_model_state(self, metrics: Dict[str, float]) -> None:
-        """Save the current model state to the database."""
-        try:
-            # Create new model state
-            model_state = RLModelState(
-                model_name="qa_policy_network",
-                version=f"v{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                state_dict=self.policy_network.state_dict(),
-                metrics=metrics,
-                is_active=True
-            )
-
-            # Deactivate previous model
-            self.db.query(RLModelState).filter(
-                RLModelState.is_active == True
-            ).update({"is_active": False})
-
-            # Save new model
-            self.db.add(model_state)
-            self.db.commit()
+    def save_model_state(self, metrics: Dict[str, float]) -> int:
+        """Save the current policy as a new active version; returns the version."""
+        from app.services.rl_trainer import get_trainer
 
-        except Exception as e:
-            self.db.rollback()
-            raise RLModelError(f"Error saving model state: {str(e)}")
+        return get_trainer(start=False).save(self.db, metrics)
 
-    def get_state_features(self, question: Question) -> torch.Tensor:
+    def get_state_features(self, question: Question) -> np.ndarray:
         """Extract features from a question for the RL state."""
         features = [
             question.confidence_score or 0,
-            question.feedback_score or 0,
+            0,  # was feedback_score: never known when answering, and it is the reward
             len(question.question_text) / 100,  # Normalized question length
             len(question.answer_text or "") / 100,  # Normalized answer length
             # Add more features as needed
         ]
         # Pad or truncate to input_size
         features = features[:self.input_size] + [0] * (self.input_size - len(features))
-        return torch.FloatTensor(features).to(self.device)
+        return np.asarray(features, dtype=np.float32)
 
-    def get_action(self, state: torch.Tensor) -> Tuple[int, torch.Tensor]:
+    def get_action(self, state: np.ndarray) -> Tuple[int, np.ndarray]:
         """Get action from policy network."""
-        with torch.no_grad():
-            action_probs = self.policy_network(state)
-            action = torch.multinomial(action_probs, 1).item()
-        return action, action_probs
-
-    def update_policy(
-        self,
-        state: torch.Tensor,
-        action: int,
-        reward: float,
-        action_probs: torch.Tensor
-    ) -> None:
-        """Update policy network using REINFORCE algorithm."""
-        try:
-            # Calculate loss
-            log_prob = torch.log(action_probs[action])
-            loss = -log_prob * reward
-
-            # Update policy
-            self.optimizer.zero_grad()
-            loss.backward()
-            self.optimizer.step()
-
-        except Exception as e:
-            raise RLModelError(f"Error updating policy: {str(e)}")
+        action, action_probs = self.policy.sample(state)
+        return int(action), action_probs
 
     def optimize_response(
         self,
@@ -128,6 +74,14 @@ class RLService:
         current_response: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Optimize Q&A response using RL."""
+        with tracing.stage("rl"):
+            return self._optimize_response(question, current_response)
+
+    def _optimize_response(
+        self,
+        question: Question,
+        current_response: Dict[str, Any]
+    ) -> Dict[str, Any]:
         try:
             # Get state features
             state = self.get_state_features(question)
@@ -150,53 +104,101 @@ class RLService:
                 # This would affect how many chunks we use
                 pass
 
-            # Calculate reward (this is a simple example)
-            reward = 0
-            if question.feedback_score:
-                reward = question.feedback_score / 100.0
-
-            # Update policy
-            self.update_policy(state, action, reward, action_probs)
-
-            # Periodically save model state
-            if np.random.random() < 0.1:  # 10% chance to save
-                self.save_model_state({
-                    "average_reward": reward,
-                    "action_distribution": action_probs.tolist()
-                })
+            # The reward arrives later with the user's rating (record_feedback),
+            # so keep the decision it will be credited to
+            question.meta_data = {
+                **(question.meta_data or {}),
+                "rl": {
+                    "state": state.tolist(),
+                    "action": action,
+                    "action_probs": np.asarray(action_probs, dtype=np.float32).tolist(),
+                },
+            }
 
             return optimized_response
 
         except Exception as e:
             raise RLModelError(f"Error optimizing response: {str(e)}")
 
-    def train_on_historical_data(self, batch_size: int = 32) -> Dict[str, float]:
-        """Train the model on historical question-answer pairs."""
-        try:
-            # Get historical questions with feedback
-            questions = self.db.query(Question).filter(
-                Question.feedback_score.isnot(None)
-            ).limit(batch_size).all()
-
-            if not questions:
-                return {"status": "No training data available"}
-
-            total_reward = 0
-            for question in questions:
-                state = self.get_state_features(question)
-                action, action_probs = self.get_action(state)
-                reward = question.feedback_score / 100.0
-                self.update_policy(state, action, reward, action_probs)
-                total_reward += reward
-
-            # Save model state after training
-            metrics = {
-                "average_reward": total_reward / len(questions),
-                "training_samples": len(questions)
-            }
-            self.save_model_state(metrics)
-
-            return metrics
-
-        except Exception as e:
-            raise RLModelError(f"Error training on historical data: {str(e)}") 
\ No newline at end of file
+    def record_feedback(self, question: Question, feedback_score: int) -> None:
+        """
+        Store the user's rating and, on the first rating, hand the decision
+        logged at inference to the trainer with the rating as its reward.
+        """
+        first_rating = question.feedback_score is None
+        question.feedback_score = feedback_score
+        decision = (question.meta_data or {}).get("rl")
+        if not (first_rating and decision and settings.RL_BACKGROUND_TRAINER):
+            return
+        # Learning happens in the background trainer, never on the request
+        ensure_background_trainer()
+        replay_buffer.push(Experience(
+            state=np.asarray(decision["state"], dtype=np.float32),
+            action=int(decision["action"]),
+            action_probs=np.asarray(decision["action_probs"], dtype=np.float32),
+            reward=feedback_score / 100.0,
+            question_id=question.id,
+        ))
+
+    def iter_feedback_pages(self, page_size: int) -> Iterator[List[Tuple[Optional[Dict[str, Any]], int]]]:
+        """
+        Stream every rated question as ``(logged decision, feedback_score)``, one page at a time.
+
+        Uses keyset pagination on the primary key and selects only the
+        decision out of meta_data (not the answer sources), so memory and
+        per-page cost stay flat however deep into the history we are.
+        """
+        last_id = 0
+        while True:
+            rows = self.db.query(
+                Question.id,
+                Question.meta_data["rl"],
+                Question.feedback_score,
+            ).filter(
+                Question.feedback_score.isnot(None),
+                Question.id > last_id,
+            ).order_by(Question.id).limit(page_size).all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(row[1], row[2]) for row in rows]
+
+    def build_feature_batch(
+        self, rows: List[Tuple[Optional[Dict[str, Any]], int]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Logged ``(states, actions, rewards)`` for rated decisions.
+
+        Rows without a logged decision (answered before decisions were
+        recorded) are dropped. Feature 1 is zeroed as at inference, so the
+        rating never leaks into the state it rewards.
+        """
+        decisions = [(decision, score) for decision, score in rows if decision]
+        states = np.zeros((len(decisions), self.input_size), dtype=np.float32)
+        actions = np.zeros(len(decisions), dtype=np.int64)
+        rewards = np.zeros(len(decisions), dtype=np.float32)
+        for i, (decision, score) in enumerate(decisions):
+            state = np.asarray(decision["state"], dtype=np.float32)[:self.input_size]
+            states[i, :len(state)] = state
+            actions[i] = int(decision["action"])
+            rewards[i] = score / 100.0
+        states[:, 1] = 0.0
+        return np.nan_to_num(states), actions, rewards
+
+    def train_on_historical_data(
+        self,
+        batch_size: int = 256,
+        epochs: int = 1,
+        num_threads: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Train on the full feedback history (see ``rl_trainer.train_on_history``)."""
+        from app.services.rl_trainer import train_on_history
+
+        return train_on_history(
+            self.db,
+            batch_size=batch_size,
+            epochs=epochs,
+            num_threads=num_threads,
+            page_size=page_size,
+        )
@@ -0,0 +1,258 @@
+"""
+Training side of the RL policy. This is the only module that imports torch;
+request handlers use ``rl_inference.NumpyPolicy`` instead.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import RLModelError
+from app.services.rl_inference import NumpyPolicy, policy_cache
+from app.services.rl_replay import Experience, replay_buffer
+
+logger = logging.getLogger(__name__)
+
+
+class QAPolicyNetwork(nn.Module):
+    def __init__(self, input_size: int, hidden_size: int, output_size: int):
+        super(QAPolicyNetwork, self).__init__()
+        self.network = nn.Sequential(
+            nn.Linear(input_size, hidden_size),
+            nn.ReLU(),
+            nn.Linear(hidden_size, hidden_size),
+            nn.ReLU(),
+            nn.Linear(hidden_size, output_size),
+            nn.Softmax(dim=-1)
+        )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.network(x)
+
+
+class PolicyTrainer:
+    """
+    Owns the trainable copy of the policy.
+
+    After each update the weights are exported to a ``NumpyPolicy`` and
+    swapped into the serving ``policy_cache`` in one assignment, so request
+    handlers never see a half-updated network and never wait on gradients.
+    """
+
+    def __init__(self, input_size: int = 10, hidden_size: int = 64, output_size: int = 3):
+        self.network = QAPolicyNetwork(input_size, hidden_size, output_size)
+        self.optimizer = optim.Adam(self.network.parameters(), lr=settings.RL_LEARNING_RATE)
+        self.buffer = replay_buffer
+        self.steps = 0
+        self.baseline = 0.0  # running mean reward, subtracted to reduce gradient variance
+        self._train_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if policy_cache.current is not None:
+            self.load_weights(policy_cache.current.weights)
+
+    def _export_locked(self) -> Dict[str, np.ndarray]:
+        return {name: t.detach().cpu().numpy().copy() for name, t in self.network.state_dict().items()}
+
+    def publish(self) -> NumpyPolicy:
+        """Swap the current weights into the serving cache. Caller holds the lock."""
+        policy = NumpyPolicy(self._export_locked())
+        policy_cache.publish(policy)
+        return policy
+
+    def publish_locked(self) -> NumpyPolicy:
+        with self._train_lock:
+            return self.publish()
+
+    def load_weights(self, weights: Dict[str, np.ndarray]) -> None:
+        """Replace the trainable policy with stored weights."""
+        state_dict = {name: torch.from_numpy(np.array(array)) for name, array in weights.items()}
+        with self._train_lock:
+            self.network.load_state_dict(state_dict)
+
+    def _step(self, states: torch.Tensor, actions: torch.Tensor, rewards: torch.Tensor) -> float:
+        """Batched REINFORCE update with baseline subtraction. Caller holds the lock."""
+        probs = self.network(states)
+        log_probs = torch.log(probs.gather(1, actions.unsqueeze(1)).squeeze(1) + 1e-8)
+        advantages = rewards - self.baseline
+        loss = -(log_probs * advantages).mean()
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        self.baseline += settings.RL_BASELINE_MOMENTUM * (rewards.mean().item() - self.baseline)
+        self.steps += 1
+        return loss.item()
+
+    def train_batch(self, experiences: List[Experience], publish: bool = True) -> Dict[str, float]:
+        """One REINFORCE step over logged experiences; returns loss and mean reward."""
+        if not experiences:
+            return {"loss": 0.0, "average_reward": 0.0}
+        try:
+            states = torch.from_numpy(np.stack([e.state for e in experiences]).astype(np.float32))
+            actions = torch.tensor([e.action for e in experiences], dtype=torch.long)
+            rewards = torch.tensor([e.reward for e in experiences], dtype=torch.float32)
+            with self._train_lock:
+                loss = self._step(states, actions, rewards)
+                if publish:
+                    self.publish()
+            return {"loss": loss, "average_reward": rewards.mean().item()}
+        except Exception as e:
+            raise RLModelError(f"Error updating policy: {str(e)}")
+
+    def train_logged(self, states: torch.Tensor, actions: torch.Tensor, rewards: torch.Tensor) -> float:
+        """
+        Update on logged decisions: each reward is credited to the action that
+        was actually served in that state. Does not publish.
+        """
+        try:
+            with self._train_lock:
+                return self._step(states, actions, rewards)
+        except Exception as e:
+            raise RLModelError(f"Error updating policy: {str(e)}")
+
+    def save(self, db: Session, metrics: Dict[str, Any]) -> int:
+        """Persist the current weights as a new active checkpoint version."""
+        from app.services.rl_model_store import RLModelStore
+
+        with self._train_lock:
+            weights = self._export_locked()
+        version = RLModelStore(db).save(weights, metrics)
+        policy_cache.publish(NumpyPolicy(weights, version=version), store_version=version)
+        return version
+
+    def _persist(self, metrics: Dict[str, float]) -> None:
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.save(db, metrics)
+        finally:
+            db.close()
+
+    def train_pending(self) -> Optional[Dict[str, float]]:
+        """
+        One update on up to ``RL_TRAIN_BATCH_SIZE`` buffered experiences.
+
+        Experiences are only queued once rated, so a reward of 0 is the worst
+        rating, not a missing one, and is trained on like any other.
+        """
+        batch = [e for e in self.buffer.drain(settings.RL_TRAIN_BATCH_SIZE) if e.reward is not None]
+        if not batch:
+            return None
+        metrics = self.train_batch(batch)
+        if self.steps % settings.RL_PERSIST_EVERY_STEPS == 0:
+            self._persist(metrics)
+        return metrics
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.buffer.wait_for(settings.RL_TRAIN_BATCH_SIZE, settings.RL_TRAIN_INTERVAL_SECONDS)
+            try:
+                self.train_pending()
+            except Exception:
+                logger.exception("RL trainer step failed")
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rl-trainer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_trainer: Optional[PolicyTrainer] = None
+_trainer_lock = threading.Lock()
+
+
+def get_trainer(start: bool = True) -> PolicyTrainer:
+    """Process-wide trainer; its background thread starts on first use."""
+    global _trainer
+    if _trainer is None:
+        with _trainer_lock:
+            if _trainer is None:
+                _trainer = PolicyTrainer()
+    if start:
+        _trainer.start()
+    return _trainer
+
+
+def train_on_history(
+    db: Session,
+    batch_size: int = 256,
+    epochs: int = 1,
+    num_threads: Optional[int] = None,
+    page_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Train the policy on the whole feedback history.
+
+    Pages of rated questions are turned into the states and actions logged
+    when they were answered, and split into mini-batches for batched
+    REINFORCE updates (with a running reward baseline), repeated for
+    ``epochs`` passes. Questions answered before decisions were logged are
+    skipped: their rating cannot be credited to an action. The new policy is
+    published and persisted once at the end.
+    """
+    from app.services.rl_service import RLService
+
+    try:
+        rl_service = RLService(db)
+        rl_service.load_latest_model()
+        trainer = get_trainer(start=False)
+        if policy_cache.current is not None:
+            trainer.load_weights(policy_cache.current.weights)
+
+        num_threads = num_threads or settings.RL_TRAIN_THREADS
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        page_size = page_size or max(batch_size, settings.RL_HISTORY_PAGE_SIZE)
+
+        started = time.perf_counter()
+        samples = 0
+        steps = 0
+        total_reward = 0.0
+        total_loss = 0.0
+        for _ in range(epochs):
+            for rows in rl_service.iter_feedback_pages(page_size):
+                states, actions, rewards = rl_service.build_feature_batch(rows)
+                states, actions, rewards = torch.from_numpy(states), torch.from_numpy(actions), torch.from_numpy(rewards)
+                for start in range(0, len(states), batch_size):
+                    batch = slice(start, start + batch_size)
+                    batch_rewards = rewards[batch]
+                    total_loss += trainer.train_logged(states[batch], actions[batch], batch_rewards)
+                    total_reward += batch_rewards.sum().item()
+                    samples += len(batch_rewards)
+                    steps += 1
+
+        if not samples:
+            return {"status": "No training data available"}
+
+        elapsed = time.perf_counter() - started
+        metrics = {
+            "average_reward": total_reward / samples,
+            "average_loss": total_loss / steps,
+            "training_samples": samples,
+            "epochs": epochs,
+            "steps": steps,
+            "duration_seconds": elapsed,
+            "samples_per_second": samples / elapsed if elapsed > 0 else float(samples),
+        }
+        metrics["version"] = trainer.save(db, metrics)
+        return metrics
+
+    except RLModelError:
+        raise
+    except Exception as e:
+        raise RLModelError(f"Error training on historical data: {str(e)}")
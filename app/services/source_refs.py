@@ -0,0 +1,61 @@
+"""
+Answer sources are stored on the question as references to the chunks
+(embedding id, chunk index, score and character span), not as copies of
+their text. ``expand_sources`` resolves the text when a client asks for it.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session, load_only
+
+from app.models.models import DocumentEmbedding
+from app.services.context_packer import ContextChunk
+
+
+def source_ref(chunk: ContextChunk) -> Dict[str, Any]:
+    return {
+        "embedding_id": chunk.embedding_id,
+        "chunk_index": chunk.chunk_index,
+        "score": round(chunk.score, 4) if chunk.score is not None else None,
+        "start": chunk.start,
+        "end": chunk.end,
+    }
+
+
+def expand_sources(db: Session, document_id: int, sources: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Return ``sources`` with each reference's chunk text filled in.
+
+    All referenced chunks are fetched in one query. References whose chunk
+    no longer exists come back with ``"text": None``; sources stored with
+    their text (before references were introduced) are returned unchanged.
+    """
+    if not sources:
+        return []
+    ids = {source["embedding_id"] for source in sources if source.get("embedding_id") is not None}
+    indexes = {
+        source["chunk_index"] for source in sources
+        if source.get("embedding_id") is None and source.get("chunk_index") is not None
+    }
+    by_id, by_index = {}, {}
+    if ids or indexes:
+        query = db.query(DocumentEmbedding).options(
+            load_only(DocumentEmbedding.id, DocumentEmbedding.chunk_index, DocumentEmbedding.chunk_text)
+        ).filter(DocumentEmbedding.document_id == document_id)
+        query = query.filter(
+            DocumentEmbedding.id.in_(ids) | DocumentEmbedding.chunk_index.in_(indexes)
+        )
+        for chunk in query:
+            by_id[chunk.id] = chunk
+            by_index.setdefault(chunk.chunk_index, chunk)
+
+    expanded = []
+    for source in sources:
+        if "text" in source:
+            expanded.append(source)
+            continue
+        if source.get("embedding_id") is not None:
+            chunk = by_id.get(source["embedding_id"])
+        else:
+            chunk = by_index.get(source.get("chunk_index"))
+        expanded.append({**source, "text": chunk.chunk_text if chunk else None})
+    return expanded
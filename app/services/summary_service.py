@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Document, DocumentEmbedding
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+WORD = re.compile(r"[a-zA-Z][a-zA-Z'-]{2,}")
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has have
+    his how its may new now old see two way who did get him let put say she
+    too use that with this from they will would there their what about which
+    when make like time just know take into year your some could them than
+    then these been also more other only were such
+""".split())
+
+@dataclass
+class Candidate:
+    chunk_index: int
+    position: int
+    text: str
+    terms: Counter
+
+
+def _map_chunk(chunk_index: int, text: str) -> Tuple[List[Candidate], Counter]:
+    """Split one chunk into candidate sentences and count its terms."""
+    candidates = []
+    totals: Counter = Counter()
+    for position, sentence in enumerate(SENTENCE_SPLIT.split(text)):
+        sentence = " ".join(sentence.split())
+        if len(sentence) < 20:
+            continue
+        terms = Counter(
+            w for w in (m.group().lower() for m in WORD.finditer(sentence))
+            if w not in STOPWORDS
+        )
+        if not terms:
+            continue
+        candidates.append(Candidate(chunk_index, position, sentence, terms))
+        totals.update(terms)
+    return candidates, totals
+
+
+def _reduce(results: Sequence[Tuple[List[Candidate], Counter]], max_chars: int) -> str:
+    """Score sentences by document-wide term frequency and keep the best ones in order."""
+    frequencies: Counter = Counter()
+    candidates: List[Candidate] = []
+    seen = set()
+    for chunk_candidates, totals in results:
+        frequencies.update(totals)
+        for candidate in chunk_candidates:
+            # Chunk overlap repeats sentences; keep the first occurrence only
+            if candidate.text not in seen:
+                seen.add(candidate.text)
+                candidates.append(candidate)
+    if not candidates:
+        return ""
+
+    top = max(frequencies.values())
+
+    def score(candidate: Candidate) -> float:
+        weight = sum(frequencies[t] / top for t in candidate.terms)
+        # Favour the opening of the document slightly, as it usually introduces it
+        return weight / (len(candidate.terms) ** 0.5) + (0.5 if candidate.chunk_index == 0 else 0.0)
+
+    chosen: List[Candidate] = []
+    used = 0
+    for candidate in sorted(candidates, key=score, reverse=True):
+        if used + len(candidate.text) + 1 > max_chars:
+            continue
+        chosen.append(candidate)
+        used += len(candidate.text) + 1
+    if not chosen:
+        return candidates[0].text[:max_chars].rstrip() + "..."
+
+    chosen.sort(key=lambda c: (c.chunk_index, c.position))
+    return " ".join(c.text for c in chosen)
+
+
+def summarize_chunks(chunks: Sequence[Tuple[int, str]], max_chars: Optional[int] = None) -> str:
+    """
+    Extractive summary of a document from its ``(chunk_index, text)`` pairs.
+
+    Each chunk is mapped to candidate sentences with their term counts, then
+    reduced into a summary of at most ``max_chars`` characters in document
+    order. The scoring is pure-Python regex work that holds the GIL, so it
+    runs sequentially; a thread pool only added overhead.
+    """
+    max_chars = max_chars or settings.SUMMARY_MAX_CHARS
+    return _reduce([_map_chunk(index, text) for index, text in chunks], max_chars)
+
+
+class SummaryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_fresh(self, document: Document) -> bool:
+        return document.summary is not None and (
+            document.summary_index_version == (document.index_version or 0)
+        )
+
+    def refresh(self, document: Document, chunks: Optional[Sequence[Tuple[int, str]]] = None) -> str:
+        """Rebuild and store the summary for the document's current index version."""
+        if chunks is None:
+            chunks = self.db.query(
+                DocumentEmbedding.chunk_index, DocumentEmbedding.chunk_text
+            ).filter(
+                DocumentEmbedding.document_id == document.id
+            ).order_by(DocumentEmbedding.chunk_index).all()
+        document.summary = summarize_chunks(chunks)
+        document.summary_index_version = document.index_version or 0
+        self.db.add(document)
+        self.db.commit()
+        return document.summary
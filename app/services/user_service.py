@@ -1,9 +1,12 @@
 from typing import Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.pagination import PageParams, paginate, paginate_async
+from app.db.loading import load_schema_columns
+from app.core.security import get_password_hash, get_password_hash_async, pwd_context, verify_password_async
 from app.models.models import User
-from app.schemas.schemas import UserCreate, UserUpdate
+from app.schemas.schemas import User as UserSchema, UserCreate, UserUpdate
 
 
 class UserService:
@@ -16,8 +19,9 @@ class UserService:
     def get_by_email(self, email: str) -> Optional[User]:
         return self.db.query(User).filter(User.email == email).first()
 
-    def get_multi(self, *, skip: int = 0, limit: int = 100) -> list[User]:
-        return self.db.query(User).offset(skip).limit(limit).all()
+    def get_page(self, params: PageParams) -> dict:
+        query = self.db.query(User).options(load_schema_columns(User, UserSchema))
+        return paginate(query, User, params, count_key=("users",))
 
     def create(self, *, obj_in: UserCreate) -> User:
         db_obj = User(
@@ -50,12 +54,73 @@ class UserService:
         user = self.get_by_email(email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+        if not valid:
             return None
+        if new_hash:
+            user.hashed_password = new_hash
+            self.db.commit()
         return user
 
     def is_active(self, user: User) -> bool:
         return user.is_active
 
     def is_superuser(self, user: User) -> bool:
-        return user.is_superuser 
\ No newline at end of file
+        return user.is_superuser 
+
+
+class AsyncUserService:
+    """``UserService`` on an awaitable session, for async endpoints."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get(self, id: int) -> Optional[User]:
+        return await self.db.get(User, id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return await self.db.scalar(select(User).where(User.email == email))
+
+    async def get_page(self, params: PageParams) -> dict:
+        statement = select(User).options(load_schema_columns(User, UserSchema))
+        return await paginate_async(self.db, statement, User, params, count_key=("users",))
+
+    async def create(self, *, obj_in: UserCreate) -> User:
+        # bcrypt is deliberately slow; it runs on the dedicated hashing pool
+        hashed_password = await get_password_hash_async(obj_in.password)
+        db_obj = User(
+            email=obj_in.email,
+            hashed_password=hashed_password,
+            full_name=obj_in.full_name,
+            is_superuser=False,
+        )
+        self.db.add(db_obj)
+        await self.db.commit()
+        await self.db.refresh(db_obj)
+        return db_obj
+
+    async def update(self, *, db_obj: User, obj_in: UserUpdate) -> User:
+        update_data = obj_in.dict(exclude_unset=True)
+        if update_data.get("password"):
+            update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
+
+        for field in update_data:
+            setattr(db_obj, field, update_data[field])
+
+        self.db.add(db_obj)
+        await self.db.commit()
+        await self.db.refresh(db_obj)
+        return db_obj
+
+    async def authenticate(self, *, email: str, password: str) -> Optional[User]:
+        user = await self.get_by_email(email=email)
+        if not user:
+            return None
+        valid, new_hash = await verify_password_async(password, user.hashed_password)
+        if not valid:
+            return None
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this hash was made
+            user.hashed_password = new_hash
+            await self.db.commit()
+        return user
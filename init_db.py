@@ -1,10 +1,53 @@
-from app.db.session import engine
-from app.db.base import Base
+import os
+from typing import Optional
 
-def init_db():
-    """Initialize the database by creating all tables."""
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.db.session import create_db_engine, engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def enable_incremental_vacuum(target: Engine) -> None:
+    """
+    Switch a SQLite file to ``auto_vacuum=INCREMENTAL`` once, so document
+    deletes can hand freed pages back. The mode only takes effect through a
+    VACUUM, which rewrites the whole file, so it runs here rather than on
+    every connect. VACUUM cannot run inside a transaction, hence the raw
+    connection and executescript.
+    """
+    if target.dialect.name != "sqlite":
+        return
+    raw = target.raw_connection()
+    try:
+        connection = raw.driver_connection
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+            connection.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+    finally:
+        raw.close()
+
+
+def init_db(database_url: Optional[str] = None):
+    """Initialize the database by running all migrations (``DATABASE_URL`` unless given)."""
+    config = Config(ALEMBIC_INI)
+    target = engine
+    if database_url:
+        config.set_main_option("sqlalchemy.url", database_url)
+        target = create_db_engine(database_url)
+    try:
+        tables = inspect(target).get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            # Created by create_all before migrations existed: 0001 is that schema, 0001a adds the rest
+            command.stamp(config, "0001")
+        command.upgrade(config, "head")
+        enable_incremental_vacuum(target)
+    finally:
+        if target is not engine:
+            target.dispose()
+    print("Database migrated successfully!")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db()
@@ -0,0 +1,165 @@
+"""
+Benchmark hot-path lookups with and without the indexes from migration 0002.
+
+    python scripts/benchmark_indexes.py --embeddings 1000000 --lookups 200
+
+Builds a throwaway SQLite database from the model tables (no secondary
+indexes), fills it with synthetic rows, times the queries the API runs,
+creates the indexes and times them again. Prints the results as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import sqlite  # noqa: E402
+from sqlalchemy.schema import CreateIndex, CreateTable  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+
+TABLES = ("users", "documents", "conversations", "document_embeddings", "questions")
+
+QUERIES = {
+    "chunks_for_document": (
+        "SELECT id, chunk_index, chunk_text, start_offset, end_offset FROM document_embeddings "
+        "WHERE document_id = ? ORDER BY chunk_index",
+        "documents",
+    ),
+    "chunk_count_for_document": (
+        "SELECT count(*) FROM document_embeddings WHERE document_id = ?",
+        "documents",
+    ),
+    "documents_for_owner": (
+        "SELECT id, title FROM documents WHERE owner_id = ? ORDER BY created_at DESC LIMIT 100",
+        "users",
+    ),
+    "questions_for_user": (
+        "SELECT id, question_text FROM questions WHERE user_id = ? ORDER BY created_at DESC LIMIT 100",
+        "users",
+    ),
+    "questions_for_document": (
+        "SELECT count(*) FROM questions WHERE document_id = ?",
+        "documents",
+    ),
+}
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    dialect = sqlite.dialect()
+    for name in TABLES:
+        conn.execute(str(CreateTable(Base.metadata.tables[name]).compile(dialect=dialect)))
+
+
+def create_indexes(conn: sqlite3.Connection) -> float:
+    dialect = sqlite.dialect()
+    started = time.perf_counter()
+    for name in TABLES:
+        for index in Base.metadata.tables[name].indexes:
+            conn.execute(str(CreateIndex(index).compile(dialect=dialect)))
+    conn.execute("ANALYZE")
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def populate(conn: sqlite3.Connection, users: int, documents: int, embeddings: int, questions: int) -> None:
+    rng = random.Random(0)
+    now = "2024-01-01 00:00:00"
+    conn.executemany(
+        "INSERT INTO users (id, email, hashed_password, created_at) VALUES (?, ?, 'x', ?)",
+        ((i, f"user{i}@example.com", now) for i in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO documents (id, title, owner_id, created_at) VALUES (?, ?, ?, ?)",
+        ((i, f"doc {i}", rng.randint(1, users), now) for i in range(1, documents + 1)),
+    )
+    per_document = max(1, embeddings // documents)
+    conn.executemany(
+        "INSERT INTO document_embeddings (document_id, chunk_index, chunk_text, start_offset, end_offset) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            # Interleave documents, as concurrent ingests would
+            (i % documents + 1, i // documents, f"chunk text {i}", (i // documents) * 800, (i // documents) * 800 + 1000)
+            for i in range(per_document * documents)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO questions (user_id, document_id, question_text, created_at) VALUES (?, ?, ?, ?)",
+        ((rng.randint(1, users), rng.randint(1, documents), f"question {i}", now) for i in range(questions)),
+    )
+    conn.commit()
+
+
+def time_queries(conn: sqlite3.Connection, keys: dict, lookups: int) -> dict:
+    results = {}
+    for name, (sql, key_space) in QUERIES.items():
+        rng = random.Random(1)
+        samples = []
+        for _ in range(lookups):
+            key = rng.randint(1, keys[key_space])
+            started = time.perf_counter()
+            conn.execute(sql, (key,)).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        results[name] = {
+            "p50_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+            "plan": " / ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, (1,))),
+        }
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--embeddings", type=int, default=1_000_000)
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        create_schema(conn)
+
+        started = time.perf_counter()
+        populate(conn, args.users, args.documents, args.embeddings, args.questions)
+        populate_seconds = time.perf_counter() - started
+
+        keys = {"users": args.users, "documents": args.documents}
+        before = time_queries(conn, keys, args.lookups)
+        index_seconds = create_indexes(conn)
+        after = time_queries(conn, keys, args.lookups)
+        conn.close()
+
+    report = {
+        "rows": {
+            "users": args.users,
+            "documents": args.documents,
+            "document_embeddings": args.embeddings,
+            "questions": args.questions,
+        },
+        "populate_seconds": round(populate_seconds, 2),
+        "create_indexes_seconds": round(index_seconds, 2),
+        "queries": {
+            name: {
+                "before": before[name],
+                "after": after[name],
+                "speedup": round(before[name]["p50_ms"] / max(after[name]["p50_ms"], 1e-6), 1),
+            }
+            for name in QUERIES
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Check that importing the web app stays cheap.
+
+    python scripts/check_import_time.py --budget-ms 1500
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter,
+prints the slowest modules, and exits non-zero if the cumulative import time
+is over budget or if any heavy library (torch, langchain, loaders, ...) was
+imported by the web layer.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEAVY_MODULES = (
+    "torch",
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_huggingface",
+    "langchain_mistralai",
+    "langchain_text_splitters",
+    "transformers",
+    "sentence_transformers",
+    "faiss",
+    "pdfminer",
+    "docx2txt",
+    "unstructured",
+)
+
+
+def measure(module: str):
+    """Return ``[(cumulative_us, self_us, name)]`` for every top-level import line."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Keep the indentation of the name: it marks nested imports
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return rows
+
+
+def main(argv=None) -> int:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=settings.IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = measure(args.module)
+    # Top-level entries have no indentation; their cumulative times add up to the total
+    total_ms = sum(cumulative for cumulative, _, name in rows if not name.startswith(" ")) / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest modules (cumulative ms):")
+    for cumulative, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}  {name.strip()}")
+
+    imported = {name.strip().split(".")[0] for _, _, name in rows}
+    heavy = sorted(imported.intersection(HEAVY_MODULES))
+    failed = False
+    if heavy:
+        print("heavy modules imported at startup: " + ", ".join(heavy))
+        failed = True
+    if total_ms > args.budget_ms:
+        print("import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
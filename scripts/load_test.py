@@ -0,0 +1,470 @@
+"""
+End-to-end load test of the API against local LLM and embedding stand-ins.
+
+    python scripts/load_test.py --users 20 --documents-per-user 2 --questions 500 \
+        --concurrency 32 --llm-latency-ms 300 --embedding-latency-ms 2 \
+        --output loadtest/results.json --compare loadtest/previous.json
+
+Starts the stub Mistral server (scripts/stub_mistral_server.py) and the app
+under uvicorn with ``EMBEDDING_BACKEND=fake`` on a throwaway SQLite database,
+waits for /ready, then runs the phases in order: register and login, bulk
+upload (until ingestion completes), reprocess, and concurrent questions.
+Reports throughput and p50/p95/p99 latency per endpoint and saves them as
+JSON; ``--compare`` prints the change against an earlier result.
+``--base-url`` drives an already running deployment instead, with whatever
+LLM and embeddings it is configured for.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+
+WORDS = (
+    "invoice contract payment delivery warranty customer supplier order refund schedule "
+    "liability termination notice clause period amount currency tax discount shipment "
+    "inspection defect claim insurance storage transport deadline penalty approval budget "
+    "quarter revenue forecast margin audit compliance policy employee training safety"
+).split()
+QUESTIONS = (
+    "What does the document say about {0}?",
+    "How is {0} related to {1}?",
+    "Summarise the section on {0} and {1}.",
+    "When is the {0} due?",
+)
+
+
+class Recorder:
+    """Latency samples per endpoint: (start time, seconds, status)."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, float, int]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, started: float, seconds: float, status: int) -> None:
+        with self._lock:
+            self.samples[endpoint].append((started, seconds, status))
+
+
+class Client:
+    """Minimal JSON-over-HTTP client keeping one connection per thread."""
+
+    def __init__(self, base_url: str, recorder: Recorder, timeout: float):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parsed.netloc
+        self.prefix = parsed.path.rstrip("/")
+        self.recorder = recorder
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, endpoint: Optional[str], method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None, token: Optional[str] = None) -> Tuple[int, Any]:
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        started = time.perf_counter()
+        try:
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self.connection_class(self.netloc, timeout=self.timeout)
+            conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = conn.getresponse()
+            status, payload = response.status, response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self._local.conn = None
+            status, payload = 0, str(e).encode()
+        if endpoint:
+            self.recorder.record(endpoint, started, time.perf_counter() - started, status)
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, payload.decode("utf-8", "replace")
+
+    def json(self, endpoint, method, path, data=None, token=None):
+        body = json.dumps(data).encode() if data is not None else None
+        return self.request(endpoint, method, path, body, {"Content-Type": "application/json"}, token)
+
+    def form(self, endpoint, path, fields):
+        body = urllib.parse.urlencode(fields).encode()
+        return self.request(endpoint, "POST", path, body, {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def upload(self, endpoint, path, fields, filename, content, token):
+        boundary = uuid.uuid4().hex
+        parts = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items()
+        ]
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: text/plain\r\n\r\n".encode() + content + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode())
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        return self.request(endpoint, "POST", path, b"".join(parts), headers, token)
+
+
+# Statistics
+
+def percentile(ordered: List[float], pct: float) -> float:
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[Tuple[float, float, int]]) -> Dict[str, Any]:
+    ordered = sorted(seconds for _, seconds, _ in samples)
+    window = max(started + seconds for started, seconds, _ in samples) - min(started for started, _, _ in samples)
+    statuses = Counter(str(status) for _, _, status in samples)
+    return {
+        "count": len(samples),
+        "errors": sum(1 for _, _, status in samples if not 200 <= status < 300),
+        "statuses": dict(statuses),
+        "throughput_rps": round(len(samples) / window, 2) if window > 0 else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def run_phase(name: str, tasks: List[Callable[[], Any]], concurrency: int, phases: Dict[str, Any]) -> List[Any]:
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [pool.submit(task) for task in tasks]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                raise future.exception()
+        results = [future.result() for future in futures]
+    finally:
+        # After a failure, let in-flight requests finish but start no more
+        pool.shutdown(wait=True, cancel_futures=True)
+    elapsed = time.perf_counter() - started
+    phases[name] = {
+        "tasks": len(tasks),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "tasks_per_second": round(len(tasks) / elapsed, 2) if elapsed > 0 else None,
+    }
+    print(f"  {name}: {len(tasks)} tasks in {elapsed:.1f}s", flush=True)
+    return results
+
+
+# Scenario
+
+class SetupError(SystemExit):
+    """A request the scenario depends on failed; the load numbers would be meaningless."""
+
+
+def _require(what: str, status: int, body: Any) -> None:
+    if not 200 <= status < 300:
+        raise SetupError(f"{what} failed with HTTP {status}: {str(body)[:500]}")
+
+
+def make_document(rng: random.Random, kilobytes: int) -> bytes:
+    words, size = [], 0
+    while size < kilobytes * 1024:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + ". "
+        words.append(sentence)
+        size += len(sentence)
+    return "".join(words).encode()
+
+
+def register_and_login(client: Client, email: str, password: str) -> str:
+    status, body = client.json("POST /auth/register", "POST", f"{API}/auth/register", {
+        "email": email, "password": password, "full_name": "Load Test",
+    })
+    _require(f"Registering {email}", status, body)
+    status, body = client.form("POST /auth/login/access-token", f"{API}/auth/login/access-token", {
+        "username": email, "password": password,
+    })
+    _require(f"Logging in {email}", status, body)
+    return body["access_token"]
+
+
+def upload_and_wait(client: Client, token: str, filename: str, content: bytes,
+                    poll_interval: float, timeout: float, recorder: Recorder) -> int:
+    """Upload a document and poll it until ingestion completes; returns its id."""
+    started = time.perf_counter()
+    status, body = client.upload(
+        "POST /documents/upload", f"{API}/documents/upload", {"title": filename}, filename, content, token,
+    )
+    _require(f"Uploading {filename}", status, body)
+    document_id = body["document_id"]
+    wait_for_ingestion(client, token, document_id, "upload", started, poll_interval, timeout, recorder)
+    return document_id
+
+
+def reprocess_and_wait(client: Client, token: str, document_id: int,
+                       poll_interval: float, timeout: float, recorder: Recorder) -> None:
+    """Queue a document for reprocessing and poll it until ingestion completes."""
+    started = time.perf_counter()
+    status, body = client.json(
+        "POST /documents/{document_id}/process", "POST", f"{API}/documents/{document_id}/process", token=token,
+    )
+    _require(f"Reprocessing document {document_id}", status, body)
+    wait_for_ingestion(client, token, document_id, "process", started, poll_interval, timeout, recorder)
+
+
+def wait_for_ingestion(client: Client, token: str, document_id: int, trigger: str, started: float,
+                       poll_interval: float, timeout: float, recorder: Recorder) -> None:
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        time.sleep(poll_interval)
+        status, body = client.json("GET /documents/{document_id}", "GET", f"{API}/documents/{document_id}", token=token)
+        _require(f"Polling document {document_id}", status, body)
+        state = body.get("processing_status")
+        if state == "completed":
+            recorder.record(f"ingestion ({trigger} to completed)", started, time.perf_counter() - started, 200)
+            return
+        if state == "failed":
+            raise SetupError(f"Ingestion of document {document_id} failed; see the app log")
+    raise SetupError(f"Ingestion of document {document_id} did not finish in {timeout:.0f}s")
+
+
+def run_scenario(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = Recorder()
+    client = Client(base_url, recorder, args.request_timeout)
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    password = "load-test-password"
+    phases: Dict[str, Any] = {}
+
+    emails = [f"loadtest-{run_id}-{i}@example.com" for i in range(args.users)]
+    users = run_phase("auth", [
+        (lambda email=email: register_and_login(client, email, password)) for email in emails
+    ], args.concurrency, phases)
+
+    uploads = []
+    for user, token in enumerate(users):
+        for doc in range(args.documents_per_user):
+            filename = f"loadtest-{run_id}-{user}-{doc}.txt"
+            uploads.append((token, filename, make_document(rng, args.document_kb)))
+    documents = run_phase("upload", [
+        (lambda token=token, filename=filename, content=content: (
+            token, upload_and_wait(client, token, filename, content, args.poll_interval,
+                                   args.ingestion_timeout, recorder)
+        ))
+        for token, filename, content in uploads
+    ], args.concurrency, phases)
+
+    if args.reprocess:
+        run_phase("process", [
+            (lambda token=token, document_id=document_id: reprocess_and_wait(
+                client, token, document_id, args.poll_interval, args.ingestion_timeout, recorder,
+            ))
+            for token, document_id in documents
+        ], args.concurrency, phases)
+
+    questions = []
+    for _ in range(args.questions):
+        token, document_id = rng.choice(documents)
+        template = rng.choice(QUESTIONS)
+        questions.append((token, document_id, template.format(*rng.sample(WORDS, 2))))
+    run_phase("questions", [
+        (lambda token=token, document_id=document_id, text=text: client.json(
+            "POST /questions/", "POST", f"{API}/questions/",
+            {"question_text": text, "document_id": document_id}, token=token,
+        ))
+        for token, document_id, text in questions
+    ], args.concurrency, phases)
+
+    status, server_status = client.json(None, "GET", "/status")
+    return {
+        "phases": phases,
+        "endpoints": {endpoint: summarize(samples) for endpoint, samples in sorted(recorder.samples.items())},
+        "server_status": server_status if status == 200 else None,
+    }
+
+
+# Local stack
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    parsed = urllib.parse.urlsplit(url)
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"App exited with status {process.returncode} before becoming ready")
+        try:
+            conn = http.client.HTTPConnection(parsed.netloc, timeout=2)
+            conn.request("GET", parsed.path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"App not ready after {timeout:.0f}s")
+
+
+def start_local_stack(args: argparse.Namespace, workdir: str) -> Tuple[str, List[subprocess.Popen]]:
+    stub_port, app_port = _free_port(), _free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "scripts", "stub_mistral_server.py"),
+        "--port", str(stub_port), "--latency-ms", str(args.llm_latency_ms),
+        "--jitter-ms", str(args.llm_jitter_ms), "--seed", str(args.seed),
+    ], cwd=ROOT, stdout=subprocess.DEVNULL)
+
+    env = dict(os.environ)
+    for name in ("PINECONE_API_KEY", "PINECONE_ENV", "PINECONE_INDEX_NAME"):
+        env.setdefault(name, "unused")
+    unlimited = str(10 ** 12)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "MISTRAL_ENDPOINT": f"http://127.0.0.1:{stub_port}/v1",
+        "MISTRAL_API_KEY": "stub",
+        "EMBEDDING_BACKEND": "fake",
+        "FAKE_EMBEDDING_LATENCY_MS": str(args.embedding_latency_ms),
+        "WARMUP_ON_STARTUP": "true",
+        "LOG_LEVEL": "WARNING",
+        "TRACING_EXPORTER": "",
+        # Measure capacity, not the per-user and per-IP limits
+        "AUTH_IP_RATE_PER_MINUTE": unlimited, "AUTH_IP_BURST": unlimited,
+        "AUTH_ACCOUNT_RATE_PER_MINUTE": unlimited, "AUTH_ACCOUNT_BURST": unlimited,
+        "QUOTA_REQUESTS_PER_MINUTE": unlimited, "QUOTA_REQUEST_BURST": unlimited,
+        "QUOTA_MAX_CONCURRENT_JOBS": unlimited, "QUOTA_INGEST_BYTES_PER_DAY": unlimited,
+        "QUOTA_LLM_TOKENS_PER_HOUR": unlimited,
+    })
+    os.makedirs(env["UPLOAD_DIR"], exist_ok=True)
+    subprocess.run([sys.executable, "init_db.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    app = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+        "--workers", str(args.app_workers), "--log-level", "warning",
+    ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)  # logs go to stderr
+
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        _wait_ready(f"{base_url}/ready", app, args.startup_timeout)
+    except BaseException:
+        for process in (app, stub):
+            process.terminate()
+        raise
+    return base_url, [app, stub]
+
+
+# Reporting
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"\n{'endpoint':45} {'count':>6} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in results["endpoints"].items():
+        print(
+            f"{endpoint:45} {stats['count']:6d} {stats['errors']:5d} {stats['throughput_rps'] or 0:8.1f} "
+            f"{stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f}"
+        )
+
+
+def print_comparison(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(f"\nAgainst {baseline.get('git_commit') or 'baseline'} ({baseline.get('started_at')}):")
+    print(f"{'endpoint':45} {'p95 ms':>20} {'rps':>18}")
+    for endpoint, stats in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        p95_change = (stats["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(
+            f"{endpoint:45} {before['p95_ms']:7.1f} -> {stats['p95_ms']:7.1f} ({p95_change:+.0f}%) "
+            f"{before['throughput_rps'] or 0:7.1f} -> {stats['throughput_rps'] or 0:7.1f}"
+        )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", help="drive a running deployment instead of starting a local stack")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--documents-per-user", type=int, default=2)
+    parser.add_argument("--document-kb", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--no-reprocess", dest="reprocess", action="store_false",
+                        help="skip the POST /documents/{id}/process phase")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--embedding-latency-ms", type=float, default=1.0, help="fake embedder, per text")
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--ingestion-timeout", type=float, default=300)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--output", default=os.path.join("loadtest", "results.json"))
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary database and uploads")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    started_at = datetime.now(timezone.utc).isoformat()
+    workdir, processes = None, []
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip("/")
+        else:
+            workdir = tempfile.mkdtemp(prefix="loadtest-")
+            print(f"Starting stub LLM and app (data in {workdir})", flush=True)
+            base_url, processes = start_local_stack(args, workdir)
+        print(f"Running against {base_url}", flush=True)
+        results = {
+            "started_at": started_at,
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {**vars(args), "local_stack": not args.base_url},
+            **run_scenario(base_url, args),
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
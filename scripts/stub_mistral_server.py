@@ -0,0 +1,138 @@
+"""
+Local stand-in for the Mistral chat completions API, with injectable latency.
+
+Point the app at it with MISTRAL_ENDPOINT=http://127.0.0.1:8089/v1 to
+exercise deadlines, hedging and the fallback model without paying for
+live calls:
+
+    python scripts/stub_mistral_server.py --latency-ms 300 \
+        --slow-fraction 0.1 --slow-latency-ms 8000 --model-latency mistral-tiny=2000
+
+Answers are derived from the prompt, so identical prompts always produce
+identical answers.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency_ms / 1000.0
+        self.jitter = args.jitter_ms / 1000.0
+        self.slow_fraction = args.slow_fraction
+        self.slow_latency = args.slow_latency_ms / 1000.0
+        self.error_rate = args.error_rate
+        self.model_latency = {}
+        for item in args.model_latency:
+            name, _, ms = item.partition("=")
+            self.model_latency[name] = float(ms) / 1000.0
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self, model: str):
+        """Return (delay seconds, fail) for the next request."""
+        with self._lock:
+            self.requests += 1
+            roll, jitter, error_roll = self._rng.random(), self._rng.random(), self._rng.random()
+        delay = self.model_latency.get(model, self.latency)
+        if roll < self.slow_fraction:
+            delay = self.slow_latency
+        delay += jitter * self.jitter
+        return delay, error_roll < self.error_rate
+
+
+def _answer(model: str, messages: list) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+    question = prompt.rsplit("Human:", 1)[-1].split("AI Assistant:", 1)[0].strip()
+    return f"[{model} stub {digest}] Answer to: {question[:200]}"
+
+
+def make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                return self._send(200, {"object": "list", "data": []})
+            self._send(200, {"status": "ok", "requests": config.requests})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send(404, {"message": "not found"})
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            model = body.get("model", "unknown")
+            messages = body.get("messages", [])
+
+            delay, fail = config.draw(model)
+            time.sleep(delay)
+            if fail:
+                return self._send(503, {"message": "stub injected failure"})
+
+            content = _answer(model, messages)
+            prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+            completion_tokens = len(content.split())
+            self._send(200, {
+                "id": f"stub-{config.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-latency-ms", type=float, default=10000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--model-latency", action="append", default=[],
+        help="per-model base latency, e.g. mistral-small=1500 (repeatable)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def serve(args: argparse.Namespace) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubConfig(args)))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = serve(args)
+    print(f"Stub Mistral API listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,41 @@
+"""
+Train the RL answer policy on the full feedback history.
+
+    python scripts/train_rl_policy.py --epochs 3 --batch-size 512 --threads 4
+
+Prints the training metrics, including samples per second.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.rl_service import RLService  # noqa: E402
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--page-size", type=int, default=None, help="rows fetched per DB page")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        metrics = RLService(db).train_on_historical_data(
+            batch_size=args.batch_size,
+            epochs=args.epochs,
+            num_threads=args.threads,
+            page_size=args.page_size,
+        )
+    finally:
+        db.close()
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Test settings. ``app.core.config.settings`` is built once at import, so the
+environment is set here, before any test module imports ``app``.
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="qa-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TMP_DIR, 'app.db')}",
+    "UPLOAD_DIR": os.path.join(_TMP_DIR, "uploads"),
+    "PROFILE_DIR": os.path.join(_TMP_DIR, "profiles"),
+    "EMBEDDING_BACKEND": "fake",
+    "WARMUP_ON_STARTUP": "false",
+    "RL_BACKGROUND_TRAINER": "false",
+    "BCRYPT_ROUNDS": "4",
+    "AUTH_IP_BURST": "1000",  # every TestClient request comes from one address
+    "LOG_LEVEL": "WARNING",
+})
+for name in ("PINECONE_API_KEY", "PINECONE_ENV", "PINECONE_INDEX_NAME"):
+    os.environ.setdefault(name, "test")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def migrated_db():
+    """The test database, migrated to head once per session."""
+    from init_db import init_db
+
+    init_db()
+    return os.environ["DATABASE_URL"]
@@ -0,0 +1,143 @@
+"""
+End-to-end requests through the app on a migrated SQLite database, under
+both ``DB_ASYNC_DRIVER`` settings (aiosqlite engine, or the sync engine in
+the threadpool).
+"""
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+PASSWORD = "smoke-test-password"
+
+
+@pytest.fixture(scope="module")
+def client(migrated_db):
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(params=[True, False], ids=["async-driver", "threaded-sync"])
+def async_driver(request, monkeypatch):
+    monkeypatch.setattr(settings, "DB_ASYNC_DRIVER", request.param)
+    return request.param
+
+
+def _register_and_login(client):
+    email = f"smoke-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post(f"{API}/auth/register", json={"email": email, "password": PASSWORD, "full_name": "Smoke"})
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == email
+
+    response = client.post(f"{API}/auth/login/access-token", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    token = response.json()["access_token"]
+    return email, {"Authorization": f"Bearer {token}"}
+
+
+def _wait_until_processed(client, headers, document_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(f"{API}/documents/{document_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        status = response.json()["processing_status"]
+        if status in ("completed", "failed"):
+            return status
+        time.sleep(0.05)
+    pytest.fail(f"document {document_id} was not processed within {timeout}s")
+
+
+def test_register_login_and_list(client, async_driver):
+    email, headers = _register_and_login(client)
+
+    response = client.get(f"{API}/users/me", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == email
+
+    for resource in ("documents", "questions", "conversations"):
+        response = client.get(f"{API}/{resource}/", headers=headers, params={"include_total": True})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert page["items"] == [] and page["total"] == 0 and page["has_more"] is False
+
+
+def test_uploaded_documents_are_paginated(client, async_driver):
+    _, headers = _register_and_login(client)
+    uploaded = []
+    for i in range(3):
+        response = client.post(
+            f"{API}/documents/upload",
+            headers=headers,
+            data={"title": f"doc {i}"},
+            files={"file": (f"doc{i}.txt", f"Document number {i} talks about topic {i}.".encode(), "text/plain")},
+        )
+        assert response.status_code == 200, response.text
+        uploaded.append(response.json()["document_id"])
+    for document_id in uploaded:
+        assert _wait_until_processed(client, headers, document_id) == "completed"
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"{API}/documents/", headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        seen += [item["id"] for item in page["items"]]
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+    assert seen == sorted(uploaded, reverse=True)
+
+    response = client.get(f"{API}/documents/", headers=headers, params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+
+def test_reprocessing_is_queued_like_an_upload(client, async_driver):
+    _, headers = _register_and_login(client)
+    response = client.post(
+        f"{API}/documents/upload",
+        headers=headers,
+        data={"title": "reprocess"},
+        files={"file": ("reprocess.txt", b"Reprocessing goes through the ingestion queue.", "text/plain")},
+    )
+    assert response.status_code == 200, response.text
+    document_id = response.json()["document_id"]
+    assert _wait_until_processed(client, headers, document_id) == "completed"
+
+    response = client.post(f"{API}/documents/{document_id}/process", headers=headers)
+    assert response.status_code == 202, response.text
+    assert _wait_until_processed(client, headers, document_id) == "completed"
+
+    assert client.post(f"{API}/documents/999999/process", headers=headers).status_code == 404
+
+
+def test_requests_without_a_valid_token_are_rejected(client, async_driver):
+    assert client.get(f"{API}/users/me").status_code == 401
+    response = client.get(f"{API}/documents/", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code in (401, 403)
+
+
+def test_deactivation_takes_effect_despite_the_principal_cache(client, async_driver):
+    from app.db.session import SessionLocal
+    from app.models.models import User
+
+    email, headers = _register_and_login(client)
+    assert client.get(f"{API}/users/me", headers=headers).status_code == 200  # now cached
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).one()
+        user.is_active = False
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get(f"{API}/users/me", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["message"] == "Inactive user"
@@ -0,0 +1,108 @@
+import threading
+
+from app.core import cache as cache_module
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=10)
+    cache.set("k", "v")
+    clock.now += 9.9
+    assert cache.get("k") == "v"
+    clock.now += 0.1
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_default(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=10)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2)
+    clock.now += 2
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_least_recently_used_is_evicted(monkeypatch):
+    cache, _ = _cache(monkeypatch, ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # b is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_hits_and_misses_are_counted(monkeypatch):
+    cache, _ = _cache(monkeypatch, ttl=10)
+    cache.get("k")
+    cache.set("k", "v")
+    cache.get("k")
+    cache.get("k")
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_get_or_set_computes_once_until_expiry(monkeypatch):
+    cache, clock = _cache(monkeypatch, ttl=10)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_set("k", factory) == 1
+    assert cache.get_or_set("k", factory) == 1
+    clock.now += 10
+    assert cache.get_or_set("k", factory) == 2
+
+
+def test_falsy_values_are_cached(monkeypatch):
+    cache, _ = _cache(monkeypatch, ttl=10)
+    calls = []
+    cache.get_or_set("zero", lambda: calls.append(1) or 0)
+    assert cache.get_or_set("zero", lambda: calls.append(1) or 0) == 0
+    assert calls == [1]
+
+
+def test_invalidation(monkeypatch):
+    cache, _ = _cache(monkeypatch, ttl=10)
+    for key in [("documents", 1), ("questions", 1), ("documents", 2)]:
+        cache.set(key, 0)
+    cache.invalidate(("questions", 1))
+    assert cache.get(("questions", 1)) is None
+    cache.invalidate_where(lambda key: key[0] == "documents")
+    assert len(cache) == 0
+    cache.set("k", 1)
+    cache.clear()
+    assert cache.get("k") is None
+
+
+def test_concurrent_access_respects_maxsize():
+    cache = TTLCache(ttl=60, maxsize=50)
+
+    def worker(offset):
+        for i in range(500):
+            cache.set(offset + i, i)
+            cache.get(offset + i // 2)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
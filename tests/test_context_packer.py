@@ -0,0 +1,117 @@
+import pytest
+
+from app.services.context_packer import ContextChunk, count_tokens, merge_chunks, pack_context
+
+
+def _chunk(chunk_index, text, rank=None, start=None, end=None):
+    return ContextChunk(text=text, chunk_index=chunk_index, rank=chunk_index if rank is None else rank, start=start, end=end)
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    pytest.param(
+        [_chunk(0, "alpha"), _chunk(1, "beta")],
+        ["alpha\nbeta"],
+        id="adjacent-indexes-merge",
+    ),
+    pytest.param(
+        [_chunk(1, "beta"), _chunk(0, "alpha")],
+        ["alpha\nbeta"],
+        id="merged-in-document-order",
+    ),
+    pytest.param(
+        [_chunk(0, "alpha"), _chunk(2, "gamma")],
+        ["alpha", "gamma"],
+        id="gap-in-indexes-stays-apart",
+    ),
+    pytest.param(
+        [_chunk(0, "the quick brown", start=0, end=15), _chunk(1, "brown fox", start=10, end=19)],
+        ["the quick brown fox"],
+        id="overlapping-offsets-not-duplicated",
+    ),
+    pytest.param(
+        [_chunk(0, "one two ", start=0, end=8), _chunk(1, "three", start=8, end=13)],
+        ["one two three"],
+        id="touching-offsets",
+    ),
+    pytest.param(
+        [_chunk(0, "short", start=0, end=5), _chunk(1, "later", start=40, end=45)],
+        ["short", "later"],
+        id="offset-gap-stays-apart",
+    ),
+    pytest.param(
+        [_chunk(0, "tail end", start=0, end=8), _chunk(1, "tail end", start=0, end=8)],
+        ["tail end"],
+        id="fully-covered-chunk-adds-nothing",
+    ),
+    pytest.param(
+        [_chunk(0, "the quick brown"), _chunk(1, "brown fox")],
+        ["the quick brown fox"],
+        id="missing-offsets-use-text-overlap",
+    ),
+    pytest.param(
+        [_chunk(0, "the quick brown", start=0, end=15), _chunk(1, "brown fox")],
+        ["the quick brown fox"],
+        id="one-side-missing-offsets",
+    ),
+    pytest.param(
+        [_chunk(0, "alpha", rank=3), _chunk(0, "alpha", rank=1)],
+        ["alpha"],
+        id="duplicate-index-kept-once",
+    ),
+])
+def test_merge_chunks(chunks, expected):
+    assert [span.text for span in merge_chunks(chunks)] == expected
+
+
+def test_merged_span_takes_the_best_rank_of_its_chunks():
+    [span] = merge_chunks([_chunk(4, "alpha", rank=5), _chunk(5, "beta", rank=0), _chunk(4, "alpha", rank=2)])
+    assert span.rank == 0
+    assert [(chunk.chunk_index, chunk.rank) for chunk in span.chunks] == [(4, 2), (5, 0)]
+
+
+SPANS = [_chunk(0, "least relevant words here", rank=2), _chunk(5, "most relevant", rank=0), _chunk(9, "second", rank=1)]
+
+
+def _budget(*texts):
+    return sum(count_tokens(text) for text in texts) + count_tokens("\n\n") * (len(texts) - 1)
+
+
+@pytest.mark.parametrize("budget, expected", [
+    pytest.param(10_000, ["most relevant", "second", "least relevant words here"], id="everything-fits-in-rank-order"),
+    pytest.param(_budget("most relevant", "second"), ["most relevant", "second"], id="lowest-rank-dropped"),
+    pytest.param(_budget("most relevant"), ["most relevant"], id="only-the-best"),
+    pytest.param(
+        _budget("most relevant", "second", "least relevant words here") - 1,
+        ["most relevant", "second"],
+        id="one-token-short",
+    ),
+])
+def test_pack_context_fills_the_budget_in_rank_order(budget, expected):
+    packed = pack_context(list(SPANS), token_budget=budget)
+
+    assert [span.text for span in packed.spans] == expected
+    assert packed.text == "\n\n".join(expected)
+    assert packed.tokens == count_tokens(packed.text) <= budget
+
+
+def test_a_smaller_span_still_fits_after_a_larger_one_is_skipped():
+    chunks = [_chunk(0, "top", rank=0), _chunk(3, "a much longer middle span of text", rank=1), _chunk(7, "tiny", rank=2)]
+
+    packed = pack_context(chunks, token_budget=_budget("top", "tiny"))
+
+    assert [span.text for span in packed.spans] == ["top", "tiny"]
+
+
+def test_the_best_span_is_truncated_rather_than_dropped():
+    text = " ".join(f"word{i}" for i in range(50))
+
+    packed = pack_context([_chunk(0, text, rank=0), _chunk(2, "other", rank=1)], token_budget=5)
+
+    [span] = packed.spans
+    assert text.startswith(span.text) and span.text
+    assert packed.tokens <= 5
+
+
+def test_nothing_to_pack():
+    packed = pack_context([], token_budget=100)
+    assert (packed.text, packed.tokens, packed.spans) == ("", 0, [])
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.exceptions import LLMUnavailableError
+from app.services import llm_client
+from app.services.llm_client import CircuitBreaker, DeadlineAwareLLM, LatencyTracker
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(llm_client, "primary_latency", LatencyTracker(min_samples=5))
+    monkeypatch.setattr(llm_client, "primary_breaker", CircuitBreaker(failure_threshold=3, reset_seconds=0.1))
+    monkeypatch.setattr(settings, "LLM_HEDGE_PERCENTILE", 95.0)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "LLM_FALLBACK_RESERVE_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "LLM_EXTRACTIVE_RESERVE_SECONDS", 0.05)
+
+
+class FakeChain:
+    """Answers after ``delays[n]`` seconds on the n-th call (the last delay repeats)."""
+
+    def __init__(self, *delays, error=None):
+        self.delays = delays or (0.0,)
+        self.error = error
+        self.started = []
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs):
+        with self._lock:
+            attempt = len(self.started)
+            self.started.append(time.monotonic())
+        time.sleep(self.delays[min(attempt, len(self.delays) - 1)])
+        if self.error:
+            raise self.error
+        return f"answer {attempt}"
+
+
+def test_hedge_fires_after_the_percentile_and_the_faster_attempt_wins():
+    for _ in range(5):
+        llm_client.primary_latency.record(0.15)  # p95 is above the 0.05s floor
+    primary = FakeChain(1.0, 0.0)
+
+    result, outcome = DeadlineAwareLLM(primary).complete({}, Deadline(5.0))
+
+    assert (result, outcome) == ("answer 1", "hedged")
+    assert primary.started[1] - primary.started[0] >= 0.14
+
+
+def test_a_fast_primary_is_not_hedged():
+    primary = FakeChain(0.0)
+
+    assert DeadlineAwareLLM(primary).complete({}, Deadline(5.0)) == ("answer 0", "primary")
+    assert len(primary.started) == 1
+
+
+@pytest.mark.parametrize("probe_succeeds, final_state", [(True, "closed"), (False, "open")])
+def test_breaker_opens_after_n_failures_and_probes_when_half_open(probe_succeeds, final_state):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.1)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.1)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+
+    breaker.record_success() if probe_succeeds else breaker.record_failure()
+    assert breaker.state == final_state
+
+
+def test_failing_primary_opens_the_breaker_and_traffic_moves_to_the_fallback():
+    primary = FakeChain(error=RuntimeError("boom"))
+    fallback = FakeChain()
+    llm = DeadlineAwareLLM(primary, fallback)
+
+    for attempt in range(3):
+        assert llm.complete({}, Deadline(5.0)) == (f"answer {attempt}", "fallback_model")
+    assert llm_client.primary_breaker.state == "open"
+
+    assert llm.complete({}, Deadline(5.0)) == ("answer 3", "fallback_model")
+    assert len(primary.started) == 3  # the open breaker kept the primary out
+
+
+def test_open_breaker_without_a_fallback_is_unavailable():
+    for _ in range(3):
+        llm_client.primary_breaker.record_failure()
+    primary = FakeChain()
+
+    with pytest.raises(LLMUnavailableError):
+        DeadlineAwareLLM(primary).complete({}, Deadline(5.0))
+    assert primary.started == []
+
+
+@pytest.mark.parametrize("remaining", [0.0, 0.04])
+def test_no_llm_call_when_the_deadline_has_no_room(remaining):
+    primary, fallback = FakeChain(), FakeChain()
+
+    with pytest.raises(LLMUnavailableError):
+        DeadlineAwareLLM(primary, fallback).complete({}, Deadline(remaining))
+    assert primary.started == [] and fallback.started == []
+
+
+def test_only_the_fallback_fits_a_short_deadline():
+    primary, fallback = FakeChain(), FakeChain()
+
+    # 0.15s left: above the extractive reserve, below the fallback reserve
+    assert DeadlineAwareLLM(primary, fallback).complete({}, Deadline(0.15)) == ("answer 0", "fallback_model")
+    assert primary.started == []
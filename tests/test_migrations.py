@@ -0,0 +1,210 @@
+import json
+import os
+import shutil
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from app.db.base import Base
+from init_db import ALEMBIC_INI, init_db
+
+BUNDLED_DB = os.path.join(os.path.dirname(ALEMBIC_INI), "app.db")
+
+
+def _config(url):
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def _head():
+    return ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+
+
+def _url(tmp_path, name):
+    return f"sqlite:///{tmp_path / name}"
+
+
+def _connect(url):
+    engine = sa.create_engine(url)
+    return engine, engine.connect()
+
+
+def _schema(url):
+    engine = sa.create_engine(url)
+    try:
+        inspector = sa.inspect(engine)
+        return {
+            table: (
+                sorted(column["name"] for column in inspector.get_columns(table)),
+                sorted(index["name"] for index in inspector.get_indexes(table)),
+                sorted((tuple(fk["constrained_columns"]), fk["referred_table"]) for fk in inspector.get_foreign_keys(table)),
+            )
+            for table in inspector.get_table_names()
+            if table != "alembic_version"
+        }
+    finally:
+        engine.dispose()
+
+
+def _drift(url):
+    engine = sa.create_engine(url)
+    try:
+        with engine.connect() as connection:
+            return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    finally:
+        engine.dispose()
+
+
+def _version(url):
+    engine, connection = _connect(url)
+    try:
+        return connection.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+    finally:
+        connection.close()
+        engine.dispose()
+
+
+def _baseline(url):
+    """A database as create_all made it before migrations: the 0001 schema, unversioned."""
+    command.upgrade(_config(url), "0001")
+    engine = sa.create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(sa.text("DROP TABLE alembic_version"))
+    return engine
+
+
+@pytest.fixture
+def fresh_schema(tmp_path):
+    url = _url(tmp_path, "fresh.db")
+    init_db(url)
+    return _schema(url)
+
+
+def _auto_vacuum(url):
+    engine, connection = _connect(url)
+    try:
+        return connection.execute(sa.text("PRAGMA auto_vacuum")).scalar()
+    finally:
+        connection.close()
+        engine.dispose()
+
+
+def test_fresh_database_matches_models(tmp_path):
+    url = _url(tmp_path, "fresh.db")
+    init_db(url)
+    assert _version(url) == _head()
+    assert _drift(url) == []
+    assert _auto_vacuum(url) == 2  # INCREMENTAL
+
+
+def test_baseline_database_with_rows_upgrades_to_head(tmp_path, fresh_schema):
+    url = _url(tmp_path, "baseline.db")
+    engine = _baseline(url)
+    legacy_sources = [
+        {"text": "second chunk", "chunk_index": 0},  # chunk_index was the retrieval rank
+        {"text": "  first chunk\n", "chunk_index": 1},
+        {"text": "from another document", "chunk_index": 2, "metadata": {}},
+    ]
+    with engine.begin() as connection:
+        connection.execute(sa.text(
+            "INSERT INTO users (id, email, hashed_password, is_active, is_superuser) VALUES (1, 'a@example.com', 'x', 1, 0)"
+        ))
+        connection.execute(sa.text(
+            "INSERT INTO documents (id, title, owner_id, processing_status) VALUES (1, 'doc', 1, 'completed')"
+        ))
+        for index, text in enumerate(["first chunk", "second chunk"]):
+            connection.execute(
+                sa.text("INSERT INTO document_embeddings (document_id, chunk_index, chunk_text, embedding) VALUES (1, :i, :t, '[]')"),
+                {"i": index, "t": text},
+            )
+        connection.execute(
+            sa.text("INSERT INTO questions (id, user_id, document_id, question_text, meta_data) VALUES (1, 1, 1, 'q', :m)"),
+            {"m": json.dumps({"sources": legacy_sources})},
+        )
+        connection.execute(sa.text(
+            "INSERT INTO rl_model_states (model_name, state_dict, version, is_active) VALUES ('qa_policy', '{}', 'v1', 1)"
+        ))
+    engine.dispose()
+
+    init_db(url)
+
+    assert _version(url) == _head()
+    assert _schema(url) == fresh_schema
+    assert _drift(url) == []
+    engine, connection = _connect(url)
+    try:
+        assert connection.execute(sa.text("SELECT email FROM users")).scalars().all() == ["a@example.com"]
+        assert connection.execute(sa.text("SELECT count(*) FROM document_embeddings")).scalar() == 2
+        # The old JSON-tensor policy rows cannot become checkpoints
+        assert connection.execute(sa.text("SELECT count(*) FROM rl_model_states")).scalar() == 0
+        sources = json.loads(connection.execute(sa.text("SELECT meta_data FROM questions")).scalar())["sources"]
+    finally:
+        connection.close()
+        engine.dispose()
+    assert [source.get("chunk_index") for source in sources[:2]] == [1, 0]
+    assert all(source["embedding_id"] is not None and "text" not in source for source in sources[:2])
+    assert sources[2] == {"text": "from another document", "metadata": {}}
+
+
+def test_create_all_database_with_some_new_tables_upgrades(tmp_path, fresh_schema):
+    # create_all between the baseline and 0002 adds new tables but never alters old ones
+    url = _url(tmp_path, "partial.db")
+    engine = _baseline(url)
+    with engine.begin() as connection:
+        # What create_all emitted then, before the 0002 indexes were on the model
+        connection.execute(sa.text(
+            "CREATE TABLE conversations (id INTEGER NOT NULL, user_id INTEGER, document_id INTEGER, title VARCHAR, "
+            "summary TEXT, summarized_until_id INTEGER, created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id), "
+            "FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(document_id) REFERENCES documents (id))"
+        ))
+        connection.execute(sa.text("CREATE INDEX ix_conversations_id ON conversations (id)"))
+        connection.execute(sa.text("ALTER TABLE documents ADD COLUMN index_version INTEGER"))
+    engine.dispose()
+
+    init_db(url)
+
+    assert _version(url) == _head()
+    assert _schema(url).keys() == fresh_schema.keys()
+    assert _drift(url) == []
+
+
+@pytest.mark.skipif(not os.path.exists(BUNDLED_DB), reason="no bundled app.db")
+def test_bundled_database_upgrades_without_losing_rows(tmp_path, fresh_schema):
+    path = tmp_path / "bundled.db"
+    shutil.copy(BUNDLED_DB, path)
+    url = f"sqlite:///{path}"
+    tables = ["users", "documents", "document_embeddings", "questions"]
+    assert _auto_vacuum(url) == 0
+    engine, connection = _connect(url)
+    before = {table: connection.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar() for table in tables}
+    connection.close()
+    engine.dispose()
+
+    init_db(url)
+
+    assert _schema(url) == fresh_schema
+    engine, connection = _connect(url)
+    try:
+        after = {table: connection.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar() for table in tables}
+    finally:
+        connection.close()
+        engine.dispose()
+    assert after == before
+    assert _auto_vacuum(url) == 2
+
+
+def test_downgrade_to_baseline_and_back(tmp_path, fresh_schema):
+    url = _url(tmp_path, "roundtrip.db")
+    init_db(url)
+    command.downgrade(_config(url), "0001")
+    assert "conversations" not in _schema(url)
+    assert "state_dict" in _schema(url)["rl_model_states"][0]
+
+    command.upgrade(_config(url), "head")
+    assert _schema(url) == fresh_schema
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.exceptions import InvalidCursorError
+from app.core.pagination import PageParams, count_cache, decode_cursor, encode_cursor, paginate, paginate_async
+from app.db.session import Base
+from app.models.models import Document, User
+
+CREATED = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    owner = User(id=1, email="owner@example.com", hashed_password="x")
+    session.add(owner)
+    # Pairs of documents share a timestamp, so ordering relies on the id tie-break
+    session.add_all(
+        Document(id=i, owner_id=1, title=f"doc {i}", created_at=CREATED + timedelta(minutes=i // 2))
+        for i in range(1, 12)
+    )
+    session.commit()
+    count_cache.clear()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _expected_order(db):
+    return [d.id for d in db.query(Document).order_by(Document.created_at.desc(), Document.id.desc())]
+
+
+def _walk(fetch, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = fetch(PageParams(cursor=cursor, limit=limit))
+        pages += 1
+        ids += [item.id for item in page["items"]]
+        assert page["limit"] == limit
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return ids, pages
+        cursor = page["next_cursor"]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 11, 50])
+def test_pages_cover_every_row_once_in_order(db, limit):
+    query = db.query(Document).filter(Document.owner_id == 1)
+    ids, pages = _walk(lambda params: paginate(query, Document, params), limit)
+    assert ids == _expected_order(db)
+    assert pages == max(1, -(-11 // limit))
+
+
+def test_async_pagination_matches_sync(db):
+    class AwaitableSession:
+        """Just enough of AsyncSession over the sync test session."""
+
+        async def scalar(self, statement):
+            return db.scalar(statement)
+
+        async def scalars(self, statement):
+            return db.scalars(statement)
+
+    statement = select(Document).where(Document.owner_id == 1)
+    ids, _ = _walk(lambda params: asyncio.run(paginate_async(AwaitableSession(), statement, Document, params)), 4)
+    assert ids == _expected_order(db)
+
+    page = asyncio.run(paginate_async(
+        AwaitableSession(), statement, Document, PageParams(limit=4, include_total=True), count_key=("documents", 1)
+    ))
+    assert page["total"] == 11
+
+
+def test_total_is_counted_once_and_cached(db):
+    query = db.query(Document).filter(Document.owner_id == 1)
+    params = PageParams(limit=2, include_total=True)
+    assert paginate(query, Document, params, count_key=("documents", 1))["total"] == 11
+
+    db.add(Document(id=99, owner_id=1, title="new", created_at=CREATED))
+    db.commit()
+    assert paginate(query, Document, params, count_key=("documents", 1))["total"] == 11
+    count_cache.invalidate(("documents", 1))
+    assert paginate(query, Document, params, count_key=("documents", 1))["total"] == 12
+
+
+def test_total_is_omitted_unless_requested(db):
+    query = db.query(Document)
+    assert paginate(query, Document, PageParams(limit=2), count_key=("documents", 1))["total"] is None
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor(CREATED, 1)[:-3], "W10"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
@@ -0,0 +1,94 @@
+import pytest
+
+from app.core import ratelimit
+from app.core.exceptions import RateLimitedError
+from app.core.ratelimit import ConcurrencyLimiter, LocalBackend, RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    class FakeClock:
+        now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_admits_a_burst_then_asks_to_wait(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.take(2)
+    clock.now += 100
+    assert bucket.take(2) == 0.0
+    assert bucket.take() == pytest.approx(1.0)
+
+
+def test_refused_take_spends_nothing(clock):
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    bucket.take(4)
+    assert bucket.take(3) == pytest.approx(2.0)
+    assert bucket.take(1) == 0.0
+
+
+def test_charge_can_leave_the_bucket_in_debt(clock):
+    bucket = TokenBucket(rate=10.0, capacity=10)
+    bucket.charge(30)
+    assert bucket.take() == pytest.approx(2.1)
+    clock.now += 2.1
+    assert bucket.take() == 0.0
+
+
+def test_rate_limiter_keys_are_independent(clock):
+    limiter = RateLimiter("login", rate=1.0, burst=1, backend=LocalBackend())
+    limiter.check("alice")
+    limiter.check("bob")
+    with pytest.raises(RateLimitedError) as raised:
+        limiter.check("alice")
+    assert raised.value.retry_after == pytest.approx(1.0)
+
+
+def test_limiters_sharing_a_backend_do_not_share_buckets(clock):
+    backend = LocalBackend()
+    ip = RateLimiter("ip", rate=1.0, burst=1, backend=backend)
+    account = RateLimiter("account", rate=1.0, burst=1, backend=backend)
+    assert ip.take("k") == 0.0
+    assert account.take("k") == 0.0
+
+
+def test_local_backend_evicts_least_recently_used_buckets(clock):
+    backend = LocalBackend(maxsize=2)
+    backend.take("a", 1.0, 1)
+    backend.take("b", 1.0, 1)
+    backend.take("a", 1.0, 1)  # refused, but a is now the most recently used
+    backend.take("c", 1.0, 1)  # evicts b
+    assert backend.take("a", 1.0, 1) > 0  # a kept its empty bucket
+    assert backend.take("b", 1.0, 1) == 0.0  # b starts again with a full bucket
+
+
+def test_concurrency_limiter_slots():
+    limiter = ConcurrencyLimiter("jobs", limit=2, backend=LocalBackend())
+    first = limiter.acquire(1)
+    with limiter.acquire(1):
+        with pytest.raises(RateLimitedError):
+            limiter.acquire(1)
+        limiter.acquire(2).release()  # another key has its own slots
+    limiter.acquire(1).release()
+    first.release()
+    first.release()  # idempotent: must not free someone else's slot
+    held = [limiter.acquire(1), limiter.acquire(1)]
+    with pytest.raises(RateLimitedError):
+        limiter.acquire(1)
+    for slot in held:
+        slot.release()
+    assert limiter.backend._counters == {}
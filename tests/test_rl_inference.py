@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from app.services.rl_inference import LINEAR_LAYERS, NumpyPolicy
+
+
+def _reference_probabilities(weights, states):
+    """The network spelled out in float64, independent of NumpyPolicy's layout tricks."""
+    x = np.asarray(states, dtype=np.float64)
+    for i, name in enumerate(LINEAR_LAYERS):
+        x = x @ weights[f"{name}.weight"].astype(np.float64).T + weights[f"{name}.bias"]
+        if i < len(LINEAR_LAYERS) - 1:
+            x = np.maximum(x, 0.0)
+    x = np.exp(x - x.max(axis=-1, keepdims=True))
+    return x / x.sum(axis=-1, keepdims=True)
+
+
+@pytest.fixture
+def policy():
+    return NumpyPolicy.initial(seed=7)
+
+
+@pytest.fixture
+def states():
+    rng = np.random.default_rng(0)
+    # Realistic feature scales: confidence and feedback in 0-100, lengths / 100
+    return np.column_stack([
+        rng.uniform(0, 100, 64),
+        rng.uniform(0, 100, 64),
+        rng.uniform(0, 5, 64),
+        rng.uniform(0, 20, 64),
+        np.zeros((64, 6)),
+    ]).astype(np.float32)
+
+
+def test_matches_reference_forward_pass(policy, states):
+    expected = _reference_probabilities(policy.weights, states)
+    np.testing.assert_allclose(policy.probabilities(states), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_single_state_matches_its_batch_row(policy, states):
+    batch = policy.probabilities(states)
+    assert policy.probabilities(states[3]).shape == (3,)
+    np.testing.assert_allclose(policy.probabilities(states[3]), batch[3], rtol=1e-6)
+    np.testing.assert_allclose(batch.sum(axis=1), 1.0, rtol=1e-5)
+
+
+def test_large_logits_do_not_overflow():
+    weights = {name: np.asarray(array) for name, array in NumpyPolicy.initial(seed=1).weights.items()}
+    weights["network.4.bias"] = np.array([500.0, 0.0, -500.0])
+    probs = NumpyPolicy(weights).probabilities(np.zeros(10, dtype=np.float32))
+    assert np.all(np.isfinite(probs))
+    assert probs[0] == pytest.approx(1.0)
+
+
+def test_sampling_follows_the_probabilities(policy, states):
+    rng = np.random.default_rng(42)
+    state = states[0]
+    probs = policy.probabilities(state)
+    draws = np.array([policy.sample(state, rng=rng)[0] for _ in range(20000)])
+    frequencies = np.bincount(draws, minlength=3) / len(draws)
+    np.testing.assert_allclose(frequencies, probs, atol=0.02)
+
+    actions, batch_probs = policy.sample(states, rng=rng)
+    assert actions.shape == (len(states),)
+    assert batch_probs.shape == (len(states), 3)
+    assert set(actions.tolist()) <= {0, 1, 2}
+
+
+def test_matches_torch_network(states):
+    torch = pytest.importorskip("torch")
+    from app.services.rl_trainer import QAPolicyNetwork
+
+    torch.manual_seed(3)
+    network = QAPolicyNetwork(10, 64, 3)
+    weights = {name: t.detach().numpy().copy() for name, t in network.state_dict().items()}
+    with torch.no_grad():
+        expected = network(torch.from_numpy(states)).numpy()
+
+    np.testing.assert_allclose(NumpyPolicy(weights).probabilities(states), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_initial_weights_load_into_torch_network():
+    torch = pytest.importorskip("torch")
+    from app.services.rl_trainer import QAPolicyNetwork
+
+    policy = NumpyPolicy.initial(seed=5)
+    network = QAPolicyNetwork(10, 64, 3)
+    network.load_state_dict({name: torch.from_numpy(array) for name, array in policy.weights.items()})
+    state = np.linspace(0, 1, 10, dtype=np.float32)
+    with torch.no_grad():
+        expected = network(torch.from_numpy(state)).numpy()
+    np.testing.assert_allclose(policy.probabilities(state), expected, rtol=1e-5, atol=1e-6)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db.session import Base
+from app.models.models import Document, Question, User
+from app.services import rl_service
+from app.services.rl_replay import replay_buffer
+from app.services.rl_service import RLService
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="user@example.com", hashed_password="x"))
+    session.add(Document(id=1, owner_id=1, title="doc"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def trainer_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "RL_BACKGROUND_TRAINER", True)
+    monkeypatch.setattr(rl_service, "ensure_background_trainer", lambda: None)
+    replay_buffer.drain(len(replay_buffer))
+    yield
+    replay_buffer.drain(len(replay_buffer))
+
+
+def _answered_question(db):
+    question = Question(
+        user_id=1, document_id=1, question_text="What is it?", answer_text="A thing.", confidence_score=80
+    )
+    db.add(question)
+    db.commit()
+    answer = RLService(db).optimize_response(question, {"answer": "A thing.", "confidence_score": 80, "sources": []})
+    db.commit()
+    return question, answer
+
+
+def test_inference_logs_the_decision_without_training(db, trainer_enabled):
+    question, answer = _answered_question(db)
+
+    decision = question.meta_data["rl"]
+    assert decision["action"] in (0, 1, 2)
+    assert len(decision["state"]) == 10
+    assert sum(decision["action_probs"]) == pytest.approx(1.0, abs=1e-5)
+    assert 0 <= answer["confidence_score"] <= 100
+    assert len(replay_buffer) == 0
+
+
+def test_first_rating_rewards_the_logged_decision(db, trainer_enabled):
+    question, _ = _answered_question(db)
+    decision = question.meta_data["rl"]
+
+    RLService(db).record_feedback(question, 75)
+    db.commit()
+    RLService(db).record_feedback(question, 10)  # re-rating updates the score only
+
+    assert question.feedback_score == 10
+    [experience] = replay_buffer.drain(10)
+    assert experience.reward == pytest.approx(0.75)
+    assert experience.action == decision["action"]
+    assert experience.question_id == question.id
+    np.testing.assert_allclose(experience.state, decision["state"])
+
+
+def test_feedback_without_trainer_only_stores_the_score(db, monkeypatch):
+    monkeypatch.setattr(settings, "RL_BACKGROUND_TRAINER", False)
+    question, _ = _answered_question(db)
+    before = len(replay_buffer)
+
+    RLService(db).record_feedback(question, 50)
+
+    assert question.feedback_score == 50
+    assert len(replay_buffer) == before
+
+
+def _rated(db, action, score, state=None, decision=True):
+    meta_data = None
+    if decision:
+        meta_data = {"rl": {"state": state or [50, 0, 0.1, 0.2] + [0] * 6, "action": action, "action_probs": [0.2, 0.3, 0.5]}}
+    db.add(Question(user_id=1, document_id=1, question_text="q", feedback_score=score, meta_data=meta_data))
+    db.commit()
+
+
+def test_history_batches_use_the_logged_decisions(db):
+    _rated(db, action=2, score=100, state=[70, 55, 0.3, 0.4] + [0] * 6)  # feature 1 must not carry the rating
+    _rated(db, action=0, score=0)
+    _rated(db, action=1, score=80, decision=False)  # answered before decisions were logged
+    db.add(Question(user_id=1, document_id=1, question_text="unrated", meta_data={"rl": {"state": [0] * 10, "action": 1}}))
+    db.commit()
+
+    service = RLService(db)
+    pages = list(service.iter_feedback_pages(page_size=2))
+    assert [len(page) for page in pages] == [2, 1]
+    states, actions, rewards = service.build_feature_batch([row for page in pages for row in page])
+
+    assert actions.tolist() == [2, 0]
+    np.testing.assert_allclose(rewards, [1.0, 0.0])
+    np.testing.assert_allclose(states[0, :4], [70, 0, 0.3, 0.4], rtol=1e-6)
+    assert not states[:, 1].any()
+
+
+def test_state_features_leave_out_the_rating(db):
+    question = Question(question_text="x" * 50, answer_text="y" * 20, confidence_score=60, feedback_score=90)
+    state = RLService(db).get_state_features(question)
+    np.testing.assert_allclose(state[:4], [60, 0, 0.5, 0.2])
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.services.rl_inference import policy_cache  # noqa: E402
+from app.services.rl_replay import Experience, replay_buffer  # noqa: E402
+from app.services.rl_trainer import PolicyTrainer  # noqa: E402
+
+STATE = np.array([80, 0, 0.5, 2.0, 0, 0, 0, 0, 0, 0], dtype=np.float32)
+
+
+@pytest.fixture
+def trainer(monkeypatch):
+    torch.manual_seed(0)
+    published = policy_cache.current
+    replay_buffer.drain(len(replay_buffer))
+    trainer = PolicyTrainer()
+    monkeypatch.setattr(trainer, "_persist", lambda metrics: None)
+    yield trainer
+    replay_buffer.drain(len(replay_buffer))
+    policy_cache.publish(published) if published is not None else None
+
+
+def _probability(trainer, action):
+    with torch.no_grad():
+        return trainer.network(torch.from_numpy(STATE))[action].item()
+
+
+def _rate(action, reward, count=32):
+    for _ in range(count):
+        replay_buffer.push(Experience(state=STATE, action=action, action_probs=np.full(3, 1 / 3), reward=reward))
+
+
+def test_zero_rated_decisions_lower_that_actions_probability(trainer):
+    trainer.baseline = 0.5  # running mean reward after earlier, better ratings
+    before = _probability(trainer, 0)
+
+    _rate(action=0, reward=0.0)
+    metrics = trainer.train_pending()
+
+    assert metrics is not None and metrics["average_reward"] == 0.0
+    assert _probability(trainer, 0) < before
+    assert len(replay_buffer) == 0
+
+
+def test_well_rated_decisions_raise_that_actions_probability(trainer):
+    before = _probability(trainer, 2)
+
+    _rate(action=2, reward=1.0)
+    trainer.train_pending()
+
+    assert _probability(trainer, 2) > before
+
+
+def test_nothing_to_train_on(trainer):
+    assert trainer.train_pending() is None
+    assert trainer.steps == 0
+
+
+def test_history_training_credits_the_served_action(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db.session import Base
+    from app.models.models import Document, Question, User
+    from app.services import rl_trainer
+    from app.services.rl_trainer import train_on_history
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(id=1, email="u@example.com", hashed_password="x"), Document(id=1, owner_id=1, title="d")])
+    # Action 0 was served and rated 0, action 2 was served and rated 100
+    for action, score in [(0, 0), (2, 100)] * 32:
+        decision = {"state": STATE.tolist(), "action": action, "action_probs": [1 / 3] * 3}
+        db.add(Question(user_id=1, document_id=1, question_text="q", feedback_score=score, meta_data={"rl": decision}))
+    db.commit()
+
+    torch.manual_seed(0)
+    trainer = PolicyTrainer()
+    monkeypatch.setattr(rl_trainer, "get_trainer", lambda start=True: trainer)
+    published = policy_cache.current
+    try:
+        before = [_probability(trainer, action) for action in (0, 2)]
+        metrics = train_on_history(db, batch_size=16, epochs=5)
+        after = [_probability(trainer, action) for action in (0, 2)]
+    finally:
+        policy_cache.publish(published) if published is not None else None
+        db.close()
+        engine.dispose()
+
+    assert metrics["training_samples"] == 64 * 5
+    assert metrics["average_reward"] == pytest.approx(0.5)
+    assert after[0] < before[0]
+    assert after[1] > before[1]
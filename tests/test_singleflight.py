@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def _run_concurrently(group, key, fn, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(group.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(group, key, count):
+    """Block until ``count`` followers are parked on the leader's call."""
+    while group._calls[key].waiters < count:
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_execution():
+    group = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    leader, leader_results, _ = _run_concurrently(group, "q", fn, 1)
+    assert started.wait(5)
+    followers, results, errors = _run_concurrently(group, "q", fn, 4)
+    _wait_for_waiters(group, "q", 4)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert not errors
+    assert leader_results == [("answer", True)]
+    assert results == [("answer", True)] * 4
+    assert group.in_flight() == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    group = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+
+    def fn():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader, _, leader_errors = _run_concurrently(group, "q", fn, 1)
+    assert started.wait(5)
+    followers, results, errors = _run_concurrently(group, "q", fn, 3)
+    _wait_for_waiters(group, "q", 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    assert len(leader_errors) == 1
+    assert group.in_flight() == 0
+
+
+def test_nothing_is_cached_after_completion():
+    group = SingleFlight("test")
+    values = iter([1, 2])
+
+    assert group.do("k", lambda: next(values)) == (1, False)
+    assert group.do("k", lambda: next(values)) == (2, False)
+
+
+def test_different_keys_do_not_share():
+    group = SingleFlight("test")
+    assert group.do("a", lambda: "a") == ("a", False)
+    assert group.do("b", lambda: "b") == ("b", False)
+
+    with pytest.raises(KeyError):
+        group.do("c", lambda: {}["missing"])
+    assert group.in_flight() == 0
+
+
+def test_follower_that_times_out_runs_the_function_itself():
+    group = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "leader"
+
+    leader, leader_results, _ = _run_concurrently(group, "q", slow, 1)
+    assert started.wait(5)
+    try:
+        assert group.do("q", lambda: "own", timeout=0.01) == ("own", False)
+    finally:
+        release.set()
+        leader[0].join(5)
+    assert leader_results == [("leader", True)]
+
+
+class _FakeQAService:
+    calls = []
+    release = threading.Event()
+
+    def __init__(self, db, document_id, index_version):
+        pass
+
+    def answer_question(self, question, chat_history=None, deadline=None):
+        self.calls.append(deadline)
+        if len(self.calls) == 1:
+            self.release.wait(5)  # the leader is slow
+            return {"answer": "llm", "llm_tokens": 120, "sources": []}
+        return {"answer": "extractive", "llm_tokens": 0, "sources": []}
+
+
+@pytest.mark.parametrize("follower_deadline, expected", [
+    (5.0, ({"answer": "llm", "llm_tokens": 120, "sources": []}, True, False)),
+    (0.1, ({"answer": "extractive", "llm_tokens": 0, "sources": []}, False, True)),
+])
+def test_coalesced_followers_respect_their_deadline_and_are_not_the_leader(monkeypatch, follower_deadline, expected):
+    from types import SimpleNamespace
+
+    from app.core.deadline import Deadline
+    from app.services import qa_service
+
+    _FakeQAService.calls = []
+    _FakeQAService.release = threading.Event()
+    monkeypatch.setattr(qa_service, "QAService", _FakeQAService)
+    document = SimpleNamespace(id=1, index_version=0)
+    leader_result, follower_result = [], []
+    leader = threading.Thread(target=lambda: leader_result.append(
+        qa_service.answer_question_coalesced(None, document, "What?", deadline=Deadline(5.0))
+    ))
+    leader.start()
+    while not _FakeQAService.calls:
+        time.sleep(0.001)
+
+    follower = threading.Thread(target=lambda: follower_result.append(
+        qa_service.answer_question_coalesced(None, document, "what", deadline=Deadline(follower_deadline))
+    ))
+    follower.start()
+    if follower_deadline < 1:
+        follower.join(5)  # answers without the leader
+    else:
+        _wait_for_waiters(qa_service.answer_flight, (1, 0, "what", ()), 1)
+    _FakeQAService.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert follower_result == [expected]
+    assert leader_result[0][2] is True  # the leader computed it, and pays for it